@@ -2,6 +2,7 @@ import xml.etree.ElementTree as ET
 import re
 import os
 from UDS.Utils import *
+from UDS.UDSConfig import UDSConfig
 import pandas as pd
 
 DIDDataExcel = None
@@ -238,7 +239,12 @@ if __name__ == "__main__":
     # Replace local variable with the config 
     dir_name = os.path.dirname(os.path.abspath(__file__))
     FileConfig = loadConfigFilePath(dir_name)
-    load_config(globals(), globals(), FileConfig)
+    Config = UDSConfig.load(FileConfig)
+    DIDDataExcel = Config.project.DIDDataExcel
+    DIDStatusExcel = Config.project.DIDStatusExcel
+    PathToArxml = Config.project.PathToArxml
+    PathToArxmlList = Config.project.PathToArxmlList
+    PathToMergedArxml = Config.project.PathToMergedArxml
 
     # Initialize path for ARXML and lists
     path_arxml = None
@@ -1,6 +1,7 @@
 from UDS.UDSInterface import *
 import pandas as pd
 from UDS.Utils import *
+from UDS.UDSConfig import UDSConfig
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 from openpyxl.formatting.rule import CellIsRule
@@ -68,10 +69,12 @@ if __name__ == "__main__":
 
     dir_name = os.path.dirname(os.path.abspath(__file__))
     FileConfig = loadConfigFilePath(dir_name)
-    load_config(globals(), globals(), FileConfig)
+    Config = UDSConfig.load(FileConfig)
+    project = Config.project.name
+    DIDStatusExcel = Config.project.DIDStatusExcel
 
     if(project == 'PR105'):
-        Uds = UDSInterface(FileConfig=FileConfig)
+        Uds = UDSInterface(FileConfig=Config)
         
         # Activate extented session before executing Excel file
         Uds.StartSession(3)
@@ -80,7 +83,7 @@ if __name__ == "__main__":
         parseAndSend(Uds)
 
     elif(project == 'PR128'):
-        Uds = UDSInterface(FileConfig=FileConfig)
+        Uds = UDSInterface(FileConfig=Config)
 
         # Activate extented session before executing Excel file
         Uds.StartSession(3)
@@ -1,7 +1,9 @@
 from collections import defaultdict
 from UDS.UDSInterface import *
+from UDS.DiagSequence import DiagSequenceError, DiagSequenceScheduler, compile_sequence
 import pandas as pd
 from UDS.Utils import *
+from UDS.UDSConfig import UDSConfig
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 from openpyxl.formatting.rule import CellIsRule, FormulaRule
@@ -12,137 +14,54 @@ DiagSeqExcel = None
 PDX_Folder = None
 ULP_Folder = None
 
-def __execDiagCmd(Uds, index, line):
-    # Clear variables
-    status = ''
-    data   = ''
-    error  = ''
-
-    if(line['Command'] == 'RDBI'):
-        status, data, error = Uds.Pcan_ReadDID(line['DID'], line['Size'])
-        # df.at[index, 'Data'] = data
-
-    elif(line['Command'] == 'WDBI'):
-        status, error = Uds.Pcan_WriteDID(line['DID'], str(line['Data']))
-
-    elif(line['Command'] == 'RC_START'):
-        status, data, error = Uds.Pcan_StartRC(str(line['DID']), str(line['Data']))
-
-    elif(line['Command'] == 'RC_STOP'):
-        status, data, error = Uds.Pcan_StopRC(str(line['DID']))
-
-    elif(line['Command'] == 'RC_RESULT'):
-        status, data, error = Uds.Pcan_ResultRC(str(line['DID']))
-
-    elif(line['Command'] == 'CLEAR_DTC'):
-        status, error = Uds.Pcan_ClearDTC(str(line['Data']))
-
-    elif(line['Command'] == 'SW_RESET'):
-        if(line['DID'] == '1101'):
-            status, error = Uds.StartReset(0x1)
-        elif(line['DID'] == '1102'):
-            status, error = Uds.StartReset(0x2)
-        elif(line['DID'] == '1103'):
-            status, error = Uds.StartReset(0x3)
-        else:
-            print(f"Line : {index} => Reset command not reconized")
-
-    elif(line['Command'].endswith("SESSION")):
-        if(line['DID'] == '1001'):
-            status, error = Uds.StartSession(0x1)
-        elif(line['DID'] == '1002'):
-            status, error = Uds.StartSession(0x2)
-        elif(line['DID'] == '1003'):
-            status, error = Uds.StartSession(0x3)
-        else:
-            print(f"Line : {index} => Session command not reconized")
-
-    elif((line['Command'] == 'REQUEST_DOWNLOAD') or
-         (line['Command'] == 'SECURE_ACCESS') or
-         (line['Command'] == 'TESTER_PRESENT') or
-         (line['Command'] == 'TRANSFERT_DATA')):
-        status, data, error = Uds.Pcan_WriteData(str(line['Data']))
-    
-    elif(line['Command'].lower() == 'wait'):
-        wait_ms(float(line['Data']) * 1000)
-        status = 'OK'
-
-    else:
-        status = 'NOK'
-        error = 'Command not reconized : ' + str(line['Command'])
-    
-    return status, data, error
+def __resultColumns(columns, rows):
+    # Index of the result columns (added if missing)
+    for name in ('Data', 'Status', 'Error'):
+        if name not in columns:
+            columns.append(name)
+            for row in rows:
+                row.append('')
+    return columns.index('Data'), columns.index('Status'), columns.index('Error')
 
 
-def processDiagSeqs(Uds):
-    loop_nb = 0
-    loop_start_idx = 0
-    max_loop = 1
-    status = ''
-    data   = ''
-    error  = ''
-
+def processDiagSeqs(Uds, FileConfig=None):
     # Read all sheets into a dictionary
     excel_data: dict[str, pd.DataFrame] = pd.read_excel(DiagSeqExcel, sheet_name=None, dtype=str, na_values=[], keep_default_na=False)
 
-    # Iterate through all sheets
-    for sheet_name, df in excel_data.items():
+    # Rows of all the sheets: the results are updated in memory and the workbook is written once
+    sheets = {sheet_name: (list(df.columns), df.values.tolist()) for sheet_name, df in excel_data.items()}
+
+    # Compile all the sequences before sending anything
+    sequences = {}
+    for sheet_name, (columns, rows) in sheets.items():
         # Check Sheet name is starting with "DIAG_SEQ"
         if(sheet_name.startswith("DIAG_SEQ")):
-            print(f"Processing {sheet_name}...")
-            
-            while loop_nb < max_loop:
-
-                # Loop over the sheet "DID Read" line by line from a specific index
-                for index, line in df.iloc[loop_start_idx:].iterrows():
-
-                    # Clear data for the next command
-                    status = ''
-                    data   = ''
-                    error  = ''
-
-                    if(line['Command'] == 'LOOP_START'):
-                        max_loop = int(line['Data'])
-                        loop_start_idx = index + 1
-                        loop_nb = 0
-
-                    elif(line['Command'] == 'LOOP_END'):
-                        loop_nb += 1
-                        if(loop_nb < max_loop):
-                            # break the loop for a new re-run
-                            break
-                        else:
-                            # End the loop and continue
-                            continue
-                    else:
-                        status, data, error = __execDiagCmd(Uds, index, line)
-                    
-                    if((data is not None) and (data != '')):
-                        df.at[index, 'Data'] = data
-
-                    # Update the line with the results
-                    df.at[index, 'Status'] = status
-                    df.at[index, 'Error']  = error
-
-
-                    # Detect latest command in the Excel sheet
-                    if(index >= df.index.max()):
-                        loop_nb += 1
-            
-            # Clear loop data
-            loop_nb = 0
-            loop_start_idx = 0
-            max_loop = 1
-
-            # Save all modified sheets back to the same or a new Excel file
-            with pd.ExcelWriter(DiagSeqExcel, engine='openpyxl') as writer:
-                for sheet_name, df in excel_data.items():
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-            # Set the colors of the painter format with rules
-            applyPainterFormat(DiagSeqExcel, 'E')
-        else:
-            continue # Excel sheet name not correct
+            try:
+                sequences[sheet_name] = compile_sequence([dict(zip(columns, row)) for row in rows], sheet_name)
+            except DiagSequenceError as e:
+                print(f"{sheet_name} not executed => {len(e.errors)} invalid line(s)")
+                _, status_idx, error_idx = __resultColumns(columns, rows)
+                for index, error in e.errors:
+                    print(f"Line : {index} => {error}")
+                    rows[index][status_idx] = 'NOK'
+                    rows[index][error_idx] = error
+
+    # Run the sequences, the sheets of different targets (TARGET command) run in parallel
+    results = DiagSequenceScheduler(Uds, FileConfig).run(list(sequences.values()))
+
+    for sheet_name, sheet_results in results.items():
+        columns, rows = sheets[sheet_name]
+        data_idx, status_idx, error_idx = __resultColumns(columns, rows)
+
+        # Update the lines with the results (last loop iteration)
+        for index, (status, data, error) in sheet_results.items():
+            if((data is not None) and (data != '')):
+                rows[index][data_idx] = data
+            rows[index][status_idx] = status
+            rows[index][error_idx]  = error
+
+    # Save all the sheets once, with the column widths and the colors of the painter format
+    writeExcelSheets(DiagSeqExcel, sheets, 'Status')
     print("\nDiagnostic sequences processing => Done \n")
 
 
@@ -150,25 +69,29 @@ if __name__ == "__main__":
 
     dir_name = os.path.dirname(os.path.abspath(__file__))
     FileConfig = loadConfigFilePath(dir_name)
-    load_config(globals(), globals(), FileConfig)
+    Config = UDSConfig.load(FileConfig)
+    project = Config.project.name
+    DiagSeqExcel = Config.project.DiagSeqExcel
+    PDX_Folder = Config.project.PDX_Folder
+    ULP_Folder = Config.project.ULP_Folder
 
     if(project == 'PR105'):
-        Uds = UDSInterface(FileConfig=FileConfig)
+        Uds = UDSInterface(FileConfig=Config)
 
         # Activate extented session before executing Excel file
         Uds.StartSession(3)
 
         # Execute all the diagnostic sequences
-        processDiagSeqs(Uds)
+        processDiagSeqs(Uds, Config)
 
     elif(project == 'PR128'):
-        Uds = UDSInterface(FileConfig=FileConfig)
+        Uds = UDSInterface(FileConfig=Config)
 
         # Activate extented session before executing Excel file
         Uds.StartSession(3)
 
         # Execute all the diagnostic sequences
-        processDiagSeqs(Uds)
+        processDiagSeqs(Uds, Config)
 
     else:
         print('Please add your project configuration')
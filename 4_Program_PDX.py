@@ -2,6 +2,7 @@ from collections import defaultdict
 from UDS.UDSInterface import *
 from UDS.UDSProgram import *
 from UDS.Utils import *
+from UDS.UDSConfig import UDSConfig
 import time
 
 project = None
@@ -12,10 +13,13 @@ if __name__ == "__main__":
 
     dir_name = os.path.dirname(os.path.abspath(__file__))
     FileConfig = loadConfigFilePath(dir_name)
-    load_config(globals(), globals(), FileConfig)
+    Config = UDSConfig.load(FileConfig)
+    project = Config.project.name
+    PDX_Folder = Config.project.PDX_Folder
+    ULP_Folder = Config.project.ULP_Folder
 
     if(project == 'PR105'):
-        Uds = UDSInterface(FileConfig=FileConfig)
+        Uds = UDSInterface(FileConfig=Config)
 
         # Programmation Configuration
         programmer = ECUProgrammer(Uds, UDSPdxProgConfig())
@@ -26,7 +30,7 @@ if __name__ == "__main__":
         programmer.program_pdx_files(files_list)
 
     elif(project == 'PR128'):
-        Uds = UDSInterface(FileConfig=FileConfig)
+        Uds = UDSInterface(FileConfig=Config)
 
         # Programmation Configuration
         programmer = ECUProgrammer(Uds, UDSPdxProgConfig())
@@ -2,16 +2,18 @@ import time
 import os
 from UDS.UDSInterface import * 
 from UDS.Utils import *
+from UDS.UDSConfig import UDSConfig
 
 project = None
 
 if __name__ == "__main__":
     dir_name = os.path.dirname(os.path.abspath(__file__))
     FileConfig=loadConfigFilePath(dir_name)
-    load_config(globals(), globals(), FileConfig)
+    Config = UDSConfig.load(FileConfig)
+    project = Config.project.name
     
     if(project == 'PR105'):
-        Pcan = UDSInterface(FileConfig=FileConfig)
+        Pcan = UDSInterface(FileConfig=Config)
 
         # print(Pcan.getFrameFromId(596))
         Pcan.StartSession(3) # Extended session
@@ -25,7 +27,7 @@ if __name__ == "__main__":
         # print(Pcan.ResultRC('DD3A'))
         
     else:
-        Pcan = UDSInterface(FileConfig=FileConfig)
+        Pcan = UDSInterface(FileConfig=Config)
         Pcan.StartSession(3)
         print("8281 " + str(Pcan.ReadDID("8281")))
         print("8282 " + str(Pcan.ReadDID("8282")))
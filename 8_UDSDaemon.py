@@ -0,0 +1,18 @@
+import os
+from UDS.UDSDaemon import UDSDaemon
+from UDS.UDSConfig import UDSConfig
+from UDS.UDSInterface import UDSInterface
+from UDS.Utils import loadConfigFilePath
+
+if __name__ == "__main__":
+    dir_name = os.path.dirname(os.path.abspath(__file__))
+    Config = UDSConfig.load(loadConfigFilePath(dir_name))
+
+    # Keep the CAN channel and the extended session open for 9_UDSCli.py (Ctrl+C or "9_UDSCli.py stop" to exit)
+    Uds = UDSInterface(FileConfig=Config)
+    daemon = UDSDaemon(Uds, address=Config.daemon.address, session=Config.daemon.session,
+                       tester_present=Config.daemon.tester_present)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        print("End of Program")
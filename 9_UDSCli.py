@@ -0,0 +1,14 @@
+import os
+import sys
+from UDS.UDSDaemon import main
+from UDS.UDSConfig import UDSConfig
+from UDS.Utils import loadConfigFilePath
+
+# Single-shot UDS requests through the daemon started by 8_UDSDaemon.py, e.g.:
+#   python 9_UDSCli.py read F190
+#   python 9_UDSCli.py write DA79 "0;1"
+#   python 9_UDSCli.py rc result DD35
+if __name__ == "__main__":
+    dir_name = os.path.dirname(os.path.abspath(__file__))
+    FileConfig = loadConfigFilePath(dir_name)
+    sys.exit(main(FileConfig=FileConfig, address=UDSConfig.load(FileConfig).daemon.address))
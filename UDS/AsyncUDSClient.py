@@ -0,0 +1,350 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+from .IsoTp import FC_OVFLW, FC_WAIT, FLOW_CONTROL_CTS, PCI_FC, IsoTpReassembler, segment, stmin_to_seconds
+from .UDSCodec import did_bytes
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UDSResponse:
+    """Response of an asynchronous UDS request"""
+    status: bool
+    payload: bytes = b''
+    nrc: Optional[int] = None
+    data_offset: int = 1
+    error: str = ''
+
+    @property
+    def data(self) -> bytes:
+        """Service data without the response SID and echoed parameters"""
+        return self.payload[self.data_offset:] if self.status else b''
+
+
+class _ChannelReader:
+    """
+    Receive thread of a CAN channel shared by its AsyncUDSClients.
+
+    The blocking ReadMessages() of the UDSInterface runs on this thread (never on the event
+    loop), each frame is queued to the client of its CAN ID in the loop of that client.
+    """
+    _readers: Dict[int, "_ChannelReader"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, Uds, poll_interval: float):
+        self.Uds = Uds
+        self.poll_interval = poll_interval
+        self.queues: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = {}
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"UdsAsyncRx_{Uds.RxId:X}", daemon=True)
+
+    @classmethod
+    def subscribe(cls, Uds, RxId: int, queue: asyncio.Queue, poll_interval: float) -> "_ChannelReader":
+        """Queue the frames of RxId received on the channel of Uds (reader started by the first client)"""
+        with cls._lock:
+            reader = cls._readers.get(id(Uds))
+            if reader is None:
+                reader = cls(Uds, poll_interval)
+                cls._readers[id(Uds)] = reader
+                reader.thread.start()
+            if RxId in reader.queues:
+                raise ValueError(f"RxId 0x{RxId:X} already used by another AsyncUDSClient of the channel")
+            reader.queues[RxId] = (asyncio.get_running_loop(), queue)
+        return reader
+
+    def unsubscribe(self, RxId: int) -> bool:
+        """Remove the queue of RxId, True if it was the last one (reader stopped)"""
+        with self._lock:
+            self.queues.pop(RxId, None)
+            if self.queues:
+                return False
+            self.running = False
+            self._readers.pop(id(self.Uds), None)
+        return True
+
+    def _run(self):
+        while self.running:
+            try:
+                msg = self.Uds.ReadMessages()
+            except Exception as e:
+                logger.warning(f"CAN read failed: {e}")
+                msg = None
+            if msg is None:
+                time.sleep(self.poll_interval)
+                continue
+
+            target = self.queues.get(msg['id'])
+            if target is not None and len(msg['data']) > 0:
+                loop, queue = target
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, msg)
+                except RuntimeError:
+                    # Event loop of the client closed
+                    pass
+
+
+class AsyncUDSClient:
+    """
+    Asyncio UDS client using the CAN transport of an existing UDSInterface.
+
+    The ISO-TP layer never blocks the event loop: the frames of the CAN channel are read by
+    one receive thread shared by the clients of the channel and dispatched to the queue of
+    each client by CAN ID, flow control and STmin are handled with awaits.
+    Requests of one client are serialized (one pending request per ECU as required by UDS),
+    several clients (other ECUs of the channel with their TxId / RxId, or other channels)
+    can run concurrently in the same event loop.
+
+    Note: while a client is started the receive thread owns the receive queue of the CAN
+    channel, the blocking services of the UDSInterface must not be used at the same time.
+
+    Example:
+        async with AsyncUDSClient(Uds) as client, AsyncUDSClient(Uds, TxId=0x6B5, RxId=0x695) as slave:
+            await client.session(0x03)
+            resp, resp_slave = await asyncio.gather(client.read_did('F190'), slave.read_did('F190'))
+    """
+
+    def __init__(self, UdsClient, poll_interval: float = 0.001, TxId: Optional[int] = None, RxId: Optional[int] = None):
+        """
+        Parameters:
+            UdsClient (UDSInterface): CAN channel (and default ECU addressing).
+            poll_interval (float): Wait of the receive thread when no frame is received.
+            TxId / RxId (int): Other ECU of the CAN channel (default: TxId / RxId of UdsClient).
+        """
+        self.Uds = UdsClient
+        self.TxId = UdsClient.TxId if TxId is None else TxId
+        self.RxId = UdsClient.RxId if RxId is None else RxId
+        self.IsCanFD = UdsClient.IsCanFD
+        self.timing = UdsClient.timing
+        self.poll_interval = poll_interval
+        self._rx_queue: Optional[asyncio.Queue] = None
+        self._request_lock: Optional[asyncio.Lock] = None
+        self._reader: Optional[_ChannelReader] = None
+        self._tp_task: Optional[asyncio.Task] = None
+        self._last_activity = 0.0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def start(self):
+        """Subscribe to the receive thread of the CAN channel"""
+        if self._reader is not None:
+            return
+        self._rx_queue = asyncio.Queue()
+        self._request_lock = asyncio.Lock()
+        self._reader = _ChannelReader.subscribe(self.Uds, self.RxId, self._rx_queue, self.poll_interval)
+
+    async def stop(self):
+        """Stop the TesterPresent task and unsubscribe from the receive thread"""
+        if self._tp_task is not None:
+            self._tp_task.cancel()
+            try:
+                await self._tp_task
+            except asyncio.CancelledError:
+                pass
+        self._tp_task = None
+
+        reader, self._reader = self._reader, None
+        if reader is not None and reader.unsubscribe(self.RxId):
+            # Last client of the channel => wait for the end of the receive thread
+            await asyncio.get_running_loop().run_in_executor(None, reader.thread.join, 1.0)
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def _write(self, frame, can_id: Optional[int] = None) -> bool:
+        self._last_activity = asyncio.get_running_loop().time()
+        return self.Uds.WriteMessages(self.TxId if can_id is None else can_id, frame)
+
+    def _drain(self):
+        """Drop frames received outside of a request (late responses)"""
+        while not self._rx_queue.empty():
+            self._rx_queue.get_nowait()
+
+    async def _get_frame(self, timeout: float):
+        return await asyncio.wait_for(self._rx_queue.get(), max(0.0, timeout))
+
+    async def _send(self, payload):
+        """Send an ISO-TP message, segmented transfers wait for flow control without blocking"""
+        frames = segment(payload, self.IsCanFD)
+        self._write(frames[0])
+
+        idx = 1
+        while idx < len(frames):
+            # Wait for Flow Control (FC)
+            msg = await self._get_frame(self.timing.n_bs)
+            if (msg['data'][0] >> 4) != PCI_FC:
+                continue
+            flow_status = msg['data'][0] & 0x0F
+            if flow_status == FC_WAIT:
+                continue
+            if flow_status == FC_OVFLW:
+                raise RuntimeError("Flow Control overflow received.")
+
+            block_size = msg['data'][1]
+            st_min = stmin_to_seconds(msg['data'][2])
+
+            # Send Consecutive Frames until the end of the block
+            sent = 0
+            while idx < len(frames) and (block_size == 0 or sent < block_size):
+                self._write(frames[idx])
+                idx += 1
+                sent += 1
+                await asyncio.sleep(st_min)
+
+    async def _receive(self, sid: int, p2: float, p2_star: float) -> bytes:
+        """Wait for the response of a request with the P2/P2* timing model"""
+        loop = asyncio.get_running_loop()
+        reassembler = IsoTpReassembler()
+        deadline = loop.time() + p2
+
+        while True:
+            msg = await self._get_frame(deadline - loop.time())
+            payload = reassembler.feed(msg['data'], msg['len'])
+
+            if reassembler.needs_flow_control:
+                self._write(FLOW_CONTROL_CTS)
+            if reassembler.in_progress:
+                # Segmented reception => wait N_Cr for each consecutive frame
+                deadline = max(deadline, loop.time() + self.timing.n_cr)
+                continue
+            if not payload:
+                continue
+
+            if len(payload) >= 3 and payload[0] == 0x7F and payload[1] == sid and payload[2] == 0x78:
+                # Response pending => the final response is expected within P2*
+                deadline = loop.time() + p2_star
+                continue
+
+            return payload
+
+    # ------------------------------------------------------------------
+    # Services
+    # ------------------------------------------------------------------
+    async def request(self, message, timeout: Optional[float] = None, data_offset: int = 1) -> UDSResponse:
+        """
+        Send a UDS request and await its final response.
+
+        Parameters:
+            message (bytes|list): UDS request payload (SID + parameters).
+            timeout (float): Optional P2 override in seconds.
+            data_offset (int): Number of response bytes before the service data.
+        """
+        if self._reader is None:
+            raise RuntimeError("AsyncUDSClient not started")
+
+        message = bytes(message)
+        p2, p2_star = self.timing.deadlines(message, timeout)
+
+        async with self._request_lock:
+            self._drain()
+            try:
+                await self._send(message)
+                payload = await self._receive(message[0], p2, p2_star)
+            except asyncio.TimeoutError:
+                return UDSResponse(False, error="Time out No Response")
+            except Exception as e:
+                return UDSResponse(False, error=str(e))
+
+        if payload[0] == 0x7F:
+            nrc = payload[2] if len(payload) >= 3 else None
+            return UDSResponse(False, payload, nrc, error=f"Negative response: Error code 0x{nrc:02X}" if nrc is not None else "Negative response")
+        if payload[0] != (message[0] | 0x40):
+            return UDSResponse(False, payload, error=f"Unexpected response SID 0x{payload[0]:02X}")
+        return UDSResponse(True, payload, data_offset=data_offset)
+
+    async def session(self, number: int) -> UDSResponse:
+        """DiagnosticSessionControl (0x10)"""
+        resp = await self.request([0x10, number], data_offset=2)
+        if resp.status and self.timing.read_from_session:
+            self.timing.update_from_session_response(resp.payload)
+        return resp
+
+    async def read_did(self, DID: Union[str, int]) -> UDSResponse:
+        """ReadDataByIdentifier (0x22), resp.data holds the DID value"""
+        return await self.request(b'\x22' + did_bytes(DID), data_offset=3)
+
+    async def write_did(self, DID: Union[str, int], data) -> UDSResponse:
+        """WriteDataByIdentifier (0x2E)"""
+        if len(data) == 0 or len(data) > 4095:
+            raise ValueError(f"Invalid data length: {len(data)}. Must be between 1 and 4095 bytes.")
+        return await self.request(b'\x2E' + did_bytes(DID) + bytes(data), data_offset=3)
+
+    async def routine(self, RID: Union[str, int], sub_function: int = 0x01, data=None,
+                      timeout: Optional[float] = None) -> UDSResponse:
+        """RoutineControl (0x31) : 0x01 start, 0x02 stop, 0x03 request results"""
+        message = bytes([0x31, sub_function]) + did_bytes(RID) + bytes(data or b'')
+        return await self.request(message, timeout=timeout, data_offset=4)
+
+    async def transfer(self, data, block_size: int = 0x800 - 3, block_number: int = 1) -> UDSResponse:
+        """
+        TransferData (0x36) of a complete buffer after a RequestDownload.
+
+        Parameters:
+            data (bytes): Data to download, sent in blocks of block_size bytes.
+            block_size (int): Data bytes per TransferData request.
+            block_number (int): Block sequence counter of the first block.
+        """
+        view = memoryview(bytes(data) if isinstance(data, list) else data)
+        resp = UDSResponse(False, error="No data to transfer")
+
+        for idx in range(0, len(view), block_size):
+            resp = await self.request(bytes([0x36, block_number]) + view[idx:idx + block_size], data_offset=2)
+            if not resp.status or len(resp.payload) < 2 or resp.payload[1] != block_number:
+                if resp.status:
+                    resp = UDSResponse(False, resp.payload, error=f"Wrong block sequence counter for block {block_number}")
+                logger.error(f"TransferData block {block_number} failed: {resp.error}")
+                return resp
+            block_number = (block_number + 1) & 0xFF
+
+        return resp
+
+    # ------------------------------------------------------------------
+    # TesterPresent
+    # ------------------------------------------------------------------
+    def start_tester_present(self, interval: float = 2.0, functional_id: Optional[int] = None):
+        """
+        Start an asyncio TesterPresent task sending 0x3E 0x80 (suppress positive response).
+
+        Frames are only sent when the bus has been idle for the interval. On the physical
+        address no frame is sent while a request is in progress (the request keeps the
+        session alive), on the functional address the keep-alive is independent of requests.
+        """
+        if self._tp_task is None:
+            self._tp_task = asyncio.create_task(self._tester_present(interval, functional_id),
+                                                name=f"UdsTesterPresent_{self.TxId:X}")
+
+    async def _tester_present(self, interval: float, functional_id: Optional[int]):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(max(0.0, self._last_activity + interval - loop.time()))
+            if loop.time() - self._last_activity < interval:
+                continue
+            if functional_id is None and self._request_lock.locked():
+                # The pending request keeps the session alive
+                self._last_activity = loop.time()
+                continue
+            self._write(bytes([0x02, 0x3E, 0x80]), functional_id)
+            logger.debug("TesterPresent sent")
+
+
+# Example Usage
+if __name__ == "__main__":
+    from .UDSInterface import UDSInterface
+    from .Utils import loadConfigFilePath
+
+    async def main(Uds):
+        async with AsyncUDSClient(Uds) as client:
+            client.start_tester_present()
+            print(await client.session(0x03))
+            print(await client.read_did('F190'))
+
+    asyncio.run(main(UDSInterface(FileConfig=loadConfigFilePath())))
@@ -1,8 +1,9 @@
 import os
+import re
 import mmap
 import struct
 from dataclasses import dataclass
-from typing import BinaryIO, Dict, List, Tuple, Union, Optional
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union, Optional
 
 @dataclass
 class BinaryField:
@@ -12,15 +13,138 @@ class BinaryField:
     description: str = ""
     value: Union[int, float, bytes, str] = None
 
+class BinaryLayout:
+    """
+    List of fields compiled into a single struct.Struct.
+
+    Gaps between fields are compiled as pad bytes so one unpack_from() call parses all the
+    fields. Overlapping fields are compiled into one struct.Struct per field.
+    """
+
+    def __init__(self, fields: List[BinaryField], byte_order: str = '<'):
+        self.fields = sorted(fields, key=lambda x: x.offset)
+        self.byte_order = byte_order
+        self._struct: Optional[struct.Struct] = None
+        self._structs: List[struct.Struct] = []
+        self._string_fields = [field.format.endswith('s') for field in self.fields]
+        self._compile()
+
+    def _compile(self) -> None:
+        fmt = self.byte_order
+        position = 0
+        for field in self.fields:
+            size = struct.calcsize(self.byte_order + field.format)
+            if field.offset < position:
+                # Overlapping fields => one struct per field
+                self._struct = None
+                self._structs = [struct.Struct(self.byte_order + f.format) for f in self.fields]
+                return
+            if field.offset > position:
+                fmt += f"{field.offset - position}x"
+            fmt += field.format
+            position = field.offset + size
+        self._struct = struct.Struct(fmt)
+
+    @property
+    def size(self) -> int:
+        """Size of one record (from offset 0 to the end of the last field)"""
+        if self._struct is not None:
+            return self._struct.size
+        return max((f.offset + s.size for f, s in zip(self.fields, self._structs)), default=0)
+
+    def _convert(self, values) -> Dict[str, Union[int, float, bytes, str]]:
+        results = {}
+        for field, is_string, value in zip(self.fields, self._string_fields, values):
+            if is_string:  # String type
+                value = value.decode('ascii').strip('\x00')
+            results[field.name] = value
+        return results
+
+    def unpack_from(self, buffer, offset: int = 0) -> Dict[str, Union[int, float, bytes, str]]:
+        """Parse one record of the buffer at offset"""
+        if self._struct is not None:
+            values = self._struct.unpack_from(buffer, offset)
+        else:
+            values = [s.unpack_from(buffer, offset + f.offset)[0] for f, s in zip(self.fields, self._structs)]
+        return self._convert(values)
+
+    def iter_unpack(self, buffer, offset: int = 0, count: Optional[int] = None,
+                    stride: Optional[int] = None) -> Iterator[Dict[str, Union[int, float, bytes, str]]]:
+        """Parse a table of records (record size = stride, default layout size)"""
+        stride = stride or self.size
+        if count is None:
+            count = (len(buffer) - offset) // stride
+
+        if self._struct is not None and stride == self._struct.size:
+            # Contiguous records => parsed by struct in a single pass
+            view = memoryview(buffer)[offset:offset + count * stride]
+            for values in self._struct.iter_unpack(view):
+                yield self._convert(values)
+        else:
+            for idx in range(count):
+                yield self.unpack_from(buffer, offset + idx * stride)
+
+    def numpy_dtype(self):
+        """NumPy structured dtype of the layout (vectorized parsing of record tables)"""
+        import numpy as np
+        names, formats, offsets = [], [], []
+        for field in self.fields:
+            names.append(field.name)
+            formats.append(np.dtype(self.byte_order + field.format) if not field.format.endswith('s')
+                           else np.dtype(f"S{struct.calcsize(field.format)}"))
+            offsets.append(field.offset)
+        return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': self.size})
+
+class PatternSet:
+    """
+    Set of byte patterns compiled for a single-pass search.
+
+    All the patterns are compiled into one regular expression (alternation in a lookahead,
+    longest patterns first) so the data is scanned once by the C regex engine whatever the
+    number of patterns; overlapping hits and patterns that are prefixes of others are reported.
+    """
+
+    def __init__(self, patterns: List[bytes]):
+        self.patterns = sorted({bytes(p) for p in patterns if p}, key=len, reverse=True)
+        if not self.patterns:
+            raise ValueError("No pattern to search")
+        self._regex = re.compile(b'(?=(' + b'|'.join(re.escape(p) for p in self.patterns) + b'))', re.DOTALL)
+        # Shorter patterns matching at the same offset as a longer one (not returned by the regex)
+        self._prefixes = {p: [q for q in self.patterns if len(q) < len(p) and p.startswith(q)] for p in self.patterns}
+
+    def finditer(self, buffer, start_offset: int = 0, end_offset: Optional[int] = None,
+                 alignment: int = 1) -> Iterator[Tuple[int, bytes]]:
+        """
+        Yield (offset, pattern) for every hit in buffer[start_offset:end_offset] (overlapping hits included).
+        :param alignment: Only report hits at offsets multiple of alignment
+        """
+        end_offset = len(buffer) if end_offset is None else end_offset
+        for match in self._regex.finditer(buffer, start_offset, end_offset):
+            offset = match.start()
+            if alignment > 1 and offset % alignment:
+                continue
+            pattern = match.group(1)
+            yield offset, pattern
+            for prefix in self._prefixes[pattern]:
+                yield offset, prefix
+
+    def search(self, buffer, start_offset: int = 0, end_offset: Optional[int] = None,
+               alignment: int = 1) -> Dict[bytes, List[int]]:
+        """Return {pattern: [offsets]} for all the patterns"""
+        hits: Dict[bytes, List[int]] = {p: [] for p in self.patterns}
+        for offset, pattern in self.finditer(buffer, start_offset, end_offset, alignment):
+            hits[pattern].append(offset)
+        return hits
+
 class BinaryParser:
-    """Enhanced binary file parser with large file support"""
-    
+    """Binary file parser with zero-copy (mmap / memoryview) access"""
+
     def __init__(self, file_path: str, byte_order: str = '<', buffer_size: int = 1024*1024, verbose: bool = False):
         """
-        Initialize parser with large file support
+        Initialize parser
         :param file_path: Path to binary file
         :param byte_order: '<' for little-endian, '>' for big-endian
-        :param buffer_size: Read buffer size in bytes (default: 1MB)
+        :param buffer_size: Default chunk size in bytes for iter_chunks() (default: 1MB)
         """
         self.file_path = file_path
         self.byte_order = byte_order
@@ -28,53 +152,70 @@ class BinaryParser:
         self.fields: List[BinaryField] = []
         self._file: BinaryIO = None
         self._mmap = None
+        self._view: memoryview = memoryview(b'')
         self._file_size = 0
         self._verbose = verbose
-    
+        self._layout: Optional[BinaryLayout] = None
+
     def __enter__(self):
         self.open()
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
-    
+
     def open(self) -> None:
-        """Open the binary file with memory mapping for large files"""
+        """Open the binary file with memory mapping"""
         try:
             self._file = open(self.file_path, 'rb')
             self._file_size = os.path.getsize(self.file_path)
-            
-            # Use memory mapping for files larger than 10MB
-            if self._file_size > 10*1024*1024:
+
+            # Empty files cannot be mapped
+            if self._file_size > 0:
                 self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)
             if self._verbose:
                 print(f"Opened binary file ({self._file_size:,} bytes)")
 
         except Exception as e:
             print(f"Failed to open file: {str(e)}")
             raise
-    
+
     def close(self) -> None:
         """Close the file handle and clean up"""
+        self._view.release()
+        self._view = memoryview(b'')
         if self._mmap:
-            self._mmap.close()
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views returned by view() / _read_data() are still used => closed when released
+                pass
+            self._mmap = None
         if self._file and not self._file.closed:
             self._file.close()
-        
+
         if self._verbose:
             print("Closed binary file")
-    
-    def _read_data(self, offset: int, size: int) -> bytes:
-        """Read data from either mmap or file with bounds checking"""
-        if offset + size > self._file_size:
+
+    @property
+    def size(self) -> int:
+        return self._file_size
+
+    def view(self, offset: int = 0, size: Optional[int] = None) -> memoryview:
+        """Return a zero-copy view of the file data (valid until the parser is closed)"""
+        if not self._file:
+            raise RuntimeError("File not opened")
+        if size is None:
+            size = self._file_size - offset
+        if offset < 0 or offset + size > self._file_size:
             raise ValueError(f"Read beyond file bounds (offset: {offset}, size: {size})")
-        
-        if self._mmap:
-            return self._mmap[offset:offset+size]
-        else:
-            self._file.seek(offset)
-            return self._file.read(size)
-    
+        return self._view[offset:offset+size]
+
+    def _read_data(self, offset: int, size: int) -> memoryview:
+        """Read data with bounds checking (zero-copy view, use bytes() to keep a copy after close)"""
+        return self.view(offset, size)
+
     def add_field(self, name: str, fmt: str, offset: int, description: str = "") -> None:
         """Add a field definition"""
         self.fields.append(BinaryField(
@@ -83,73 +224,107 @@ class BinaryParser:
             offset=offset,
             description=description
         ))
-    
-    def parse(self) -> Dict[str, Union[int, float, bytes, str]]:
-        """Parse all defined fields"""
-        if not (self._file or self._mmap):
+        self._layout = None
+
+    @property
+    def layout(self) -> BinaryLayout:
+        """Fields compiled into a BinaryLayout (compiled once until a field is added)"""
+        if self._layout is None:
+            self._layout = BinaryLayout(self.fields, self.byte_order)
+        return self._layout
+
+    def parse(self, base_offset: int = 0) -> Dict[str, Union[int, float, bytes, str]]:
+        """Parse all defined fields (offsets relative to base_offset)"""
+        if not self._file:
             raise RuntimeError("File not opened")
-        
-        results = {}
-        
-        for field in sorted(self.fields, key=lambda x: x.offset):
-            try:
-                format_str = self.byte_order + field.format
-                size = struct.calcsize(format_str)
-                data = self._read_data(field.offset, size)
-                
-                if field.format.endswith('s'):  # String type
-                    field.value = data.decode('ascii').strip('\x00')
-                else:
-                    field.value = struct.unpack(format_str, data)[0]
-                
-                results[field.name] = field.value
-                print(f"Parsed {field.name} = {field.value} at offset {field.offset}")
-            
-            except Exception as e:
-                print(f"Failed to parse field {field.name}: {str(e)}")
-                raise
-        
+
+        layout = self.layout
+        if base_offset + layout.size > self._file_size:
+            raise ValueError(f"Read beyond file bounds (offset: {base_offset}, size: {layout.size})")
+
+        try:
+            results = layout.unpack_from(self._view, base_offset)
+        except Exception as e:
+            print(f"Failed to parse fields: {str(e)}")
+            raise
+
+        for field in layout.fields:
+            field.value = results[field.name]
+            if self._verbose:
+                print(f"Parsed {field.name} = {field.value} at offset {base_offset + field.offset}")
+
         return results
-    
-    def read_all(self, chunk_size: Optional[int] = None) -> bytes:
-        """Read entire file content (optionally in chunks)"""
-        if not (self._file or self._mmap):
+
+    def parse_records(self, offset: int, count: Optional[int] = None, stride: Optional[int] = None,
+                      layout: Optional[BinaryLayout] = None) -> List[Dict[str, Union[int, float, bytes, str]]]:
+        """
+        Parse a table of repeated records (record layout = defined fields by default).
+
+        :param offset: Offset of the first record
+        :param count: Number of records (default: up to the end of the file)
+        :param stride: Record size (default: layout size)
+        """
+        layout = layout or self.layout
+        return list(layout.iter_unpack(self._view, offset, count, stride))
+
+    def parse_records_array(self, offset: int, count: Optional[int] = None, layout: Optional[BinaryLayout] = None):
+        """Parse a table of records into a NumPy structured array (zero-copy, valid until close)"""
+        import numpy as np
+        layout = layout or self.layout
+        dtype = layout.numpy_dtype()
+        if count is None:
+            count = (self._file_size - offset) // dtype.itemsize
+        return np.frombuffer(self._view, dtype=dtype, count=count, offset=offset)
+
+    def read_all(self, chunk_size: Optional[int] = None) -> Union[bytes, Iterator[memoryview]]:
+        """Read entire file content as a copy (or return an iterator of zero-copy chunks if chunk_size is given), see view()"""
+        if not self._file:
             raise RuntimeError("File not opened")
-        
-        if self._mmap:
-            return self._mmap[:]
-        
-        self._file.seek(0)
+
         if chunk_size:
-            while True:
-                chunk = self._file.read(chunk_size)
-                if not chunk:
-                    break
-                yield chunk
-        else:
-            return self._file.read()
-    
+            return self.iter_chunks(chunk_size)
+        return bytes(self._view)
+
+    def iter_chunks(self, chunk_size: Optional[int] = None) -> Iterator[memoryview]:
+        """Iterate over the file content by zero-copy chunks"""
+        chunk_size = chunk_size or self.buffer_size
+        for offset in range(0, self._file_size, chunk_size):
+            yield self._view[offset:offset + chunk_size]
+
     def find_pattern(self, pattern: bytes, start_offset: int = 0) -> int:
         """Find byte pattern in file, returns offset or -1 if not found"""
-        if self._mmap:
-            return self._mmap.find(pattern, start_offset)
-        else:
-            # For non-mmap files, read in chunks
-            chunk_size = max(len(pattern), self.buffer_size)
-            self._file.seek(start_offset)
-            
-            while True:
-                chunk = self._file.read(chunk_size)
-                if not chunk:
-                    return -1
-                
-                pos = chunk.find(pattern)
-                if pos >= 0:
-                    return self._file.tell() - len(chunk) + pos
-                
-                # Handle pattern crossing chunk boundaries
-                if len(chunk) >= len(pattern):
-                    self._file.seek(self._file.tell() - len(pattern) + 1)
+        if not self._mmap:
+            return -1
+        return self._mmap.find(pattern, start_offset)
+
+    def find_patterns(self, patterns: Union[List[bytes], PatternSet], start_offset: int = 0,
+                      end_offset: Optional[int] = None, alignment: int = 1) -> Dict[bytes, List[int]]:
+        """
+        Find all the hits of several byte patterns in one pass over the file.
+
+        :param patterns: Byte patterns (or a PatternSet compiled once for several files)
+        :param alignment: Only report hits at offsets multiple of alignment (e.g. 4 for 32-bit aligned headers)
+        :return: {pattern: [offsets]}
+        """
+        pattern_set = patterns if isinstance(patterns, PatternSet) else PatternSet(patterns)
+        if not self._mmap:
+            return {p: [] for p in pattern_set.patterns}
+        return pattern_set.search(self._mmap, start_offset, end_offset, alignment)
+
+def find_patterns_in_files(file_paths: List[str], patterns: List[bytes],
+                           alignment: int = 1) -> Dict[str, Dict[bytes, List[int]]]:
+    """
+    Search several byte patterns in several binary files (e.g. a release folder of firmware images).
+    The patterns are compiled once, each file is mapped and scanned once.
+
+    :return: {file path: {pattern: [offsets]}}
+    """
+    pattern_set = PatternSet(patterns)
+    results = {}
+    for file_path in file_paths:
+        with BinaryParser(file_path) as parser:
+            results[file_path] = parser.find_patterns(pattern_set, alignment=alignment)
+    return results
 
 # Usage Example
 if __name__ == "__main__":
@@ -158,16 +333,16 @@ if __name__ == "__main__":
         parser.add_field("header", "4s", 0, "File header magic")
         parser.add_field("file_size", "I", 4, "Total file size")
         parser.add_field("entry_count", "Q", 8, "Number of entries")
-        
+
         # Parse specific fields
         header_data = parser.parse()
         print("Header data:", header_data)
-        
+
         # Read entire file in chunks
         print("\nReading entire file in chunks:")
         for chunk in parser.read_all(chunk_size=1024*1024):  # 1MB chunks
             print(f"Read chunk of {len(chunk):,} bytes")
-        
+
         # Alternative: read entire file at once
         # full_content = parser.read_all()
-        # print(f"\nRead {len(full_content):,} bytes total")
\ No newline at end of file
+        # print(f"\nRead {len(full_content):,} bytes total")
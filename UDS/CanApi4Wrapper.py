@@ -1,9 +1,14 @@
 from .CanApi4 import *
+from . import CanApi4 as CanApi4_module
+from .UDSConfig import UDSConfig
 from .Utils import *
 
 class CanApi4Wrapper:
     def __init__(self, device=None, client_name=None, net_name=None, IsCanFD=None, \
-                 TxID=None, RxID=None, IsExtended=None, IsFiltered=None, IsPadded=None, FileConfig=None):
+                 TxID=None, RxID=None, IsExtended=None, IsFiltered=None, IsPadded=None, FileConfig=None, Profile=None):
+        """
+        FileConfig is a config file or a loaded UDSConfig, Profile a profile name of this config (None: CanConfig).
+        """
         self.comOk = False
 
         self.device = device
@@ -21,7 +26,14 @@ class CanApi4Wrapper:
 
         # get the configuration from file
         if FileConfig != None:
-            load_config(self, globals(), FileConfig, Encode=True)
+            UDSConfig.load(FileConfig).channel(Profile).apply(self)
+
+        # Constant (e.g. 'pcan_usb') and bytes expected by CanApi4
+        if isinstance(self.device, str):
+            self.device = getattr(CanApi4_module, self.device) if hasattr(CanApi4_module, self.device) else self.device.encode()
+        for itemName in ('client_name', 'net_name'):
+            if isinstance(getattr(self, itemName), str):
+                setattr(self, itemName, getattr(self, itemName).encode())
         NoneData = []
         for itemName in self.__dict__.keys():
             if getattr(self, itemName) is None:
@@ -133,8 +145,8 @@ class CanApi4Wrapper:
         return size if 0 <= size <= max_dlc else None
 
     def write(self, can_id, data):
-        if not isinstance(data, list):
-            print("Error: Data must be a list of bytes.")
+        if not isinstance(data, (list, bytes, bytearray, memoryview)):
+            print("Error: Data must be a list of bytes or a bytes buffer.")
             return False
 
         if self.IsCanFD:
@@ -0,0 +1,185 @@
+import os
+import struct
+import xml.etree.ElementTree as ET
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+from .Utils import find_recursive, find_recursive_Value, remove_namespace
+
+# DTC status bits (ISO 14229-1 D.2)
+DTC_STATUS_BITS = (
+    'testFailed',
+    'testFailedThisOperationCycle',
+    'pendingDTC',
+    'confirmedDTC',
+    'testNotCompletedSinceLastClear',
+    'testFailedSinceLastClear',
+    'testNotCompletedThisOperationCycle',
+    'warningIndicatorRequested',
+)
+
+_DTC_RECORD = struct.Struct('>I')
+
+
+def dtc_to_str(code: int) -> str:
+    """Format a 3-byte DTC as ISO 15031-6 code + failure type byte (e.g. 'P0A1B-12')"""
+    return f"{'PCBU'[(code >> 22) & 0x3]}{(code >> 20) & 0x3}{(code >> 8) & 0xFFF:03X}-{code & 0xFF:02X}"
+
+
+def status_bits(status: int) -> List[str]:
+    """Names of the status bits set"""
+    return [name for bit, name in enumerate(DTC_STATUS_BITS) if status & (1 << bit)]
+
+
+def decode_dtc_records(data) -> Tuple[array, bytes]:
+    """
+    Decode the DTCAndStatusRecords of a 0x59 0x02 response (DTC high, middle, low, status).
+
+    Returns:
+        (codes, status): array of the 3-byte DTC numbers and the status byte of each DTC.
+    """
+    view = memoryview(data)
+    view = view[:len(view) - len(view) % 4]
+    codes = array('I', [word >> 8 for (word,) in _DTC_RECORD.iter_unpack(view)])
+    return codes, view[3::4].tobytes()
+
+
+@dataclass
+class DemDtc:
+    """DTC of the Dem configuration (ARXML)"""
+    name: str
+    code: int
+    events: List[str] = field(default_factory=list)
+
+
+def load_dem_config(arxml_files: List[str]) -> Dict[int, DemDtc]:
+    """
+    Extract the DTCs of the Dem configuration from ARXML files (e.g. the Dem_*.arxml of PathToArxmlList):
+    DemDTC containers (DemDtcValue) and the DemEventParameter referencing them (DemDTCRef).
+
+    Returns:
+        dict: {DTC number: DemDtc}
+    """
+    dtc_by_name: Dict[str, DemDtc] = {}
+    event_refs: List[Tuple[str, str]] = []
+
+    for file_path in arxml_files:
+        if not os.path.isfile(file_path):
+            print(f"ARXML file not found : {file_path}")
+            continue
+
+        tree, _ = remove_namespace(ET.parse(file_path))
+        for data in tree.getroot().iter("ECUC-CONTAINER-VALUE"):
+            def_Val = data.find("DEFINITION-REF")
+            if def_Val is None or def_Val.text is None:
+                continue
+
+            if def_Val.text.endswith("/DemConfigSet/DemDTC"):
+                dtc_value = find_recursive_Value(data, "DEFINITION-REF", "DemDtcValue")
+                if dtc_value is not None:
+                    name = find_recursive(data, "SHORT-NAME").text
+                    dtc_by_name[name] = DemDtc(name, int(dtc_value, 0))
+
+            elif def_Val.text.endswith("/DemConfigSet/DemEventParameter"):
+                dtc_ref = find_recursive_Value(data, "DEFINITION-REF", "DemDTCRef")
+                if dtc_ref is not None:
+                    event_refs.append((find_recursive(data, "SHORT-NAME").text, dtc_ref.split('/')[-1]))
+
+    for event_name, dtc_name in event_refs:
+        if dtc_name in dtc_by_name:
+            dtc_by_name[dtc_name].events.append(event_name)
+
+    return {dtc.code: dtc for dtc in dtc_by_name.values()}
+
+
+@dataclass
+class DtcList:
+    """DTCs of a ReadDTCInformation response, kept as compact arrays"""
+    availability_mask: int
+    codes: array = field(default_factory=lambda: array('I'))
+    status: bytes = b''
+
+    @classmethod
+    def from_response(cls, response) -> "DtcList":
+        """Decode a 0x59 0x02 response [0x59, 0x02, availability mask, records...]"""
+        codes, status = decode_dtc_records(memoryview(response)[3:])
+        return cls(response[2], codes, status)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.codes, self.status)
+
+    def with_status(self, mask: int) -> "DtcList":
+        """DTCs having at least one of the status bits of mask"""
+        selected = [index for index, status in enumerate(self.status) if status & mask]
+        return DtcList(self.availability_mask, array('I', [self.codes[i] for i in selected]),
+                       bytes(self.status[i] for i in selected))
+
+    def records(self, dem: Optional[Dict[int, DemDtc]] = None) -> List[dict]:
+        """Expanded records for the reports, mapped to the Dem configuration if given"""
+        records = []
+        for code, status in self:
+            dem_dtc = dem.get(code) if dem else None
+            records.append({'DTC': f"0x{code:06X}",
+                            'Code': dtc_to_str(code),
+                            'Status': f"0x{status:02X}",
+                            'Status bits': status_bits(status),
+                            'Name': dem_dtc.name if dem_dtc else '',
+                            'Events': dem_dtc.events if dem_dtc else []})
+        return records
+
+
+def decode_snapshot_records(data, sizes: Optional[Dict[str, int]] = None) -> List[dict]:
+    """
+    Decode the snapshot records of a 0x59 0x04 response (data after the DTC and status bytes):
+    [record number, number of identifiers, (DID, data)...]...
+
+    The size of each DID is needed to split the records (see DynamicDID.load_did_sizes()). If a size is
+    unknown, the rest of the record is returned as the data of this DID.
+    """
+    view = memoryview(data)
+    records = []
+    offset = 0
+    while offset + 2 <= len(view):
+        record = {'Record': view[offset], 'DIDs': {}}
+        count = view[offset + 1]
+        offset += 2
+        for _ in range(count):
+            if offset + 2 > len(view):
+                break
+            DID = view[offset:offset + 2].hex().upper()
+            size = (sizes or {}).get(DID)
+            end = len(view) if size is None else offset + 2 + size
+            record['DIDs'][DID] = view[offset + 2:end].tobytes()
+            offset = end
+        records.append(record)
+    return records
+
+
+def decode_extended_data_records(data, sizes: Optional[Dict[int, int]] = None) -> Dict[int, bytes]:
+    """
+    Decode the extended data records of a 0x59 0x06 response (data after the DTC and status bytes):
+    [record number, data]...
+
+    sizes gives the size of each record number, needed to split several records (0xFE / 0xFF).
+    Without it the data after the first record number is returned as one record.
+    """
+    view = memoryview(data)
+    records = {}
+    offset = 0
+    while offset < len(view):
+        number = view[offset]
+        size = (sizes or {}).get(number)
+        end = len(view) if size is None else offset + 1 + size
+        records[number] = view[offset + 1:end].tobytes()
+        offset = end
+    return records
+
+
+# Example Usage
+if __name__ == "__main__":
+    dtcs = DtcList.from_response(bytes([0x59, 0x02, 0xFF, 0x0A, 0x1B, 0x12, 0x2F, 0xC1, 0x00, 0x00, 0x08]))
+    for record in dtcs.records():
+        print(record)
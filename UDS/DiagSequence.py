@@ -0,0 +1,680 @@
+import logging
+import operator
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from .UDSCodec import RC_RESULT, RC_START, RC_STOP, encode_read_did, encode_routine_control, encode_write_did
+from .Utils import is_hex, is_int, poll_until, str_to_hexList, wait_ms
+
+logger = logging.getLogger(__name__)
+
+# (status, data, error) written in the Status / Data / Error columns of the sheet
+StepResult = Tuple[str, str, str]
+
+LOOP_START = 'LOOP_START'
+LOOP_END = 'LOOP_END'
+TARGET = 'TARGET'
+
+# TARGET of a sheet: (TxId, RxId) on the default CAN channel, ECU name of the EcuList, profile name or config file (.yml)
+Target = Union[Tuple[int, int], str]
+
+RESET_TYPES = {'1101': 0x1, '1102': 0x2, '1103': 0x3}
+SESSION_TYPES = {'1001': 0x1, '1002': 0x2, '1003': 0x3}
+
+# Default deadline of WAIT_UNTIL (seconds)
+WAIT_UNTIL_TIMEOUT = 5.0
+
+
+class DiagSequenceError(ValueError):
+    """Invalid rows of a diagnostic sequence, detected before any request is sent"""
+
+    def __init__(self, name: str, errors: List[Tuple[int, str]]):
+        self.name = name
+        self.errors = errors
+        super().__init__(f"{name}: " + "; ".join(f"line {row} => {error}" for row, error in errors))
+
+
+@dataclass
+class DiagContext:
+    """State of a running sequence"""
+    Uds: Any
+    variables: Dict[str, bytes] = field(default_factory=dict)
+    results: Dict[int, StepResult] = field(default_factory=dict)
+    result: StepResult = ('', '', '')   # Result of the last UDS request
+    response: bytes = b''               # Raw response of the last UDS request (SID first)
+
+
+Executor = Callable[[DiagContext], StepResult]
+
+
+@dataclass
+class DiagStep:
+    """One row of a diagnostic sequence, compiled"""
+    row: int
+    command: str
+    execute: Optional[Executor] = None
+    request: Optional[bytes] = None   # UDS request encoded once and sent as it is (None: local command, data with variables,
+                                      # session / reset requests built by the UDSInterface service)
+    count: int = 0                    # LOOP_START: number of iterations
+    target: int = -1                  # LOOP_START: step of its LOOP_END, LOOP_END: first step of the loop
+    sends: bool = False               # True for a UDS request (result kept for SET / WAIT_UNTIL)
+
+
+@dataclass
+class DiagSequence:
+    """Executable plan of a DIAG_SEQ sheet: the loops are resolved to jumps between steps"""
+    name: str
+    steps: List[DiagStep] = field(default_factory=list)
+    target: Optional[Target] = None   # None: default UDSInterface
+    target_row: int = -1
+
+    def run(self, Uds, on_result: Optional[Callable[[int, StepResult], None]] = None,
+            variables: Optional[Dict[str, bytes]] = None) -> Dict[int, StepResult]:
+        """
+        Execute the steps on a UDSInterface (or EcuSession).
+
+        Parameters:
+            variables (dict): Initial values of the variables ({name: bytes}).
+
+        Returns:
+            dict: {row: (status, data, error)} of the executed rows, last iteration of a loop.
+        """
+        ctx = DiagContext(Uds, dict(variables or {}))
+        results = ctx.results
+        steps = self.steps
+        counters: List[int] = []
+        pc = 0
+        while pc < len(steps):
+            step = steps[pc]
+            if step.command == LOOP_START:
+                counters.append(step.count)
+            elif step.command == LOOP_END:
+                counters[-1] -= 1
+                if counters[-1] > 0:
+                    pc = step.target
+                    continue
+                counters.pop()
+            else:
+                result = _execute(step, ctx)
+                results[step.row] = result
+                if on_result is not None:
+                    on_result(step.row, result)
+            pc += 1
+        return results
+
+
+def _execute(step: DiagStep, ctx: DiagContext) -> StepResult:
+    if step.sends:
+        # No response kept from the previous request if this one fails before receiving one
+        ctx.Uds.last_response = None
+    try:
+        result = step.execute(ctx)
+    except Exception as e:
+        result = ('NOK', '', str(e))
+    if step.sends:
+        response = getattr(ctx.Uds, 'last_response', None)
+        ctx.result = result
+        ctx.response = bytes(response) if response is not None else b''
+    return result
+
+
+@dataclass
+class _CompileState:
+    """Compilation of one sequence: variables defined so far and last compiled step"""
+    variables: Set[str] = field(default_factory=set)
+    previous: Optional[DiagStep] = None
+
+
+def _text(row: dict, column: str) -> str:
+    value = row.get(column, '')
+    return '' if value is None else str(value).strip()
+
+
+def _did(row: dict) -> str:
+    DID = _text(row, 'DID').upper()
+    encode_read_did(DID)  # Validate the DID
+    return DID
+
+
+def _data(row: dict, required: bool = True) -> List[int]:
+    data = str_to_hexList(_text(row, 'Data'), ';')
+    if required and len(data) == 0:
+        raise ValueError(f"No data defined : {_text(row, 'Data')}")
+    return data
+
+
+def _to_bytes(value) -> bytes:
+    return bytes([value]) if isinstance(value, int) else bytes(value)
+
+
+def _hex_list(value: bytes) -> str:
+    """Data column format (same as Pcan_ReadDID)"""
+    return ";".join(hex(byte) for byte in value)
+
+
+# Operand of the SET / WAIT_UNTIL expressions and of the $variables of the Data column:
+# Status, Data (Data column of the last request), Response (raw response) or $NAME, with an optional [i] or [i:j]
+_OPERAND = re.compile(r'^(?:(Status|Data|Response)|\$(\w+))(?:\[(-?\d*)(:?)(-?\d*)\])?$', re.IGNORECASE)
+
+_OPERATORS = {'==': operator.eq, '!=': operator.ne, '<=': operator.le, '>=': operator.ge,
+              '<': operator.lt, '>': operator.gt}
+_CONDITION = re.compile(r'^(.+?)\s*(==|!=|<=|>=|<|>)\s*(.+)$')
+
+
+def _operand(text: str, state: _CompileState) -> Optional[Callable[[DiagContext], Union[str, int, bytes]]]:
+    """Getter of an operand, None if text is not an operand"""
+    match = _OPERAND.match(text.strip())
+    if match is None:
+        return None
+    source, variable, start, is_slice, end = match.groups()
+
+    if variable is not None:
+        if variable not in state.variables:
+            raise ValueError(f"Variable ${variable} used before SET")
+        get = lambda ctx: ctx.variables[variable]
+    elif source.lower() == 'status':
+        if match.group(3) is not None:
+            raise ValueError("Status can not be indexed")
+        return lambda ctx: ctx.result[0]
+    elif source.lower() == 'data':
+        get = lambda ctx: bytes(str_to_hexList(ctx.result[1], ';'))
+    else:
+        get = lambda ctx: ctx.response
+
+    if match.group(3) is None:
+        return get
+    if is_slice:
+        index = slice(int(start) if start else None, int(end) if end else None)
+    elif start and not end:
+        index = int(start)
+    else:
+        raise ValueError(f"Invalid index : {text}")
+    return lambda ctx: get(ctx)[index]
+
+
+def _payload(row: dict, state: _CompileState, required: bool = True) -> Tuple[Callable[[DiagContext], List[int]], Optional[List[int]]]:
+    """
+    Data of a request: (getter, static data). The Data column can use the variables
+    ('$KEY', '0x01;$SEED[0:2]'), the data is then built at each execution and static data is None.
+    """
+    text = _text(row, 'Data')
+    if '$' not in text:
+        data = _data(row, required)
+        return (lambda ctx: data), data
+
+    parts = []
+    for token in text.split(';'):
+        token = token.strip()
+        if token.startswith('$'):
+            get = _operand(token, state)
+            if get is None:
+                raise ValueError(f"Invalid variable : {token}")
+            parts.append(get)
+        elif token:
+            parts.append(lambda ctx, value=bytes(str_to_hexList(token, ';')): value)
+
+    def build(ctx):
+        data = []
+        for get in parts:
+            data.extend(_to_bytes(get(ctx)))
+        return data
+    return build, None
+
+
+def _check_length(data: Optional[List[int]], max_length: int) -> None:
+    if data is not None and len(data) > max_length:
+        raise ValueError(f"Invalid data length: {len(data)}. Must be between 1 and {max_length} bytes.")
+
+
+def _result(retVal) -> StepResult:
+    """[status, data, error] of the UDSInterface services"""
+    return str(retVal[0]), str(retVal[1]), str(retVal[2])
+
+
+# Dispatch table: command => (compile(row, state) returning (executor, encoded request), UDS request)
+_COMPILERS: Dict[str, Tuple[Callable[[dict, _CompileState], Tuple[Executor, Optional[bytes]]], bool]] = {}
+
+
+def _command(*names: str, sends: bool = True):
+    def register(compile_row):
+        for name in names:
+            _COMPILERS[name] = (compile_row, sends)
+        return compile_row
+    return register
+
+
+@_command('RDBI')
+def _compile_read_did(row, state):
+    DID = _did(row)
+    size = _text(row, 'Size')
+    if size != '' and not is_int(size):
+        raise ValueError(f"Size is not an integer {size}")
+    request = bytes(encode_read_did(DID))
+    return (lambda ctx: ctx.Uds.Pcan_ReadDID(DID, size, request)), request
+
+
+@_command('WDBI')
+def _compile_write_did(row, state):
+    DID = _did(row)
+    data, static = _payload(row, state)
+    _check_length(static, 4095)
+    request = None if static is None else bytes(encode_write_did(DID, static))
+
+    def execute(ctx):
+        retVal = ctx.Uds.WriteDID(DID, data(ctx), request)
+        return ('OK', '', '') if retVal[1] == True else ('NOK', '', str(retVal[2]))
+    return execute, request
+
+
+@_command('RC_START')
+def _compile_start_rc(row, state):
+    DID = _did(row)
+    data, static = _payload(row, state, required=False)
+    request = None if static is None else bytes(encode_routine_control(RC_START, DID, static))
+    return (lambda ctx: _result(ctx.Uds.StartRC(DID, data(ctx), message=request))), request
+
+
+@_command('RC_STOP')
+def _compile_stop_rc(row, state):
+    DID = _did(row)
+    request = bytes(encode_routine_control(RC_STOP, DID))
+    return (lambda ctx: _result(ctx.Uds.StopRC(DID, request))), request
+
+
+@_command('RC_RESULT')
+def _compile_result_rc(row, state):
+    DID = _did(row)
+    request = bytes(encode_routine_control(RC_RESULT, DID))
+    return (lambda ctx: _result(ctx.Uds.ResultRC(DID, request))), request
+
+
+@_command('CLEAR_DTC')
+def _compile_clear_dtc(row, state):
+    data, static = _payload(row, state)
+    _check_length(static, 3)
+    request = None if static is None else bytes([0x14] + static)
+
+    def execute(ctx):
+        retVal = ctx.Uds.ClearDTC(data(ctx), request)
+        return ('OK', '', '') if retVal[1] == True else ('NOK', '', str(retVal[2]))
+    return execute, request
+
+
+@_command('READ_DTC')
+def _compile_read_dtc(row, state):
+    mask = _text(row, 'Data')
+    _data(row, required=False)  # Validate the status mask
+    return (lambda ctx: ctx.Uds.Pcan_ReadDTCs(mask)), None
+
+
+@_command('SW_RESET')
+def _compile_reset(row, state):
+    reset = RESET_TYPES.get(_text(row, 'DID'))
+    if reset is None:
+        raise ValueError(f"Reset command not reconized : {_text(row, 'DID')}")
+
+    def execute(ctx):
+        status, error = ctx.Uds.StartReset(reset)
+        return status, '', error
+    return execute, None
+
+
+def _compile_session(row, state):
+    session = SESSION_TYPES.get(_text(row, 'DID'))
+    if session is None:
+        raise ValueError(f"Session command not reconized : {_text(row, 'DID')}")
+
+    def execute(ctx):
+        status, error = ctx.Uds.StartSession(session)
+        return status, '', error
+    return execute, None
+
+
+@_command('REQUEST_DOWNLOAD', 'SECURE_ACCESS', 'TESTER_PRESENT', 'TRANSFERT_DATA')
+def _compile_write_data(row, state):
+    data, static = _payload(row, state)
+    _check_length(static, 4095)
+    request = None if static is None else bytes(static)
+    return (lambda ctx: _result(ctx.Uds.WriteData(data(ctx) if request is None else request))), request
+
+
+@_command('WAIT', sends=False)
+def _compile_wait(row, state):
+    delay_ms = float(_text(row, 'Data')) * 1000
+
+    def execute(ctx):
+        wait_ms(delay_ms)
+        return 'OK', '', ''
+    return execute, None
+
+
+@_command('SET', sends=False)
+def _compile_set(row, state):
+    """SET  Data: 'NAME = <operand or hex data>' (e.g. 'SEED = Response[2:]', 'COUNTER = 0x00;0x01')"""
+    match = re.match(r'^(\w+)\s*=\s*([^=].*)$', _text(row, 'Data'))
+    if match is None:
+        raise ValueError(f"Invalid SET, expected 'NAME = value' : {_text(row, 'Data')}")
+    name, value = match.group(1), match.group(2).strip()
+
+    get = _operand(value, state)
+    if get is None:
+        constant = bytes(str_to_hexList(value, ';'))
+        get = lambda ctx: constant
+    elif value.lower() == 'status':
+        raise ValueError("Status can not be stored in a variable")
+    state.variables.add(name)
+
+    def execute(ctx):
+        ctx.variables[name] = _to_bytes(get(ctx))
+        return 'OK', _hex_list(ctx.variables[name]), ''
+    return execute, None
+
+
+def _condition(text: str, state: _CompileState) -> Callable[[DiagContext], bool]:
+    """'Status == ROUTINE_FINISHED_OK', 'Data[0] >= 0x02', 'Response[3:5] != $OLD' ..."""
+    match = _CONDITION.match(text)
+    if match is None:
+        raise ValueError(f"Invalid condition : {text}")
+    left, compare, right = _operand(match.group(1), state), _OPERATORS[match.group(2)], match.group(3).strip()
+    if left is None:
+        raise ValueError(f"Invalid operand : {match.group(1)}")
+
+    right_operand = _operand(right, state)
+    if right_operand is not None:
+        return lambda ctx: compare(left(ctx), right_operand(ctx))
+
+    # Constant converted once to the type of the left operand (text, byte or bytes)
+    number = int(right, 16 if right.lower().startswith('0x') else 10) if re.match(r'^(0x[0-9a-fA-F]+|\d+)$', right) else None
+    try:
+        data = bytes(str_to_hexList(right, ';'))
+    except ValueError:
+        data = None
+
+    def evaluate(ctx):
+        value = left(ctx)
+        if isinstance(value, str):
+            return compare(value, right)
+        if isinstance(value, int):
+            if number is None:
+                raise ValueError(f"{right} is not a number")
+            return compare(value, number)
+        if data is None:
+            raise ValueError(f"{right} is not hex data")
+        return compare(bytes(value), data)
+    return evaluate
+
+
+@_command('WAIT_UNTIL', sends=False)
+def _compile_wait_until(row, state):
+    """
+    WAIT_UNTIL  Data: condition, Size: deadline in seconds (default 5)
+    The previous request is repeated (exponential backoff) until the condition is true.
+    """
+    previous = state.previous
+    if previous is None or not previous.sends:
+        raise ValueError("WAIT_UNTIL must follow a UDS request")
+    condition = _condition(_text(row, 'Data'), state)
+    timeout = float(_text(row, 'Size')) if _text(row, 'Size') else WAIT_UNTIL_TIMEOUT
+
+    def repeat(ctx):
+        ctx.results[previous.row] = _execute(previous, ctx)
+        return ctx
+
+    def execute(ctx):
+        if condition(ctx):
+            return 'OK', '', ''
+        done, _ = poll_until(lambda: repeat(ctx), condition, timeout=timeout, initial_delay=0.02, max_delay=0.5)
+        if done:
+            return 'OK', '', ''
+        return 'NOK', '', f"Time out {timeout}s => {ctx.result[0]} {ctx.result[2]}".rstrip()
+    return execute, None
+
+
+def _is_config_file(target: Optional[Target]) -> bool:
+    return isinstance(target, str) and target.lower().endswith(('.yml', '.yaml'))
+
+
+def _parse_target(text: str) -> Target:
+    """'6B4;694' (TxId;RxId in hex), 'Config_Bench2.yml' or an ECU / profile name (EcuList / Profiles config sections)"""
+    if text == '':
+        raise ValueError("No target defined")
+    if _is_config_file(text):
+        return text
+    ids = [item.strip() for item in text.split(';')]
+    if len(ids) == 2 and all(is_hex(item) for item in ids):
+        return int(ids[0], 16), int(ids[1], 16)
+    return text
+
+
+def _get_compiler(command: str):
+    compiler = _COMPILERS.get(command)
+    if compiler is None and command.endswith('SESSION'):
+        compiler = (_compile_session, True)
+    return compiler
+
+
+def compile_sequence(rows: Iterable[dict], name: str = '') -> DiagSequence:
+    """
+    Compile the rows of a DIAG_SEQ sheet (dicts with the Command, DID, Size and Data columns)
+    into a DiagSequence. All the rows are validated before anything is sent: the DIDs and data
+    are parsed and the static requests encoded once (sent as they are), LOOP_START / LOOP_END are paired (loops can be
+    nested), the variables must be SET before they are used.
+
+    Raises:
+        DiagSequenceError: With the list of (row, error) of the invalid rows.
+    """
+    sequence = DiagSequence(name)
+    state = _CompileState()
+    errors: List[Tuple[int, str]] = []
+    open_loops: List[int] = []
+
+    for row, line in enumerate(rows):
+        command = _text(line, 'Command').upper()
+        if command == '':
+            continue  # Empty line
+
+        step = DiagStep(row, command)
+        try:
+            if command == TARGET:
+                if sequence.steps or sequence.target is not None:
+                    raise ValueError("TARGET must be the first command of the sequence")
+                sequence.target = _parse_target(_text(line, 'Data'))
+                sequence.target_row = row
+                continue
+
+            elif command == LOOP_START:
+                if not is_int(_text(line, 'Data')) or int(_text(line, 'Data')) < 1:
+                    raise ValueError(f"Loop count must be a positive integer : {_text(line, 'Data')}")
+                step.count = int(_text(line, 'Data'))
+                open_loops.append(len(sequence.steps))
+
+            elif command == LOOP_END:
+                if not open_loops:
+                    raise ValueError("LOOP_END without LOOP_START")
+                start = open_loops.pop()
+                sequence.steps[start].target = len(sequence.steps)
+                step.target = start + 1
+
+            else:
+                compiler = _get_compiler(command)
+                if compiler is None:
+                    raise ValueError(f"Command not reconized : {_text(line, 'Command')}")
+                compile_row, step.sends = compiler
+                step.execute, step.request = compile_row(line, state)
+
+        except Exception as e:
+            errors.append((row, str(e)))
+            continue
+        sequence.steps.append(step)
+        state.previous = step
+
+    for start in open_loops:
+        errors.append((sequence.steps[start].row, "LOOP_START without LOOP_END"))
+
+    if errors:
+        raise DiagSequenceError(name, sorted(errors))
+    return sequence
+
+
+def _target_name(target: Optional[Target]) -> str:
+    if target is None:
+        return 'default'
+    if isinstance(target, tuple):
+        return f"0x{target[0]:X}/0x{target[1]:X}"
+    return target
+
+
+class DiagSequenceScheduler:
+    """
+    Run compiled sequences on their targets.
+
+    The sequences of the same target run one after another in the sheet order, the targets run
+    in parallel: sheets of different ECUs of the CAN channel (EcuSession of a UDSSessionManager)
+    or of other channels (UDSInterface opened with another config file) do not wait for each other.
+
+    Example:
+        scheduler = DiagSequenceScheduler(Uds, FileConfig)
+        results = scheduler.run([compile_sequence(rows, 'DIAG_SEQ 1'), ...])
+    """
+
+    def __init__(self, UdsClient, FileConfig: Optional[str] = None):
+        """
+        Parameters:
+            UdsClient (UDSInterface): Default target, owner of the CAN channel of the (TxId, RxId) targets.
+            FileConfig (str): Config file (or UDSConfig) of UdsClient, its EcuList section gives the ECU names
+                              and its Profiles section the ECUs / CAN channels opened with their own UDSInterface.
+                              None: config of UdsClient.
+        """
+        self.Uds = UdsClient
+        self.FileConfig = FileConfig if FileConfig is not None else getattr(UdsClient, 'config', None)
+        self.manager = None
+        self.clients: Dict[Optional[Target], Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_manager(self):
+        if self.manager is None:
+            from .UDSSessionManager import UDSSessionManager
+
+            if self.FileConfig is not None:
+                self.manager = UDSSessionManager.from_config(self.Uds, self.FileConfig)
+            else:
+                self.manager = UDSSessionManager(self.Uds)
+            self.manager.start()
+        return self.manager
+
+    def _get_session(self, TxID: int, RxID: int):
+        manager = self._get_manager()
+        session = manager.sessions.get(RxID)
+        if session is None:
+            session = manager.add_session(TxID, RxID)
+        return session
+
+    def _is_profile(self, target: Optional[Target]) -> bool:
+        """Target opened with its own UDSInterface: profile of the Profiles config section (not an EcuList name)"""
+        if not isinstance(target, str) or _is_config_file(target) or self.FileConfig is None:
+            return False
+        from .UDSConfig import UDSConfig
+
+        config = UDSConfig.load(self.FileConfig)
+        return target in config.profiles and all(ecu.name != target for ecu in config.ecus)
+
+    def _owns_channel(self, target: Optional[Target]) -> bool:
+        return _is_config_file(target) or self._is_profile(target)
+
+    def _resolve(self, target: Optional[Target]):
+        """UDS client of a target (created once)"""
+        if target in self.clients:
+            return self.clients[target]
+
+        if isinstance(target, tuple):
+            client = self._get_session(*target)
+        elif self._owns_channel(target):
+            from .UDSInterface import UDSInterface
+
+            if _is_config_file(target):
+                client = UDSInterface(FileConfig=target)
+            else:
+                client = UDSInterface(FileConfig=self.FileConfig, Profile=target)
+        elif isinstance(target, str):
+            client = self._get_manager().get_session(target)
+            if client is None:
+                raise ValueError(f"Unknown ECU {target} (EcuList / Profiles of the config file)")
+        else:
+            client = self.Uds
+        self.clients[target] = client
+        return client
+
+    def _run_target(self, target: Optional[Target], sequences: List[DiagSequence],
+                    results: Dict[str, Dict[int, StepResult]]) -> None:
+        try:
+            with self._lock:
+                Uds = self._resolve(target)
+        except (Exception, SystemExit) as e:
+            # SystemExit: UDSInterface exits when the config or the CAN channel is not valid
+            error = "UDSInterface initialization failed" if isinstance(e, SystemExit) else str(e)
+            for sequence in sequences:
+                results[sequence.name] = {sequence.target_row: ('NOK', '', f"Target {_target_name(target)} not available: {error}")}
+            return
+
+        for sequence in sequences:
+            print(f"Processing {sequence.name} => {_target_name(target)}...")
+            try:
+                sequence_results = sequence.run(Uds)
+            except SystemExit as e:
+                logger.error(f"{sequence.name} stopped: {e}")
+                sequence_results = {}
+            if sequence.target_row >= 0:
+                sequence_results[sequence.target_row] = ('OK', '', _target_name(target))
+            results[sequence.name] = sequence_results
+
+    def run(self, sequences: List[DiagSequence]) -> Dict[str, Dict[int, StepResult]]:
+        """
+        Run all the sequences.
+
+        Returns:
+            dict: {sequence name: {row: (status, data, error)}}
+        """
+        groups: Dict[Optional[Target], List[DiagSequence]] = {}
+        with self._lock:
+            for sequence in sequences:
+                target = sequence.target
+                if isinstance(target, tuple) and target == (self.Uds.TxId, self.Uds.RxId):
+                    target = None
+                groups.setdefault(target, []).append(sequence)
+
+            # The CAN channel is owned by the manager => the default ECU is used through a session
+            if None in groups and any(target is not None and not self._owns_channel(target) for target in groups):
+                self.clients[None] = self._get_session(self.Uds.TxId, self.Uds.RxId)
+
+        results: Dict[str, Dict[int, StepResult]] = {}
+        try:
+            if len(groups) == 1:
+                for target, group in groups.items():
+                    self._run_target(target, group, results)
+            elif groups:
+                with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                    futures = [executor.submit(self._run_target, target, group, results)
+                               for target, group in groups.items()]
+                    for future in futures:
+                        future.result()
+        finally:
+            if self.manager is not None:
+                self.manager.stop()
+                self.manager = None
+                # The sessions end with the manager, the other channels are kept open
+                self.clients = {target: client for target, client in self.clients.items() if self._owns_channel(target)}
+        return {sequence.name: results.get(sequence.name, {}) for sequence in sequences}
+
+
+# Example Usage
+if __name__ == "__main__":
+    rows = [{'Command': 'EXTENDED_SESSION', 'DID': '1003'},
+            {'Command': 'LOOP_START', 'Data': '3'},
+            {'Command': 'RDBI', 'DID': 'F190', 'Size': '17'},
+            {'Command': 'WAIT', 'Data': '0.1'},
+            {'Command': 'LOOP_END'}]
+    sequence = compile_sequence(rows, 'DIAG_SEQ 1')
+    for step in sequence.steps:
+        print(step.row, step.command, step.request.hex() if step.request else '', step.count, step.target)
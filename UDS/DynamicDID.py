@@ -0,0 +1,158 @@
+import logging
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from .UDSCodec import HexBytes, did_bytes, encode_clear_dynamic_did, encode_define_did_by_identifier, encode_read_did
+from .Utils import is_int
+
+logger = logging.getLogger(__name__)
+
+# First DID of the ISO 14229 range reserved for the dynamically defined DIDs (F200 - F3FF)
+DEFAULT_DYNAMIC_DID = 0xF200
+
+
+def load_did_sizes(excel_file: str, sheet_name: str = 'DID Read') -> Dict[str, int]:
+    """
+    Return {DID: size} from the DID sheet created by 1_CreateDIDExcelFileFromArxml.py
+    (the sizes are the DcmDspDataSize of the ARXML). Lines without an integer size are skipped.
+    """
+    import pandas as pd
+
+    df = pd.read_excel(excel_file, sheet_name=sheet_name, dtype=str, na_values=[], keep_default_na=False)
+    return {line['DID'].upper(): int(line['Size']) for _, line in df.iterrows() if is_int(line['Size'])}
+
+
+class DynamicDidPoller:
+    """
+    Read a set of DIDs with one request: the DIDs are gathered in a dynamically defined DID
+    (DynamicallyDefineDataIdentifier 0x2C), read with a single 0x22 and the response is split
+    back into the value of each source DID.
+
+    If the ECU refuses the definition, the DIDs are read one by one (same result, one request per DID).
+
+    Example:
+        sizes = load_did_sizes('DID_Status.xlsx')
+        with DynamicDidPoller(Uds, ['F190', 'DF73', 'DF74'], sizes) as poller:
+            for timestamp, values in poller.poll(interval=0.1, count=100):
+                print(timestamp, values['DF73'])
+    """
+
+    def __init__(self, UdsClient, dids: List[str], sizes: Dict[str, int],
+                 dynamic_did: Union[str, int] = DEFAULT_DYNAMIC_DID, sources_per_request: int = 16,
+                 fallback: bool = True):
+        self.Uds = UdsClient
+        self.dynamic_did = dynamic_did
+        self.sources_per_request = max(1, sources_per_request)
+        self.fallback = fallback
+        self.defined = False
+
+        self.sources: List[Tuple[str, int]] = []
+        for DID in dids:
+            DID = did_bytes(DID).hex().upper()  # Validate the DID, 'F190' or 0xF190
+            size = sizes.get(DID)
+            if size is None:
+                raise ValueError(f"No size defined for DID {DID}")
+            if not (1 <= size <= 0xFF):
+                raise ValueError(f"DID {DID} size {size} can not be read through a dynamic DID (1 to 255 bytes)")
+            self.sources.append((DID, size))
+        self.size = sum(size for _, size in self.sources)
+        self._read_request = encode_read_did(dynamic_did)
+
+    def __enter__(self):
+        self.define()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.clear()
+
+    def define(self) -> bool:
+        """Define the dynamic DID (several 0x2C requests append the sources if needed)"""
+        # 0x2C 0x01 appends to an existing definition (e.g. left by an interrupted run) => cleared first, NRC ignored
+        self.defined = False
+        self.clear()
+
+        sources = [(DID, 1, size) for DID, size in self.sources]
+        for index in range(0, len(sources), self.sources_per_request):
+            resp = self.Uds.WriteReadRequest(
+                encode_define_did_by_identifier(self.dynamic_did, sources[index:index + self.sources_per_request]))
+            if resp['status'] != True:
+                logger.warning(f"Dynamic DID {did_bytes(self.dynamic_did).hex().upper()} definition failed => {resp['response']}")
+                self.clear()
+                if not self.fallback:
+                    raise RuntimeError(f"DynamicallyDefineDataIdentifier failed: {resp['response']}")
+                return False
+
+        self.defined = True
+        return True
+
+    def clear(self) -> None:
+        """Clear the dynamic DID on the ECU"""
+        resp = self.Uds.WriteReadRequest(encode_clear_dynamic_did(self.dynamic_did))
+        if self.defined and resp['status'] != True:
+            logger.warning(f"Dynamic DID {did_bytes(self.dynamic_did).hex().upper()} clear failed => {resp['response']}")
+        self.defined = False
+
+    def split(self, data) -> Dict[str, bytes]:
+        """Split the data of the dynamic DID into {source DID: value}"""
+        if len(data) != self.size:
+            raise ValueError(f"Dynamic DID data size {len(data)}, expected {self.size}")
+        view = memoryview(data)
+        values = {}
+        offset = 0
+        for DID, size in self.sources:
+            values[DID] = view[offset:offset + size].tobytes()
+            offset += size
+        return values
+
+    def read(self) -> Dict[str, bytes]:
+        """Read all the source DIDs, returns {DID: value}"""
+        if not self.defined:
+            return self._read_each()
+
+        resp = self.Uds.WriteReadRequest(self._read_request, debug=False)
+        if resp['status'] != True:
+            raise RuntimeError(f"Read of the dynamic DID failed: {resp['response']}")
+        return self.split(bytes(resp['response'][3:]))
+
+    def _read_each(self) -> Dict[str, bytes]:
+        values = {}
+        for DID, _ in self.sources:
+            resp = self.Uds.ReadDID(DID)
+            if not isinstance(resp, HexBytes):
+                raise RuntimeError(f"Read {DID} failed: {resp[1]}")
+            values[DID] = bytes(resp)
+        return values
+
+    def poll(self, interval: float = 0.1, count: Optional[int] = None,
+             callback: Optional[Callable[[float, Dict[str, bytes]], None]] = None) -> Iterator[Tuple[float, Dict[str, bytes]]]:
+        """
+        Read the DIDs every interval seconds (count reads, endless if None).
+        Yields (timestamp, {DID: value}), callback(timestamp, values) is also called if given.
+        """
+        next_time = time.perf_counter()
+        done = 0
+        while count is None or done < count:
+            timestamp = time.time()
+            values = self.read()
+            if callback is not None:
+                callback(timestamp, values)
+            yield timestamp, values
+            done += 1
+
+            next_time += interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.perf_counter()
+
+
+# Example Usage
+if __name__ == "__main__":
+    from UDS.UDSInterface import UDSInterface
+
+    Uds = UDSInterface(FileConfig='Config.yml')
+    Uds.StartSession(3)
+    sizes = load_did_sizes('DID_Status.xlsx')
+    with DynamicDidPoller(Uds, ['DF73', 'DF74'], sizes) as poller:
+        for timestamp, values in poller.poll(interval=0.2, count=10):
+            print(timestamp, {DID: value.hex() for DID, value in values.items()})
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+from .Utils import crc16_x25
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SegmentProgress:
+    """Progress of the segment being downloaded"""
+    segment_id: str = ''
+    offset: int = 0            # Acknowledged data bytes
+    last_block: int = 0        # Last acknowledged block sequence counter
+    crc: int = 0xFFFF          # CRC-16/X-25 (not finalized) of the acknowledged data
+
+
+@dataclass
+class FlashJournal:
+    """
+    Per-block progress journal of a PDX programming sequence, saved as JSON.
+
+    The journal is bound to the list of images (file names, segment IDs and sizes):
+    a journal written for other files is ignored. It is removed when the programming
+    sequence completes.
+
+    The acknowledged blocks are recorded in memory, the file is written every save_every
+    blocks, at each segment / image boundary and by flush() (error or interruption of the
+    programming). The CRC of the acknowledged data is computed when the file is written.
+    """
+    file_path: str
+    images_key: List[str] = field(default_factory=list)
+    erased_images: List[str] = field(default_factory=list)       # Images erased (0x0702 done)
+    completed_segments: List[str] = field(default_factory=list)  # "<image>/<segment ID>"
+    completed_images: List[str] = field(default_factory=list)    # Images downloaded (0x0708 done)
+    current: Optional[SegmentProgress] = None
+    save_every: int = 64                                          # Blocks between two writes (0: boundaries only)
+    _pending: int = field(default=0, repr=False, compare=False)   # Blocks not written yet
+    _data: object = field(default=None, repr=False, compare=False)
+    _crc_offset: int = field(default=0, repr=False, compare=False)
+
+    @staticmethod
+    def key_of(images) -> List[str]:
+        return [f"{os.path.basename(image.pdx_file)}:" +
+                ",".join(f"{seg.id}={seg.size}" for seg in image.segments) for image in images]
+
+    @classmethod
+    def load(cls, file_path: str, images, save_every: int = 64) -> "FlashJournal":
+        """Load the journal of these images (empty journal if missing or written for other images)"""
+        journal = cls(file_path, cls.key_of(images), save_every=save_every)
+        if not os.path.exists(file_path):
+            return journal
+
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Flash journal ignored ({e})")
+            return journal
+
+        if data.get('images_key') != journal.images_key:
+            logger.warning("Flash journal written for other PDX files => ignored")
+            return journal
+
+        journal.erased_images = data.get('erased_images', [])
+        journal.completed_segments = data.get('completed_segments', [])
+        journal.completed_images = data.get('completed_images', [])
+        if data.get('current'):
+            journal.current = SegmentProgress(**data['current'])
+            journal._crc_offset = journal.current.offset
+        return journal
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.erased_images or self.completed_segments or self.completed_images or self.current)
+
+    def save(self) -> None:
+        """Write the journal (atomic replace so an interrupted write keeps the previous state)"""
+        self._update_crc()
+        self._pending = 0
+        data = {
+            'images_key': self.images_key,
+            'erased_images': self.erased_images,
+            'completed_segments': self.completed_segments,
+            'completed_images': self.completed_images,
+            'current': asdict(self.current) if self.current else None,
+        }
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.file_path)
+
+    def flush(self) -> None:
+        """Write the blocks recorded since the last write (programming stopped by an error)"""
+        if self._pending:
+            self.save()
+
+    def clear(self) -> None:
+        """Remove the journal file (programming completed)"""
+        self._pending = 0
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def _update_crc(self) -> None:
+        """Extend the CRC of the current segment to the acknowledged offset"""
+        current = self.current
+        if current is not None and self._data is not None and self._crc_offset < current.offset:
+            current.crc = crc16_x25(memoryview(self._data)[self._crc_offset:current.offset], current.crc, final=False)
+            self._crc_offset = current.offset
+
+    # ------------------------------------------------------------------
+    # Progress
+    # ------------------------------------------------------------------
+    def image_erased(self, image_name: str) -> None:
+        """Logical block erased (0x0702): its segments have to be downloaded again"""
+        prefix = f"{image_name}/"
+        self.completed_segments = [key for key in self.completed_segments if not key.startswith(prefix)]
+        if self.current is not None and self.current.segment_id.startswith(prefix):
+            self.current = None
+            self._data = None
+        if image_name not in self.erased_images:
+            self.erased_images.append(image_name)
+        self.save()
+
+    def segment_started(self, segment_key: str, offset: int = 0, crc: int = 0xFFFF) -> None:
+        self.current = SegmentProgress(segment_key, offset, 0, crc)
+        self._data = None
+        self._crc_offset = offset
+        self.save()
+
+    def block_done(self, block_number: int, data, size: int) -> None:
+        """Record an acknowledged TransferData block of the current segment (data = segment data)"""
+        current = self.current
+        self._data = data
+        current.offset += size
+        current.last_block = block_number
+        self._pending += 1
+        if self.save_every and self._pending >= self.save_every:
+            self.save()
+
+    def segment_done(self, segment_key: str) -> None:
+        if segment_key not in self.completed_segments:
+            self.completed_segments.append(segment_key)
+        self.current = None
+        self._data = None
+        self.save()
+
+    def image_done(self, image_name: str) -> None:
+        if image_name not in self.completed_images:
+            self.completed_images.append(image_name)
+            self.save()
+
+    # ------------------------------------------------------------------
+    # Resume
+    # ------------------------------------------------------------------
+    def resume_offset(self, segment_key: str, data) -> int:
+        """
+        Return the acknowledged offset of an interrupted segment, 0 if the segment has to be
+        restarted (other segment or data not matching the CRC recorded in the journal).
+        """
+        current = self.current
+        if current is None or current.segment_id != segment_key or current.offset == 0:
+            return 0
+        if crc16_x25(memoryview(data)[:current.offset], final=False) != current.crc:
+            logger.warning(f"Flash journal CRC mismatch for {segment_key} => segment restarted")
+            return 0
+        return current.offset
+
+    def summary(self) -> Dict[str, object]:
+        return {'completed images': len(self.completed_images),
+                'completed segments': len(self.completed_segments),
+                'current': asdict(self.current) if self.current else None}
@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Union
+from .UDSInterface import UDSInterface
+from .UDSProgram import ECUProgrammer, PdxImage, UDSPdxProgConfig, UlpImage, load_pdx_images, load_ulp_images
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FlashJob:
+    """Programming of one ECU (one CAN channel or one EcuSession)"""
+    name: str
+    Uds: UDSInterface
+    progConfig: UDSPdxProgConfig = field(default_factory=UDSPdxProgConfig)
+    status: str = 'PENDING'           # PENDING, RUNNING, OK, FAILED
+    step: str = ''
+    done: int = 0
+    total: int = 0
+    error: str = ''
+    duration: float = 0.0
+
+    @property
+    def progress(self) -> float:
+        """Progress of the current step in percent"""
+        return 100.0 * self.done / self.total if self.total else 0.0
+
+
+class ParallelFlasher:
+    """
+    Program the same PDX (or ULP) files on several ECUs in parallel.
+
+    The files are extracted, read and split in TransferData blocks (with their CRC) once,
+    the prepared buffers are shared read-only by all the jobs. Each job runs the normal
+    ECUProgrammer flow on its own UDSInterface / EcuSession, a failure of one ECU does not
+    stop the others.
+
+    Example:
+        flasher = ParallelFlasher()
+        flasher.add_job('Bench1', UDSInterface(FileConfig='Config_Bench1.yml'))
+        flasher.add_job('Bench2', UDSInterface(FileConfig='Config_Bench1.yml', Profile='Bench2'))
+        results = flasher.program_pdx_files(['APP.pdx', 'CAL.pdx'])
+    """
+
+    def __init__(self, progress_callback: Optional[Callable[[FlashJob], None]] = None):
+        self.jobs: List[FlashJob] = []
+        self.progress_callback = progress_callback
+        self._lock = threading.Lock()
+
+    def add_job(self, name: str, UdsClient: UDSInterface,
+                progConfig: Optional[UDSPdxProgConfig] = None) -> FlashJob:
+        job = FlashJob(name, UdsClient, progConfig or UDSPdxProgConfig())
+        self.jobs.append(job)
+        return job
+
+    def _on_progress(self, job: FlashJob, step: str, done: int, total: int) -> None:
+        with self._lock:
+            job.step, job.done, job.total = step, done, total
+            if self.progress_callback is not None:
+                self.progress_callback(job)
+
+    def _run_job(self, job: FlashJob, program: Callable[[ECUProgrammer], None]) -> FlashJob:
+        programmer = ECUProgrammer(job.Uds, job.progConfig,
+                                   progress_callback=lambda step, done, total: self._on_progress(job, step, done, total))
+        job.status = 'RUNNING'
+        start = time.perf_counter()
+        try:
+            program(programmer)
+            job.status = 'OK'
+        except (Exception, SystemExit) as e:
+            # SystemExit: some UDSInterface services still call exit() on fatal errors
+            job.status = 'FAILED'
+            job.error = str(e) or type(e).__name__
+            logger.error(f"{job.name} => Programming failed: {job.error}")
+        finally:
+            job.duration = time.perf_counter() - start
+        return job
+
+    def run(self, program: Callable[[ECUProgrammer], None],
+            max_workers: Optional[int] = None) -> Dict[str, FlashJob]:
+        """
+        Run program(programmer) for each job in parallel.
+
+        Returns:
+            dict: {job name: FlashJob} with the final status of each ECU.
+        """
+        if not self.jobs:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=max_workers or len(self.jobs)) as executor:
+            futures = [executor.submit(self._run_job, job, program) for job in self.jobs]
+            for future in futures:
+                future.result()
+
+        for job in self.jobs:
+            logger.info(f"{job.name} => {job.status} ({job.duration:.1f}s) {job.error}")
+
+        return {job.name: job for job in self.jobs}
+
+    def program_pdx_images(self, images: List[PdxImage], max_workers: Optional[int] = None) -> Dict[str, FlashJob]:
+        return self.run(lambda programmer: programmer.program_pdx_images(images), max_workers)
+
+    def program_pdx_files(self, files_list: List[str], max_workers: Optional[int] = None) -> Dict[str, FlashJob]:
+        """Load the PDX files once and program them on all the ECUs"""
+        block_sizes = {job.progConfig.block_size for job in self.jobs}
+        block_size = block_sizes.pop() if len(block_sizes) == 1 else UDSPdxProgConfig.block_size
+        images = load_pdx_images(files_list, block_size)
+        try:
+            return self.program_pdx_images(images, max_workers)
+        finally:
+            for image in images:
+                image.close()
+
+    def program_ulp_images(self, images: List[UlpImage], max_workers: Optional[int] = None) -> Dict[str, FlashJob]:
+        return self.run(lambda programmer: programmer.program_ulp_images(images), max_workers)
+
+    def program_ulp_files(self, files_list: List[str], max_workers: Optional[int] = None) -> Dict[str, FlashJob]:
+        """Load the ULP files once and program them on all the ECUs"""
+        return self.program_ulp_images(load_ulp_images(files_list), max_workers)
+
+
+# Example Usage
+if __name__ == "__main__":
+    import sys
+
+    def print_progress(job: FlashJob):
+        print(f"{job.name} : {job.step} {job.progress:5.1f}%")
+
+    # Usage: python -m UDS.FlashStation Config_1.yml Config_2.yml -- file1.pdx file2.pdx
+    args = sys.argv[1:]
+    sep = args.index('--')
+    flasher = ParallelFlasher(print_progress)
+    for config in args[:sep]:
+        flasher.add_job(config, UDSInterface(FileConfig=config))
+    for name, job in flasher.program_pdx_files(args[sep + 1:]).items():
+        print(f"{name} => {job.status} {job.error}")
@@ -0,0 +1,84 @@
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+# Modules measured by default, from the lightest to the heaviest use case
+DEFAULT_MODULES = [
+    'UDS.UDSCodec',
+    'UDS.Utils',
+    'UDS.UDSConfig',
+    'UDS.UDSInterface',
+    'UDS.UDSSessionManager',
+    'UDS.DiagSequence',
+    'UDS.UDSProgram',
+]
+
+# Dependencies only needed by the Excel, ODX and ARXML functions
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'lxml', 'xmltodict', 'intelhex']
+
+# Modules which must not import a heavy dependency (CAN channel + UDS requests only)
+LIGHT_MODULES = ['UDS.UDSCodec', 'UDS.Utils', 'UDS.UDSConfig', 'UDS.UDSInterface', 'UDS.UDSSessionManager', 'UDS.DiagSequence']
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+print(json.dumps({{'duration': duration, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, runs: int = 3) -> Dict[str, object]:
+    """
+    Import time of a module in a new interpreter (nothing cached in sys.modules).
+
+    Returns:
+        dict: {'module', 'import' (best import time in s), 'process' (best interpreter start + import in s),
+               'heavy' (heavy dependencies loaded)}
+    """
+    best_import = best_process = float('inf')
+    heavy: List[str] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True)
+        process = time.perf_counter() - start
+        if result.returncode != 0:
+            raise ImportError(f"{module}: {result.stderr.strip().splitlines()[-1] if result.stderr else result.returncode}")
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        best_import = min(best_import, probe['duration'])
+        best_process = min(best_process, process)
+        heavy = probe['heavy']
+    return {'module': module, 'import': best_import, 'process': best_process, 'heavy': heavy}
+
+
+def run_benchmark(modules: Optional[List[str]] = None, runs: int = 3, budget: float = 0.5) -> bool:
+    """
+    Print the import time of each module. Returns False if a light module (LIGHT_MODULES) loads a
+    heavy dependency or if its interpreter start + import takes more than budget seconds.
+    """
+    ok = True
+    print(f"{'Module':<24} {'import':>9} {'process':>9}  heavy dependencies")
+    for module in modules or DEFAULT_MODULES:
+        try:
+            result = measure_import(module, runs)
+        except ImportError as e:
+            print(f"{module:<24} {'-':>9} {'-':>9}  {e}  <= NOK")
+            ok = False
+            continue
+
+        status = ''
+        if module in LIGHT_MODULES and (result['heavy'] or result['process'] > budget):
+            status = '  <= NOK'
+            ok = False
+        print(f"{module:<24} {result['import'] * 1000:7.1f}ms {result['process'] * 1000:7.1f}ms  "
+              f"{', '.join(result['heavy']) or '-'}{status}")
+    return ok
+
+
+# Example Usage
+if __name__ == "__main__":
+    # python -m UDS.ImportBenchmark [module ...]
+    sys.exit(0 if run_benchmark(sys.argv[1:] or None) else 1)
@@ -0,0 +1,128 @@
+from typing import List, Optional
+
+# ISO 15765-2 Protocol Control Information (upper nibble of the first byte)
+PCI_SF = 0x0  # Single Frame
+PCI_FF = 0x1  # First Frame
+PCI_CF = 0x2  # Consecutive Frame
+PCI_FC = 0x3  # Flow Control
+
+# Flow status of a Flow Control frame
+FC_CTS = 0x0    # Continue to send
+FC_WAIT = 0x1   # Wait
+FC_OVFLW = 0x2  # Overflow / abort
+
+FLOW_CONTROL_CTS = bytes([0x30, 0x00, 0x00])
+
+
+def max_frame_size(IsCanFD: bool) -> int:
+    """Return the CAN payload size used for ISO-TP frames"""
+    return 64 if IsCanFD else 8
+
+
+def stmin_to_seconds(st_min: int) -> float:
+    """Convert the STmin byte of a flow control frame into seconds"""
+    if st_min <= 0x7F:
+        return st_min / 1000.0
+    if 0xF1 <= st_min <= 0xF9:
+        return (st_min - 0xF0) / 10000.0
+    # Reserved values => use the maximum separation time
+    return 0x7F / 1000.0
+
+
+def segment(payload, IsCanFD: bool = False) -> List[bytes]:
+    """
+    Split a UDS payload into ISO-TP frames (framing used by UDSInterface).
+
+    Returns:
+        list: [single frame] or [first frame, consecutive frame 1, ...]
+    """
+    max_frame = max_frame_size(IsCanFD)
+    data = memoryview(payload) if isinstance(payload, (bytes, bytearray, memoryview)) else memoryview(bytes(payload))
+    total_length = len(data)
+    frames = []
+
+    # Single Frame: 7 bytes (1 PCI byte), CAN FD escape sequence: 62 bytes (2 PCI bytes)
+    max_single = max_frame - 2 if IsCanFD else max_frame - 1
+    if total_length <= max_single:  # Single Frame
+        if total_length < 8:
+            frames.append(bytes([total_length]) + data)
+        else:
+            frames.append(bytes([total_length >> 8, total_length & 0xFF]) + data)
+        return frames
+
+    # First Frame
+    first_frame = bytearray([0x10 | ((total_length >> 8) & 0x0F), total_length & 0xFF])
+    first_frame += data[:max_frame - 2]
+    frames.append(bytes(first_frame))
+
+    # Consecutive Frames
+    seq_number = 1
+    for idx in range(max_frame - 2, total_length, max_frame - 1):
+        frames.append(bytes([0x20 | seq_number]) + data[idx:idx + max_frame - 1])
+        seq_number = (seq_number + 1) % 16
+
+    return frames
+
+
+class IsoTpReassembler:
+    """
+    Rebuild UDS payloads from received ISO-TP frames.
+
+    feed() returns the complete payload when the last frame of a message is received,
+    None otherwise. needs_flow_control is set after a first frame so the caller can send
+    the flow control frame on its own transport.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._buffer = bytearray()
+        self._size = 0
+        self._next_sn = 0
+        self.in_progress = False
+        self.needs_flow_control = False
+
+    def feed(self, data, length: Optional[int] = None) -> Optional[bytes]:
+        """Consume the data of one CAN frame"""
+        if len(data) == 0:
+            return None
+        if length is None:
+            length = len(data)
+
+        pci = data[0] >> 4
+        self.needs_flow_control = False
+
+        if pci == PCI_SF:
+            self.reset()
+            if length <= 8:
+                size = data[0] & 0x0F
+                return bytes(data[1:1 + size])
+            size = ((data[0] & 0x0F) << 8) + data[1]
+            return bytes(data[2:2 + size])
+
+        if pci == PCI_FF:
+            self.reset()
+            self._size = ((data[0] & 0x0F) << 8) + data[1]
+            self._buffer += bytes(data[2:2 + self._size])
+            self._next_sn = 1
+            self.in_progress = True
+            self.needs_flow_control = True
+            return None
+
+        if pci == PCI_CF and self.in_progress:
+            if (data[0] & 0x0F) != self._next_sn:
+                # Wrong sequence number => the message is lost
+                self.reset()
+                return None
+            remaining = self._size - len(self._buffer)
+            self._buffer += bytes(data[1:1 + remaining])
+            self._next_sn = (self._next_sn + 1) % 16
+            if len(self._buffer) >= self._size:
+                payload = bytes(self._buffer)
+                self.reset()
+                return payload
+            return None
+
+        # Flow control frames and unexpected consecutive frames are ignored
+        return None
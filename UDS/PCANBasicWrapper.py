@@ -1,34 +1,26 @@
 from .PCANBasic import *
+from . import PCANBasic as PCANBasic_module
+from .UDSConfig import UDSConfig
 from .Utils import *
 import time
 
 class PCANBasicWrapper:
     def __init__(self, FileConfig=None, PcanHandle=None, IsCanFD=None, Bitrate=None, \
                  BitrateFD=None, \
-                 TxID=None, RxID=None, IsExtended=None, IsFiltered=None, IsPadded=None):
+                 TxID=None, RxID=None, IsExtended=None, IsFiltered=None, IsPadded=None, Profile=None, timeout=None):
         """
         Create an object starts the programm
+
+        FileConfig is a config file or a loaded UDSConfig, Profile a profile name of this config (None: CanConfig).
         """
 
         self.comOk = False
 
-        # Sets the PCANHandle (Hardware Channel)
-        if PcanHandle is not None and PcanHandle in globals():
-            self.PcanHandle = globals()[PcanHandle]
-        elif PcanHandle is None:
-            self.PcanHandle = PcanHandle
-        else:
-            print(f"Variable '{PcanHandle}' not found.")
-            return
+        # Sets the PCANHandle (Hardware Channel), name of a PCANBasic constant (e.g. 'PCAN_USBBUS1')
+        self.PcanHandle = PcanHandle
 
-        # Sets the bitrate for normal CAN devices
-        if Bitrate is not None and Bitrate in globals():
-            self.Bitrate = globals()[Bitrate]
-        elif Bitrate is None:
-            self.Bitrate = Bitrate
-        else:
-            print(f"Variable '{Bitrate}' not found.")
-            return
+        # Sets the bitrate for normal CAN devices (e.g. 'PCAN_BAUD_500K')
+        self.Bitrate = Bitrate
 
         # Sets the bitrate for CAN FD devices. 
         # Example - Bitrate Nom: 1Mbit/s Data: 2Mbit/s:
@@ -45,7 +37,8 @@ class PCANBasicWrapper:
         self.TxId = TxID
         self.RxId = RxID
 
-        self.timeout = 2
+        # Maximum wait for a frame on the bus at initialization (CanConfig: timeout)
+        self.timeout = timeout
         # Filtering data
         self.IsFiltered = IsFiltered
         # extended CAN
@@ -55,7 +48,21 @@ class PCANBasicWrapper:
 
         # get the configuration from file
         if FileConfig != None:
-            load_config(self, globals(), FileConfig, Encode=True)
+            UDSConfig.load(FileConfig).channel(Profile).apply(self)
+        if self.timeout is None:
+            self.timeout = 2
+
+        # Constants and bytes expected by PCANBasic
+        for itemName in ('PcanHandle', 'Bitrate'):
+            value = getattr(self, itemName)
+            if isinstance(value, str):
+                if not hasattr(PCANBasic_module, value):
+                    print(f"Variable '{value}' not found.")
+                    return
+                setattr(self, itemName, getattr(PCANBasic_module, value))
+        if isinstance(self.BitrateFD, str):
+            self.BitrateFD = self.BitrateFD.encode()
+
         NoneData = []
         for itemName in self.__dict__.keys():
             if getattr(self, itemName) is None:
@@ -109,7 +116,9 @@ class PCANBasicWrapper:
         """Set a filter to only receive messages within the specified ID range."""
         self.fromID = min(start_id, end_id)
         self.toID = max(start_id, end_id)
-        
+
+        # FilterMessages expands the current filter => closed first so the range can also shrink
+        self.m_objPCANBasic.SetValue(self.PcanHandle, PCAN_MESSAGE_FILTER, PCAN_FILTER_CLOSE)
         stsResult = self.m_objPCANBasic.FilterMessages(self.PcanHandle, self.fromID, self.toID, self.typeExtended)
 
         if stsResult != PCAN_ERROR_OK:
@@ -126,16 +135,14 @@ class PCANBasicWrapper:
             msgCanMessageFD.ID = can_id
             msgCanMessageFD.DLC = get_dlc_for_data_length(len(data)) if len(data) > 8 or not self.IsPadded else 8
             msgCanMessageFD.MSGTYPE = PCAN_MESSAGE_FD.value | PCAN_MESSAGE_BRS.value | (PCAN_MESSAGE_EXTENDED.value if self.IsCanFD else PCAN_MESSAGE_STANDARD.value)
-            for i in range(len(data)):
-                msgCanMessageFD.DATA[i] = data[i]
+            msgCanMessageFD.DATA[:len(data)] = data
             stsResult = self.m_objPCANBasic.WriteFD(self.PcanHandle, msgCanMessageFD)
         else:
             msgCanMessage = TPCANMsg()
             msgCanMessage.ID = can_id
             msgCanMessage.LEN = 8 if self.IsPadded else len(data)
             msgCanMessage.MSGTYPE = self.typeExtended.value
-            for i in range(len(data)):
-                msgCanMessage.DATA[i] = data[i]
+            msgCanMessage.DATA[:len(data)] = data
             stsResult = self.m_objPCANBasic.Write(self.PcanHandle, msgCanMessage)
 
         ## Checks if the message was sent
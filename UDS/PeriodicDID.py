@@ -0,0 +1,177 @@
+import collections
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
+from .UDSCodec import (PERIODIC_FAST, PERIODIC_MEDIUM, PERIODIC_SLOW, PERIODIC_STOP, encode_read_periodic_did,
+                       periodic_id)
+
+logger = logging.getLogger(__name__)
+
+TRANSMISSION_MODES = {'slow': PERIODIC_SLOW, 'medium': PERIODIC_MEDIUM, 'fast': PERIODIC_FAST}
+
+# callback(DID, timestamp, data)
+PeriodicCallback = Callable[[str, float, bytes], None]
+
+
+@dataclass
+class PeriodicSubscription:
+    """Periodic DIDs received with the same transmission mode"""
+    dids: List[str]
+    mode: int
+    callback: Optional[PeriodicCallback] = None
+    buffers: Dict[str, Deque[Tuple[float, bytes]]] = field(default_factory=dict)
+    active: bool = True
+
+    def samples(self, DID: str) -> List[Tuple[float, bytes]]:
+        """Time series [(timestamp, data), ...] received for a DID"""
+        return list(self.buffers.get(DID.upper(), ()))
+
+    def latest(self, DID: str) -> Optional[Tuple[float, bytes]]:
+        buffer = self.buffers.get(DID.upper())
+        return buffer[-1] if buffer else None
+
+
+class PeriodicDidReader:
+    """
+    Stream DID values with ReadDataByPeriodicIdentifier (0x2A).
+
+    The ECU sends the periodic DIDs as single CAN frames without ISO-TP PCI on a dedicated
+    CAN ID: [periodic identifier (low byte of the F2xx DID), data...]. The frames are routed by
+    the dispatcher of the UDSSessionManager to a listener of this CAN ID, then by periodic
+    identifier to the callback and the time-series buffer of each subscription.
+    The transmissions are stopped (0x2A 0x04) when the reader is closed.
+
+    Example:
+        with UDSSessionManager(Uds) as manager:
+            ecu = manager.add_session(0x6B4, 0x694)
+            with PeriodicDidReader(manager, ecu, periodic_rx_id=0x5B4) as reader:
+                sub = reader.subscribe(['F201', 'F202'], rate='fast')
+                time.sleep(1.0)
+                print(sub.samples('F201'))
+    """
+
+    def __init__(self, manager, session, periodic_rx_id: Optional[int] = None,
+                 sizes: Optional[Dict[str, int]] = None, buffer_size: int = 10000):
+        """
+        Parameters:
+            manager (UDSSessionManager): Owner of the CAN channel and of the frame dispatcher.
+            session (EcuSession): ECU sending the periodic DIDs.
+            periodic_rx_id (int): CAN ID of the periodic frames (default CanConfig PeriodicRxId).
+            sizes (dict): Optional {DID: size} (see DynamicDID.load_did_sizes) to remove the frame padding.
+            buffer_size (int): Samples kept per DID.
+        """
+        if periodic_rx_id is None:
+            periodic_rx_id = getattr(manager.Uds, 'PeriodicRxId', None)
+        if periodic_rx_id is None:
+            raise ValueError("No CAN ID for the periodic frames (periodic_rx_id or CanConfig PeriodicRxId)")
+        # The frames of a session RxId are routed to its ISO-TP queue before the listeners
+        if periodic_rx_id == manager.Uds.RxId or periodic_rx_id == session.RxId or periodic_rx_id in manager.sessions:
+            raise ValueError(f"Periodic CAN ID 0x{periodic_rx_id:X} is the RxId of an ECU session, "
+                             f"a dedicated CAN ID is required (periodic_rx_id or CanConfig PeriodicRxId)")
+
+        self.manager = manager
+        self.session = session
+        self.periodic_rx_id = periodic_rx_id
+        self.sizes = {DID.upper(): size for DID, size in (sizes or {}).items()}
+        self.buffer_size = buffer_size
+        self.subscriptions: List[PeriodicSubscription] = []
+        self._routes: Dict[int, Tuple[str, PeriodicSubscription]] = {}
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def subscribe(self, dids: List[str], rate: Union[str, int] = 'medium',
+                  callback: Optional[PeriodicCallback] = None) -> PeriodicSubscription:
+        """
+        Start the periodic transmission of DIDs (F200 - F2FF).
+
+        Parameters:
+            rate: 'slow', 'medium', 'fast' (ECU defined rates) or the transmission mode byte.
+            callback: Optional callback(DID, timestamp, data) called from the dispatcher thread.
+        """
+        mode = TRANSMISSION_MODES[rate.lower()] if isinstance(rate, str) else rate
+        dids = [DID.upper() for DID in dids]
+        subscription = PeriodicSubscription(dids, mode, callback,
+                                            {DID: collections.deque(maxlen=self.buffer_size) for DID in dids})
+
+        with self._lock:
+            for DID in dids:
+                self._routes[periodic_id(DID)] = (DID, subscription)
+        self._listen()
+
+        resp = self.session.WriteReadRequest(encode_read_periodic_did(mode, dids))
+        if resp['status'] != True:
+            self._remove_routes(subscription)
+            raise RuntimeError(f"ReadDataByPeriodicIdentifier {dids} failed: {resp['response']}")
+
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: PeriodicSubscription) -> None:
+        """Stop the periodic transmission of the DIDs of a subscription"""
+        if not subscription.active:
+            return
+        resp = self.session.WriteReadRequest(encode_read_periodic_did(PERIODIC_STOP, subscription.dids))
+        if resp['status'] != True:
+            logger.warning(f"Stop of periodic DIDs {subscription.dids} failed => {resp['response']}")
+        self._remove_routes(subscription)
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    def close(self) -> None:
+        """Stop all the periodic transmissions and the listener"""
+        for subscription in list(self.subscriptions):
+            self.unsubscribe(subscription)
+        if self._listening:
+            self.manager.remove_listener(self.periodic_rx_id)
+            self._listening = False
+
+    def _listen(self) -> None:
+        if not self._listening:
+            self.manager.add_listener(self.periodic_rx_id, self.on_frame)
+            self._listening = True
+
+    def _remove_routes(self, subscription: PeriodicSubscription) -> None:
+        subscription.active = False
+        with self._lock:
+            for pid, (_, owner) in list(self._routes.items()):
+                if owner is subscription:
+                    del self._routes[pid]
+
+    def on_frame(self, msg: dict) -> None:
+        """Listener of the periodic CAN ID: route the frame by periodic identifier"""
+        data = msg['data']
+        with self._lock:
+            route = self._routes.get(data[0])
+        if route is None:
+            return
+
+        DID, subscription = route
+        size = self.sizes.get(DID)
+        value = bytes(data[1:1 + size] if size is not None else data[1:])
+        timestamp = time.time()
+        subscription.buffers[DID].append((timestamp, value))
+        if subscription.callback is not None:
+            subscription.callback(DID, timestamp, value)
+
+
+# Example Usage
+if __name__ == "__main__":
+    from UDS.UDSInterface import UDSInterface
+    from UDS.UDSSessionManager import UDSSessionManager
+
+    Uds = UDSInterface(FileConfig='Config.yml')
+    with UDSSessionManager(Uds) as manager:
+        ecu = manager.add_session(Uds.TxId, Uds.RxId)
+        ecu.StartSession(3)
+        with PeriodicDidReader(manager, ecu) as reader:
+            reader.subscribe(['F201', 'F202'], rate='fast',
+                             callback=lambda DID, timestamp, data: print(f"{timestamp:.3f} {DID} {data.hex()}"))
+            time.sleep(2.0)
@@ -0,0 +1,154 @@
+import ctypes
+import importlib
+import importlib.util
+import logging
+import os
+import re
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# key = algorithm(seed, level)
+KeyAlgorithm = Callable[[bytes, int], bytes]
+
+_KEY_ALGORITHMS: Dict[str, KeyAlgorithm] = {}
+
+
+def register_key_algorithm(name: str):
+    """
+    Decorator registering a seed/key algorithm under a name usable in UDSPdxProgConfig.key_algorithm.
+
+    Example:
+        @register_key_algorithm('my_oem')
+        def my_oem_key(seed: bytes, level: int) -> bytes:
+            ...
+    """
+    def decorator(func: KeyAlgorithm) -> KeyAlgorithm:
+        _KEY_ALGORITHMS[name] = func
+        return func
+    return decorator
+
+
+@register_key_algorithm('debug_key')
+def debug_key(seed: bytes, level: int) -> bytes:
+    """Debug key accepted by the development bootloaders (FF FF FF FF)"""
+    return bytes([0xFF, 0xFF, 0xFF, 0xFF])
+
+
+@register_key_algorithm('xor_ff')
+def xor_ff(seed: bytes, level: int) -> bytes:
+    """Simple XOR algorithm for example"""
+    return bytes(b ^ 0xFF for b in seed)
+
+
+def _load_python_algorithm(module_name: str, func_name: str) -> KeyAlgorithm:
+    """Load func_name from a Python module name or a .py file path"""
+    if module_name.endswith('.py'):
+        spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(module_name))[0], module_name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, func_name)
+
+
+def _load_library_algorithm(lib_path: str, func_name: str = 'GenerateKeyEx', variant: str = '') -> KeyAlgorithm:
+    """
+    Load a seed/key shared library (.dll / .so) with the usual GenerateKeyEx interface:
+    int GenerateKeyEx(const unsigned char* seed, unsigned int seedLen, unsigned int securityLevel,
+                      const char* variant, unsigned char* key, unsigned int maxKeyLen, unsigned int* keyLen)
+    """
+    library = ctypes.CDLL(os.path.abspath(lib_path))
+    generate = getattr(library, func_name)
+    generate.restype = ctypes.c_int
+    generate.argtypes = [ctypes.POINTER(ctypes.c_ubyte), ctypes.c_uint, ctypes.c_uint, ctypes.c_char_p,
+                         ctypes.POINTER(ctypes.c_ubyte), ctypes.c_uint, ctypes.POINTER(ctypes.c_uint)]
+
+    def library_key(seed: bytes, level: int) -> bytes:
+        seed_buffer = (ctypes.c_ubyte * len(seed)).from_buffer_copy(seed)
+        key_buffer = (ctypes.c_ubyte * 64)()
+        key_len = ctypes.c_uint(0)
+        result = generate(seed_buffer, len(seed), level, variant.encode(), key_buffer, len(key_buffer), ctypes.byref(key_len))
+        if result != 0:
+            raise RuntimeError(f"{os.path.basename(lib_path)} {func_name} error {result}")
+        return bytes(key_buffer[:key_len.value])
+
+    return library_key
+
+
+def load_key_algorithm(spec: str) -> KeyAlgorithm:
+    """
+    Return the key algorithm described by spec:
+      - registered name            : 'debug_key', 'xor_ff', ...
+      - Python module / file       : 'my_package.seedkey:compute_key' or 'Tools/seedkey.py:compute_key'
+      - Shared library (.dll/.so)  : 'Tools/SeedKey.dll' or 'Tools/SeedKey.dll:GenerateKeyEx'
+    """
+    if spec in _KEY_ALGORITHMS:
+        return _KEY_ALGORITHMS[spec]
+
+    # Windows drive letter (C:\... or C:/...) is part of the path
+    drive = spec[:2] if re.match(r'^[A-Za-z]:[\\/]', spec) else ''
+    path, _, func_name = spec[len(drive):].rpartition(':')
+    if not path:
+        path, func_name = spec[len(drive):], ''
+    path = drive + path
+
+    if path.lower().endswith(('.dll', '.so')):
+        return _load_library_algorithm(path, func_name or 'GenerateKeyEx')
+
+    if func_name:
+        return _load_python_algorithm(path, func_name)
+
+    raise ValueError(f"Unknown key algorithm: {spec}")
+
+
+class SeedKeyEngine:
+    """
+    Compute the SecurityAccess keys with a pluggable algorithm.
+
+    The algorithms are deterministic by default: computed keys are cached per (level, seed) so
+    a seed already seen (e.g. static seed of a bootloader, several ECUs of the same type) does
+    not call the algorithm (or the shared library) again.
+    """
+
+    def __init__(self, algorithm: KeyAlgorithm, deterministic: bool = True, name: str = ''):
+        self.algorithm = algorithm
+        self.deterministic = deterministic
+        self.name = name or getattr(algorithm, '__name__', 'key_algorithm')
+        self._cache: Dict[Tuple[int, bytes], bytes] = {}
+        self._lock = threading.Lock()
+
+    def compute(self, seed: bytes, level: int) -> bytes:
+        seed = bytes(seed)
+        if self.deterministic:
+            with self._lock:
+                key = self._cache.get((level, seed))
+            if key is not None:
+                return key
+
+        key = bytes(self.algorithm(seed, level))
+
+        if self.deterministic:
+            with self._lock:
+                self._cache[(level, seed)] = key
+        return key
+
+    def invalidate(self, seed: bytes, level: int) -> None:
+        """Remove a cached key (rejected by the ECU)"""
+        with self._lock:
+            self._cache.pop((level, bytes(seed)), None)
+
+
+_ENGINES: Dict[str, SeedKeyEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_key_engine(spec: str) -> SeedKeyEngine:
+    """Return the (shared) engine of a key algorithm, the algorithm is loaded once"""
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(spec)
+        if engine is None:
+            engine = SeedKeyEngine(load_key_algorithm(spec), name=spec)
+            _ENGINES[spec] = engine
+        return engine
@@ -0,0 +1,244 @@
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple, Union
+
+Payload = Union[bytes, bytearray, memoryview, List[int]]
+
+# Service identifiers encoded by the codec
+SID_READ_DID = 0x22
+SID_WRITE_DID = 0x2E
+SID_ROUTINE_CONTROL = 0x31
+SID_DYNAMICALLY_DEFINE_DID = 0x2C
+SID_READ_PERIODIC_DID = 0x2A
+SID_READ_MEMORY_BY_ADDRESS = 0x23
+SID_REQUEST_UPLOAD = 0x35
+SID_READ_DTC_INFORMATION = 0x19
+
+# RoutineControl sub-functions
+RC_START = 0x01
+RC_STOP = 0x02
+RC_RESULT = 0x03
+
+# DynamicallyDefineDataIdentifier sub-functions
+DDDI_DEFINE_BY_IDENTIFIER = 0x01
+DDDI_CLEAR = 0x03
+
+# ReadDataByPeriodicIdentifier transmission modes
+PERIODIC_SLOW = 0x01
+PERIODIC_MEDIUM = 0x02
+PERIODIC_FAST = 0x03
+PERIODIC_STOP = 0x04
+
+# ReadDTCInformation sub-functions
+RDTCI_DTC_BY_STATUS_MASK = 0x02
+RDTCI_SNAPSHOT_BY_DTC = 0x04
+RDTCI_EXTENDED_DATA_BY_DTC = 0x06
+
+
+@lru_cache(maxsize=4096)
+def did_bytes(DID: Union[str, int]) -> bytes:
+    """
+    Encode a DID ("F190" or 0xF190) on 2 bytes.
+    The result is cached: a DID is validated and converted once, not at each request.
+    """
+    if isinstance(DID, int):
+        if not (0 <= DID <= 0xFFFF):
+            raise ValueError(f"Invalid DID: {DID:#x}. It must fit on 2 bytes.")
+        return DID.to_bytes(2, 'big')
+
+    try:
+        encoded = bytes.fromhex(DID) if len(DID) == 4 else b''
+    except ValueError:
+        encoded = b''
+    if len(encoded) != 2:
+        raise ValueError(f"Invalid DID: {DID}. It must be a 4-character hex string.")
+    return encoded
+
+
+def encode_request(sid: int, DID: Union[str, int], data: Optional[Payload] = None,
+                   subfunction: Optional[int] = None, pci: bool = False) -> bytearray:
+    """
+    Build a [PCI] SID [sub-function] DID_hi DID_lo [data] request in one preallocated buffer.
+
+    Parameters:
+        pci (bool): Prefix the single frame PCI byte (length), format of UDSInterface.RcRequest().
+    """
+    did = did_bytes(DID)
+    data = b'' if data is None else data
+    header = 1 + (subfunction is not None)
+    length = header + 2 + len(data)
+    offset = 1 if pci else 0
+
+    message = bytearray(offset + length)
+    if pci:
+        message[0] = length
+    message[offset] = sid
+    if subfunction is not None:
+        message[offset + 1] = subfunction
+    message[offset + header:offset + header + 2] = did
+    message[offset + header + 2:] = data
+    return message
+
+
+def encode_read_did(DID: Union[str, int]) -> bytearray:
+    return encode_request(SID_READ_DID, DID)
+
+
+def encode_write_did(DID: Union[str, int], data: Payload) -> bytearray:
+    return encode_request(SID_WRITE_DID, DID, data)
+
+
+def encode_routine_control(subfunction: int, DID: Union[str, int], data: Optional[Payload] = None) -> bytearray:
+    """RoutineControl single frame request (with PCI byte) for UDSInterface.RcRequest()"""
+    return encode_request(SID_ROUTINE_CONTROL, DID, data, subfunction, pci=True)
+
+
+def encode_define_did_by_identifier(dynamic_did: Union[str, int],
+                                    sources: List[Tuple[Union[str, int], int, int]]) -> bytearray:
+    """
+    DynamicallyDefineDataIdentifier (0x2C 0x01) request.
+
+    Parameters:
+        sources: list of (source DID, position (1 = first byte), memory size) appended to the dynamic DID.
+    """
+    message = bytearray(4 + 4 * len(sources))
+    message[0] = SID_DYNAMICALLY_DEFINE_DID
+    message[1] = DDDI_DEFINE_BY_IDENTIFIER
+    message[2:4] = did_bytes(dynamic_did)
+    offset = 4
+    for DID, position, size in sources:
+        message[offset:offset + 2] = did_bytes(DID)
+        message[offset + 2] = position
+        message[offset + 3] = size
+        offset += 4
+    return message
+
+
+def encode_clear_dynamic_did(dynamic_did: Union[str, int]) -> bytearray:
+    """DynamicallyDefineDataIdentifier (0x2C 0x03) request"""
+    return encode_request(SID_DYNAMICALLY_DEFINE_DID, dynamic_did, subfunction=DDDI_CLEAR)
+
+
+def periodic_id(DID: Union[str, int]) -> int:
+    """Periodic identifier (1 byte) of a DID of the F200 - F2FF range"""
+    did = did_bytes(DID)
+    if did[0] != 0xF2:
+        raise ValueError(f"DID {did.hex().upper()} can not be read periodically (F200 to F2FF)")
+    return did[1]
+
+
+def encode_read_periodic_did(mode: int, DIDs: List[Union[str, int]]) -> bytearray:
+    """ReadDataByPeriodicIdentifier (0x2A) request, the DIDs are sent as periodic identifiers"""
+    message = bytearray(2 + len(DIDs))
+    message[0] = SID_READ_PERIODIC_DID
+    message[1] = mode
+    for index, DID in enumerate(DIDs):
+        message[2 + index] = periodic_id(DID)
+    return message
+
+
+def encode_memory_request(sid: int, address: int, size: int, addr_len_format: int = 0x44,
+                          data_format: Optional[int] = None, ALFID_reversed: bool = False) -> bytearray:
+    """
+    SID [dataFormatIdentifier] ALFID address size request (0x23 ReadMemoryByAddress, 0x35 RequestUpload, ...).
+    The ALFID nibbles are read as in UDSInterface.RequestDownload(): upper nibble = address length,
+    lower nibble = size length, ALFID_reversed swaps the nibbles of the byte sent.
+    """
+    address_length = (addr_len_format >> 4) & 0x0F
+    size_length = addr_len_format & 0x0F
+    if not (1 <= address_length <= 4 and 1 <= size_length <= 4):
+        raise ValueError(f"Invalid addressAndLengthFormatIdentifier 0x{addr_len_format:02X}")
+
+    header = 2 if data_format is None else 3
+    message = bytearray(header + address_length + size_length)
+    message[0] = sid
+    if data_format is not None:
+        message[1] = data_format
+    message[header - 1] = ((addr_len_format >> 4) | (addr_len_format << 4)) & 0xFF if ALFID_reversed else addr_len_format
+    message[header:header + address_length] = address.to_bytes(address_length, 'big')
+    message[header + address_length:] = size.to_bytes(size_length, 'big')
+    return message
+
+
+def encode_read_dtc_information(subfunction: int, mask: Optional[int] = None, dtc: Optional[int] = None,
+                                record: Optional[int] = None) -> bytearray:
+    """ReadDTCInformation (0x19) request: [0x19, sub-function, (status mask) | (DTC 3 bytes, record number)]"""
+    message = bytearray(2 + (mask is not None) + (3 if dtc is not None else 0) + (record is not None))
+    message[0] = SID_READ_DTC_INFORMATION
+    message[1] = subfunction
+    offset = 2
+    if mask is not None:
+        message[offset] = mask
+        offset += 1
+    if dtc is not None:
+        message[offset:offset + 3] = dtc.to_bytes(3, 'big')
+        offset += 3
+    if record is not None:
+        message[offset] = record
+    return message
+
+
+class HexBytes(Sequence):
+    """
+    Raw bytes of a UDS request / response.
+
+    The bytes are kept as they were received (zero-copy memoryview, slices do not copy).
+    The object behaves like the former list of hex strings (['0x62', '0xf1', ...]) for the
+    reporting code: items, iteration, str() and comparison with a list give the hex strings,
+    they are only formatted when accessed. Use .raw (memoryview of ints) or bytes() to
+    process the data.
+    """
+    __slots__ = ('raw',)
+
+    def __init__(self, data=b''):
+        if isinstance(data, HexBytes):
+            self.raw = data.raw
+        elif isinstance(data, memoryview):
+            self.raw = data
+        else:
+            self.raw = memoryview(data if isinstance(data, (bytes, bytearray)) else bytes(data))
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return HexBytes(self.raw[index])
+        return hex(self.raw[index])
+
+    def __iter__(self) -> Iterator[str]:
+        return map(hex, self.raw)
+
+    def __bytes__(self) -> bytes:
+        return self.raw.tobytes()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, HexBytes):
+            return self.raw == other.raw
+        if isinstance(other, (bytes, bytearray, memoryview)):
+            return self.raw == other
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    __str__ = __repr__
+
+    def __reduce__(self):
+        return (HexBytes, (bytes(self),))
+
+    def hex(self, sep: str = ' ') -> str:
+        """Compact report format: '62 F1 90 ...'"""
+        return self.raw.hex(sep).upper() if sep else self.raw.hex().upper()
+
+
+# Example Usage
+if __name__ == "__main__":
+    print(encode_read_did('F190').hex())
+    print(encode_routine_control(RC_START, 'FF00', [0x01]).hex())
+    response = HexBytes(b'\x62\xF1\x90VIN0123')
+    print(response[3:], bytes(response[3:]), response.hex())
@@ -0,0 +1,307 @@
+import copy
+import os
+import threading
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Tuple, Union
+from .UDSTiming import UDSTiming
+from .Utils import load_yaml, loadConfigFilePath
+
+PCAN_LIBS = ('PCANBasicLib', 'CanApi4Lib')
+MAX_STANDARD_ID = 0x7FF
+MAX_EXTENDED_ID = 0x1FFFFFFF
+
+
+class UDSConfigError(ValueError):
+    """Invalid values of a config file, detected when the file is loaded"""
+
+    def __init__(self, path: str, errors: List[Tuple[str, str]]):
+        self.path = path
+        self.errors = errors
+        super().__init__(f"{path}: " + "; ".join(f"{key} => {error}" for key, error in errors))
+
+
+@dataclass
+class PCANBasicConfig:
+    """CanConfig: PCANBasicConfig (names of the PCANBasic constants, resolved by PCANBasicWrapper)"""
+    PcanHandle: Optional[str] = None
+    Bitrate: Optional[str] = None
+    BitrateFD: Optional[str] = None
+
+
+@dataclass
+class CanApi4Config:
+    """CanConfig: CanApi4Config"""
+    device: Optional[str] = None
+    client_name: Optional[str] = None
+    net_name: Optional[str] = None
+
+
+@dataclass
+class CanConfig:
+    """CAN channel and ECU addressing of a UDSInterface (CanConfig section or one of the Profiles)"""
+    name: str = 'default'
+    TxId: Optional[int] = None
+    RxId: Optional[int] = None
+    IsCanFD: Optional[bool] = None
+    IsExtended: Optional[bool] = None
+    IsFiltered: Optional[bool] = None
+    IsPadded: Optional[bool] = None
+    timeout: Optional[float] = None         # Bus check at initialization of PCANBasicWrapper (default 2 s)
+    PcanLib: Optional[str] = None
+    FunctionalId: Optional[int] = None
+    PeriodicRxId: Optional[int] = None
+    PCANBasic: PCANBasicConfig = field(default_factory=PCANBasicConfig)
+    CanApi4: CanApi4Config = field(default_factory=CanApi4Config)
+
+    @classmethod
+    def from_dict(cls, name: str, section: dict, errors: List[Tuple[str, str]]) -> "CanConfig":
+        can = cls(name)
+        for item in fields(cls):
+            if item.name in section and item.name not in ('name', 'PCANBasic', 'CanApi4'):
+                setattr(can, item.name, section[item.name])
+        can.PCANBasic = _sub_config(PCANBasicConfig, section.get('PCANBasicConfig'))
+        can.CanApi4 = _sub_config(CanApi4Config, section.get('CanApi4Config'))
+        can._validate(errors)
+        return can
+
+    def attributes(self) -> Dict[str, Any]:
+        """Values of the channel, named as the attributes of UDSInterface and of the CAN wrappers"""
+        values = {item.name: getattr(self, item.name) for item in fields(self)
+                  if item.name not in ('name', 'PCANBasic', 'CanApi4')}
+        values.update(vars(self.PCANBasic))
+        values.update(vars(self.CanApi4))
+        return values
+
+    def apply(self, obj) -> None:
+        """Set the attributes of obj which are still None (values not given to its constructor)"""
+        for name, value in self.attributes().items():
+            if hasattr(obj, name) and getattr(obj, name) is None:
+                setattr(obj, name, value)
+
+    def _validate(self, errors: List[Tuple[str, str]]) -> None:
+        prefix = 'CanConfig' if self.name == 'default' else f"Profiles.{self.name}"
+        for key in ('IsCanFD', 'IsExtended', 'IsFiltered', 'IsPadded'):
+            value = getattr(self, key)
+            if value is not None and not isinstance(value, bool):
+                errors.append((f"{prefix}.{key}", f"True or False expected, not {value!r}"))
+
+        max_id = MAX_EXTENDED_ID if self.IsExtended else MAX_STANDARD_ID
+        for key in ('TxId', 'RxId', 'FunctionalId', 'PeriodicRxId'):
+            value = getattr(self, key)
+            if value is None:
+                continue
+            if not isinstance(value, int) or isinstance(value, bool):
+                errors.append((f"{prefix}.{key}", f"CAN ID expected, not {value!r}"))
+            elif not (0 <= value <= max_id):
+                errors.append((f"{prefix}.{key}", f"0x{value:X} out of range (max 0x{max_id:X}"
+                                                  f"{'' if self.IsExtended else ', IsExtended: False'})"))
+
+        if self.timeout is not None and (not isinstance(self.timeout, (int, float)) or self.timeout <= 0):
+            errors.append((f"{prefix}.timeout", f"Positive number of seconds expected, not {self.timeout!r}"))
+        if self.PcanLib is not None and self.PcanLib not in PCAN_LIBS:
+            errors.append((f"{prefix}.PcanLib", f"{self.PcanLib!r} is not one of {', '.join(PCAN_LIBS)}"))
+
+
+@dataclass
+class EcuConfig:
+    """ECU of the EcuList section, reached through the CAN channel of the default profile"""
+    name: str
+    TxId: int
+    RxId: int
+
+
+@dataclass
+class DaemonConfig:
+    """Optional Daemon section (8_UDSDaemon.py / 9_UDSCli.py)"""
+    address: Optional[str] = None
+    session: Optional[int] = 3
+    tester_present: float = 2.0
+
+
+@dataclass
+class ProjectConfig:
+    """Project files of the scripts (keys found at any level of the file, e.g. Information / InputData)"""
+    name: Optional[str] = None
+    DIDDataExcel: Optional[str] = None
+    DIDStatusExcel: Optional[str] = None
+    DiagSeqExcel: Optional[str] = None
+    PathToArxml: Optional[str] = None
+    PathToArxmlList: Optional[List[str]] = None
+    PathToMergedArxml: Optional[str] = None
+    PDX_Folder: Optional[str] = None
+    ULP_Folder: Optional[str] = None
+
+
+@dataclass
+class UDSConfig:
+    """
+    Typed content of a project config file, loaded and validated once per process.
+
+    The CanConfig section is the default profile. The optional Profiles section adds named
+    profiles (other ECU and/or other CAN channel), each one overrides the CanConfig values:
+
+    Profiles:
+      Bench2:
+        CanApi4Config: {net_name: Can_500k_2}
+      Slave1:
+        TxId: 0x6B5
+        RxId: 0x695
+
+    The ECUs of the EcuList section can also be used as profiles (TxId / RxId of the ECU on the
+    default CAN channel).
+
+    Example:
+        Config = UDSConfig.load('Config_PR105.yml')
+        Uds = UDSInterface(FileConfig=Config, Profile='Bench2')
+    """
+    path: str
+    data: Dict[str, Any]
+    project: ProjectConfig
+    can: CanConfig
+    profiles: Dict[str, CanConfig] = field(default_factory=dict)
+    ecus: List[EcuConfig] = field(default_factory=list)
+    daemon: DaemonConfig = field(default_factory=DaemonConfig)
+
+    @classmethod
+    def load(cls, FileConfig: Union[str, "UDSConfig", None] = None) -> "UDSConfig":
+        """
+        Config of a file (None: file given by Config.yml), cached until the file is modified.
+        A UDSConfig is returned as it is, so the functions accept a file path or a loaded config.
+
+        Raises:
+            UDSConfigError: Invalid values (all the errors of the file are reported).
+        """
+        if isinstance(FileConfig, UDSConfig):
+            return FileConfig
+        path = os.path.abspath(FileConfig if FileConfig is not None else loadConfigFilePath())
+        data = load_yaml(path)
+        with _cache_lock:
+            cached = _cache.get(path)
+            if cached is not None and cached.data is data:
+                return cached
+        config = cls.from_dict(data, path)
+        with _cache_lock:
+            _cache[path] = config
+        return config
+
+    @classmethod
+    def from_dict(cls, data: dict, path: str = '') -> "UDSConfig":
+        errors: List[Tuple[str, str]] = []
+
+        can_section = _section(data, 'CanConfig', errors)
+        can = CanConfig.from_dict('default', can_section, errors)
+
+        profiles = {}
+        for name, overrides in _section(data, 'Profiles', errors).items():
+            if not isinstance(overrides, dict):
+                errors.append((f"Profiles.{name}", "Mapping of the CanConfig values expected"))
+                continue
+            profiles[str(name)] = CanConfig.from_dict(str(name), _merge(can_section, overrides), errors)
+
+        ecus = []
+        ecu_list = data.get('EcuList') or []
+        if not isinstance(ecu_list, list):
+            errors.append(('EcuList', "List of {name, TxId, RxId} expected"))
+            ecu_list = []
+        for index, ecu in enumerate(ecu_list):
+            if not isinstance(ecu, dict) or not all(isinstance(ecu.get(key), int) for key in ('TxId', 'RxId')):
+                errors.append((f"EcuList[{index}]", f"{{name, TxId, RxId}} expected, not {ecu!r}"))
+                continue
+            ecus.append(EcuConfig(str(ecu.get('name') or f"ECU_{ecu['TxId']:X}"), ecu['TxId'], ecu['RxId']))
+        for key, values in (('name', [ecu.name for ecu in ecus]), ('RxId', [ecu.RxId for ecu in ecus])):
+            duplicates = sorted({str(value) for value in values if values.count(value) > 1})
+            if duplicates:
+                errors.append(('EcuList', f"Duplicate {key}: {', '.join(duplicates)}"))
+
+        daemon_section = _section(data, 'Daemon', errors)
+        daemon = DaemonConfig(address=daemon_section.get('Address'),
+                              session=daemon_section.get('Session', 3),
+                              tester_present=daemon_section.get('TesterPresent', 2.0))
+        if daemon.session is not None and not isinstance(daemon.session, int):
+            errors.append(('Daemon.Session', f"Session number expected, not {daemon.session!r}"))
+        if not isinstance(daemon.tester_present, (int, float)):
+            errors.append(('Daemon.TesterPresent', f"Interval in seconds expected, not {daemon.tester_present!r}"))
+
+        try:
+            UDSTiming.from_dict(data.get('UdsTiming'))
+        except (TypeError, ValueError) as e:
+            errors.append(('UdsTiming', str(e)))
+
+        project = ProjectConfig(**{item.name: _find(data, 'project' if item.name == 'name' else item.name)
+                                   for item in fields(ProjectConfig)})
+
+        if errors:
+            raise UDSConfigError(path or '<config>', errors)
+        return cls(path, data, project, can, profiles, ecus, daemon)
+
+    def channel(self, profile: Optional[str] = None) -> CanConfig:
+        """CanConfig of a profile (None: default profile, name of the Profiles or of the EcuList section)"""
+        if profile is None or profile == self.can.name:
+            return self.can
+        if profile in self.profiles:
+            return self.profiles[profile]
+        for ecu in self.ecus:
+            if ecu.name == profile:
+                ecu_channel = copy.deepcopy(self.can)
+                ecu_channel.name, ecu_channel.TxId, ecu_channel.RxId = ecu.name, ecu.TxId, ecu.RxId
+                return ecu_channel
+        raise KeyError(f"Unknown profile {profile} (Profiles / EcuList of {self.path})")
+
+    def timing(self) -> UDSTiming:
+        """New timing model of the UdsTiming section (each UDSInterface updates its own P2 / P2*)"""
+        return UDSTiming.from_dict(self.data.get('UdsTiming'))
+
+    def get(self, keys: Union[str, List[str]], default: Any = None) -> Any:
+        """Value of an optional section / key, e.g. get(['Options', 'PDX_options'])"""
+        current = self.data
+        for key in [keys] if isinstance(keys, str) else keys:
+            if not isinstance(current, dict) or key not in current:
+                return default
+            current = current[key]
+        return current
+
+
+_cache: Dict[str, UDSConfig] = {}
+_cache_lock = threading.Lock()
+
+
+def _section(data: dict, key: str, errors: List[Tuple[str, str]]) -> dict:
+    section = data.get(key) or {}
+    if not isinstance(section, dict):
+        errors.append((key, "Section expected"))
+        return {}
+    return section
+
+
+def _sub_config(cls, section: Optional[dict]):
+    section = section if isinstance(section, dict) else {}
+    return cls(**{item.name: section.get(item.name) for item in fields(cls)})
+
+
+def _merge(base: dict, overrides: dict) -> dict:
+    """Copy of base updated with overrides (the nested sections are merged key by key)"""
+    merged = dict(base)
+    for key, value in overrides.items():
+        merged[key] = _merge(base[key], value) if isinstance(value, dict) and isinstance(base.get(key), dict) else value
+    return merged
+
+
+def _find(data: Any, key: str) -> Any:
+    """First value of key at any level of the file"""
+    if isinstance(data, dict):
+        if key in data:
+            return data[key]
+        for value in data.values():
+            found = _find(value, key)
+            if found is not None:
+                return found
+    return None
+
+
+# Example Usage
+if __name__ == "__main__":
+    Config = UDSConfig.load()
+    print(Config.project)
+    print(Config.channel())
+    for name in list(Config.profiles) + [ecu.name for ecu in Config.ecus]:
+        print(Config.channel(name))
@@ -0,0 +1,335 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AUTHKEY_FILE = 'authkey'
+
+# UDSInterface methods which can not be called through the daemon (endless loop on the channel)
+BLOCKED_METHODS = {'startCanStoringTrace'}
+
+
+def user_directory() -> str:
+    """Directory of the current user only (mode 0700) holding the daemon socket and authentication key"""
+    if sys.platform == 'win32':
+        path = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~'), 'UDSDaemon')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    path = os.path.join(os.path.expanduser('~'), '.UDSDaemon')
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not owned by the current user")
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+def default_address() -> str:
+    """Named pipe of the user on Windows, Unix socket in the user directory otherwise"""
+    if sys.platform == 'win32':
+        return r'\\.\pipe\UDSDaemon-' + os.environ.get('USERNAME', 'user')
+    return os.path.join(user_directory(), 'UDSDaemon.sock')
+
+
+def default_authkey() -> bytes:
+    """
+    Random authentication key of the user, created at first use in the user directory (read by the
+    user only). Daemon and clients of the same user share it, other users can not send requests.
+    """
+    path = os.path.join(user_directory(), AUTHKEY_FILE)
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, 'rb') as file:
+            return file.read()
+
+    # Key written in a temporary file then linked: a daemon and a client started together use the same key
+    temp_path = f"{path}.{os.getpid()}"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as file:
+        file.write(os.urandom(32))
+    try:
+        if os.path.exists(path):
+            os.replace(temp_path, path)  # Empty file of an interrupted creation
+        else:
+            os.link(temp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+class UDSDaemonError(RuntimeError):
+    """Request refused or failed in the daemon"""
+
+
+class UDSDaemon:
+    """
+    Keep one UDSInterface open in a long-lived process: the CAN channel is initialized once,
+    the diagnostic session is entered once and kept alive with TesterPresent. The requests of
+    UDSDaemonClient (other processes, the CLI) are executed on it through a local named pipe
+    (Windows) or Unix socket, so they take the time of the UDS request only and the session
+    state is kept between two commands.
+
+    Requests: {'method': UDSInterface method name, 'args': [...], 'kwargs': {...}}
+    Replies:  {'ok': True, 'result': result} or {'ok': False, 'error': message}
+
+    Example:
+        UDSDaemon(UDSInterface(FileConfig='Config.yml')).serve_forever()
+    """
+
+    def __init__(self, UdsClient, address: Optional[str] = None, authkey: Optional[bytes] = None,
+                 session: Optional[int] = 3, tester_present: float = 2.0):
+        """
+        Parameters:
+            authkey (bytes): Key of the clients (None: random key of the user, see default_authkey()).
+            session (int): Diagnostic session entered at start (None: keep the current session).
+            tester_present (float): TesterPresent keep-alive interval in seconds (0: no keep-alive).
+        """
+        self.Uds = UdsClient
+        self.address = address or default_address()
+        self.authkey = authkey or default_authkey()
+        self.session = session
+        self.tester_present = tester_present
+        self.started = 0.0
+        self.requests = 0
+        self._stop = threading.Event()
+        self._keep_alive = None
+
+    def status(self) -> Dict[str, Any]:
+        return {'address': self.address, 'session': self.session, 'requests': self.requests,
+                'uptime': time.time() - self.started if self.started else 0.0,
+                'TxId': self.Uds.TxId, 'RxId': self.Uds.RxId}
+
+    def execute(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one request on the UDSInterface, the errors are returned in the reply"""
+        method = request.get('method', '')
+        if method == 'status':
+            return {'ok': True, 'result': self.status()}
+        if method == 'shutdown':
+            self.shutdown()
+            return {'ok': True, 'result': 'Daemon stopped'}
+
+        func = getattr(self.Uds, method, None) if not method.startswith('_') and method not in BLOCKED_METHODS else None
+        if not callable(func):
+            return {'ok': False, 'error': f"Unknown method : {method}"}
+
+        self.requests += 1
+        try:
+            result = func(*request.get('args', ()), **request.get('kwargs', {}))
+        except (Exception, SystemExit) as e:
+            # SystemExit: some UDSInterface services still call exit() on fatal errors
+            return {'ok': False, 'error': str(e) or type(e).__name__}
+
+        if method == 'StartSession' and result and result[0] == 'OK':
+            self.session = request['args'][0] if request.get('args') else request['kwargs'].get('number')
+        return {'ok': True, 'result': result}
+
+    def _handle(self, conn) -> None:
+        with conn:
+            while not self._stop.is_set():
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                reply = self.execute(request)
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    # Result which can not be pickled (e.g. generator of UploadBlocks)
+                    conn.send({'ok': False, 'error': f"Result of {request.get('method')} not transferable: {e}"})
+
+    def _bind(self) -> Listener:
+        if sys.platform != 'win32' and os.path.exists(self.address):
+            try:
+                Client(self.address, authkey=self.authkey).close()
+            except (ConnectionError, OSError):
+                os.remove(self.address)  # Socket file of a daemon not stopped properly
+            except AuthenticationError:
+                raise RuntimeError(f"A UDS daemon with another key is already running on {self.address}")
+            else:
+                raise RuntimeError(f"A UDS daemon is already running on {self.address}")
+        return Listener(self.address, authkey=self.authkey)
+
+    def serve_forever(self) -> None:
+        """Enter the session, start the keep-alive and execute the requests until shutdown()"""
+        from .UDSInterface import TesterPresentKeepAlive
+
+        if self.session is not None:
+            status, error = self.Uds.StartSession(self.session)
+            if status != 'OK':
+                logger.warning(f"Session {self.session} not entered => {error}")
+        if self.tester_present > 0:
+            self._keep_alive = TesterPresentKeepAlive(self.Uds, interval=self.tester_present,
+                                                      functional_id=getattr(self.Uds, 'FunctionalId', None))
+            self._keep_alive.start()
+
+        self.started = time.time()
+        self._stop.clear()
+        try:
+            with self._bind() as listener:
+                print(f"UDS daemon listening on {self.address}")
+                while not self._stop.is_set():
+                    try:
+                        conn = listener.accept()
+                    except (OSError, EOFError, AuthenticationError) as e:
+                        if not self._stop.is_set():
+                            logger.warning(f"Client connection refused: {e}")
+                        continue
+                    threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            if self._keep_alive is not None:
+                self._keep_alive.stop()
+                self._keep_alive = None
+            print("UDS daemon stopped")
+
+    def shutdown(self) -> None:
+        """Stop serve_forever() (from a request handler or another thread)"""
+        self._stop.set()
+        # Wake up accept()
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except Exception:
+            pass
+
+
+class UDSDaemonClient:
+    """
+    Client of a UDSDaemon: the UDSInterface methods are called by name and executed in the daemon.
+
+    Example:
+        with UDSDaemonClient() as Uds:
+            print(Uds.ReadDID('F190'))
+    """
+
+    def __init__(self, address: Optional[str] = None, authkey: Optional[bytes] = None):
+        self.address = address or default_address()
+        self.authkey = authkey or default_authkey()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        if self._conn is None:
+            try:
+                self._conn = Client(self.address, authkey=self.authkey)
+            except (ConnectionError, OSError) as e:
+                raise ConnectionError(f"UDS daemon not running on {self.address} ({e})") from e
+            except AuthenticationError as e:
+                raise ConnectionError(f"UDS daemon on {self.address} refused the authentication key ({e})") from e
+
+        self._conn.send({'method': method, 'args': args, 'kwargs': kwargs})
+        reply = self._conn.recv()
+        if not reply['ok']:
+            raise UDSDaemonError(reply['error'])
+        return reply['result']
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+
+def _print_result(result) -> None:
+    if hasattr(result, 'hex') and not isinstance(result, (bytes, bytearray)):
+        print(result.hex())  # HexBytes
+    elif isinstance(result, (list, tuple)):
+        print(" | ".join(str(item) for item in result))
+    else:
+        print(result)
+
+
+def main(argv: Optional[List[str]] = None, FileConfig: Optional[str] = None, address: Optional[str] = None) -> int:
+    """
+    Command line client (the daemon itself is started with 'serve'):
+        read F190 | write DA79 "0;1" | session 3 | reset 1 | rc start|stop|result DD35 [DATA]
+        dtc [MASK] | raw 22F190 | status | stop
+    """
+    parser = argparse.ArgumentParser(description="UDS requests through the UDS daemon")
+    parser.add_argument('--address', default=address, help="Named pipe / Unix socket of the daemon")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="Start the daemon (CAN channel of the config file)")
+    serve.add_argument('--config', default=FileConfig, help="Config file of the UDSInterface")
+    serve.add_argument('--profile', default=None, help="Profile of the config file (Profiles / EcuList)")
+    serve.add_argument('--session', type=int, default=3, help="Session entered at start (0: none)")
+    serve.add_argument('--tester-present', type=float, default=2.0, help="Keep-alive interval in s (0: none)")
+
+    commands.add_parser('read', help="ReadDataByIdentifier").add_argument('DID')
+    write = commands.add_parser('write', help="WriteDataByIdentifier")
+    write.add_argument('DID')
+    write.add_argument('data', help="Bytes separated by ';' (e.g. '0;1') or hex string")
+    commands.add_parser('session', help="DiagnosticSessionControl").add_argument('number', type=int)
+    commands.add_parser('reset', help="ECUReset").add_argument('number', type=int)
+    rc = commands.add_parser('rc', help="RoutineControl")
+    rc.add_argument('action', choices=['start', 'stop', 'result'])
+    rc.add_argument('DID')
+    rc.add_argument('data', nargs='?', default='')
+    commands.add_parser('dtc', help="ReadDTCInformation (status mask)").add_argument('mask', nargs='?', default='')
+    commands.add_parser('raw', help="Raw request in hex (e.g. 22F190)").add_argument('request')
+    commands.add_parser('status', help="Daemon status")
+    commands.add_parser('stop', help="Stop the daemon")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        from .UDSInterface import UDSInterface
+
+        if args.config is None:
+            parser.error("serve needs --config")
+        UDSDaemon(UDSInterface(FileConfig=args.config, Profile=args.profile), args.address,
+                  session=args.session or None, tester_present=args.tester_present).serve_forever()
+        return 0
+
+    calls = {
+        'read':    lambda: ('ReadDID', [args.DID]),
+        'write':   lambda: ('Pcan_WriteDID', [args.DID, args.data]),
+        'session': lambda: ('StartSession', [args.number]),
+        'reset':   lambda: ('StartReset', [args.number]),
+        'rc':      lambda: ({'start': 'Pcan_StartRC', 'stop': 'Pcan_StopRC', 'result': 'Pcan_ResultRC'}[args.action],
+                            [args.DID, args.data] if args.action == 'start' else [args.DID]),
+        'dtc':     lambda: ('Pcan_ReadDTCs', [args.mask]),
+        'raw':     lambda: ('WriteReadRequest', [list(bytes.fromhex(args.request))]),
+        'status':  lambda: ('status', []),
+        'stop':    lambda: ('shutdown', []),
+    }
+    method, call_args = calls[args.command]()
+    try:
+        with UDSDaemonClient(args.address) as client:
+            result = client.call(method, *call_args)
+    except (ConnectionError, UDSDaemonError) as e:
+        print(e)
+        return 1
+
+    if args.command == 'raw':
+        result = result['response'] if result['status'] == True else f"NOK : {result['response']}"
+    _print_result(result)
+    return 0
+
+
+# Example Usage
+if __name__ == "__main__":
+    # python -m UDS.UDSDaemon serve --config Config_PR105.yml
+    # python -m UDS.UDSDaemon read F190
+    sys.exit(main())
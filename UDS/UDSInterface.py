@@ -1,11 +1,19 @@
 from .PCANBasicWrapper import PCANBasicWrapper
 from .CanApi4Wrapper import CanApi4Wrapper
 from .Utils import *
-import pandas as pd
+from .UDSConfig import UDSConfig
+from .UDSTiming import UDSTiming
+from .IsoTp import segment
+from .SeedKey import get_key_engine
+from .UDSCodec import (HexBytes, RC_RESULT, RC_START, RC_STOP, RDTCI_DTC_BY_STATUS_MASK, RDTCI_EXTENDED_DATA_BY_DTC,
+                       RDTCI_SNAPSHOT_BY_DTC, SID_READ_MEMORY_BY_ADDRESS, SID_REQUEST_UPLOAD, encode_memory_request,
+                       encode_read_did, encode_read_dtc_information, encode_routine_control, encode_write_did)
+from .DTC import DtcList, decode_extended_data_records, decode_snapshot_records
+import mmap
 import time
 import logging
 from enum import Enum, IntEnum
-from typing import Optional, Union, List, Tuple
+from typing import Iterator, Optional, Union, List, Tuple
 import threading
 
 
@@ -18,9 +26,12 @@ class UDSInterface():
     # Shows if DLL was found
     m_DLLFound = False
 
-    def __init__(self, IsCanFD=None, TxID=None, RxID=None, IsExtended=None, IsFiltered=None, IsPadded=None, PcanLib=None, FileConfig=None):
+    def __init__(self, IsCanFD=None, TxID=None, RxID=None, IsExtended=None, IsFiltered=None, IsPadded=None, PcanLib=None, FileConfig=None, Profile=None):
         """
         Create an object starts the programm
+
+        FileConfig is a config file or a UDSConfig already loaded (UDSConfig.load), Profile the name of
+        one of its Profiles / EcuList entries (None: CanConfig section).
         """
         self.comOk = False
         # Set Configuration
@@ -33,10 +44,14 @@ class UDSInterface():
         self.q = PeekableQueue()
         self.m_DLLFound = ''
         self.lock = threading.Lock()
-
-        # Get the configuration from file
-        if FileConfig != None:
-            load_config(self, globals(), FileConfig)
+        # Transmit lock: the frames of a segmented request are not interleaved with the keep-alive frames
+        self.tx_lock = threading.RLock()
+
+        # Get the configuration from file (parsed and validated once per process)
+        Config = UDSConfig.load(FileConfig) if FileConfig != None else None
+        Channel = Config.channel(Profile) if Config != None else None
+        if Channel != None:
+            Channel.apply(self)
         NoneData = []
         for itemName in self.__dict__.keys():
             if getattr(self, itemName) is None:
@@ -47,10 +62,10 @@ class UDSInterface():
 
         if self.PcanLib == "PCANBasicLib":
             # load PCanBasic Wrapper
-            self.m_objWrapper = PCANBasicWrapper(FileConfig=FileConfig, TxID=TxID, RxID=RxID, IsCanFD=IsCanFD, IsExtended=IsExtended, IsPadded=IsPadded, IsFiltered=IsFiltered)
+            self.m_objWrapper = PCANBasicWrapper(FileConfig=Config, Profile=Profile, TxID=TxID, RxID=RxID, IsCanFD=IsCanFD, IsExtended=IsExtended, IsPadded=IsPadded, IsFiltered=IsFiltered)
         elif self.PcanLib == "CanApi4Lib":
             # load CanApi4 Wrapper
-            self.m_objWrapper = CanApi4Wrapper(FileConfig=FileConfig, TxID=TxID, RxID=RxID, IsCanFD=IsCanFD, IsExtended=IsExtended, IsPadded=IsPadded, IsFiltered=IsFiltered)
+            self.m_objWrapper = CanApi4Wrapper(FileConfig=Config, Profile=Profile, TxID=TxID, RxID=RxID, IsCanFD=IsCanFD, IsExtended=IsExtended, IsPadded=IsPadded, IsFiltered=IsFiltered)
         else:
             print ("Please define the correct PCANLib to use (PCANBasic or CanApi4) ")
             exit(0)
@@ -64,6 +79,19 @@ class UDSInterface():
 
         self.comOk = self.m_objWrapper.comOk
 
+        # P2 / P2* timing model (defaults, per-service and per-routine values from config)
+        self.timing = Config.timing() if Config != None else UDSTiming()
+
+        # Typed configuration, given to the objects created from this interface (sessions, daemon, ...)
+        self.config = Config
+        self.profile = Channel.name if Channel != None else None
+        # Optional functional request ID (CanConfig: FunctionalId) used by the TesterPresent keep-alive
+        self.FunctionalId = Channel.FunctionalId if Channel != None else None
+        # Optional CAN ID of the periodic DID frames (CanConfig: PeriodicRxId) used by PeriodicDidReader
+        self.PeriodicRxId = Channel.PeriodicRxId if Channel != None else None
+        # Time of the last frame written on the bus (keep-alive scheduling)
+        self.last_activity = 0.0
+
     def __del__(self):
         if self.m_objWrapper is not None:
             del self.m_objWrapper
@@ -234,23 +262,30 @@ class UDSInterface():
         '''
         Function for writing CAN messages
         '''
-        return self.m_objWrapper.write(id, data)
+        with self.tx_lock:
+            self.last_activity = time.time()
+            return self.m_objWrapper.write(id, data)
 
-    def __WriteUDSRequest(self, data, timeout=2):
-        max_Frame = 64 if self.IsCanFD else 8
-        total_length = len(data)
-        if total_length < max_Frame:  # Single Frame
-            
-            if total_length < 8:
-                sf_message = [total_length] + data
-            else:
-                sf_message = [total_length >> 8, total_length & 0xFF] + data
-            self.WriteMessages(self.TxId, sf_message)
-        else:  # Multi-Frame Communication
-            ff_payload = data[:max_Frame - 2]
-            first_frame = [0x10 | ((total_length >> 8) & 0x0F), total_length & 0xFF] + ff_payload
-            # print("first_frame = ", first_frame)
-            self.WriteMessages(self.TxId, first_frame)
+    def PrepareRequest(self, data) -> List[bytes]:
+        """
+        Build the ISO-TP frames of a UDS request (bytes, written as they are by the CAN wrappers).
+        The frames can be prepared in advance (e.g. on a worker thread) and given to WriteReadRequest.
+        """
+        return segment(data, self.IsCanFD)
+
+    def __WriteUDSRequest(self, data, timeout=2, frames=None):
+        if frames is None:
+            frames = self.PrepareRequest(data)
+
+        # The transmit lock is kept from the first frame to the last consecutive frame
+        with self.tx_lock:
+            self.__WriteFrames(frames, timeout)
+
+    def __WriteFrames(self, frames, timeout):
+        # Single Frame or First Frame
+        self.WriteMessages(self.TxId, frames[0])
+
+        if len(frames) > 1:  # Multi-Frame Communication
 
             # Wait for Flow Control (FC)
             start_time = time.time()
@@ -266,14 +301,8 @@ class UDSInterface():
                 raise RuntimeError("No Flow Control received.")
 
             # Send Consecutive Frames
-            seq_number = 1
-            data_remaining = data[max_Frame - 2:]  # Remaining data after the First Frame
-            while data_remaining:
-                cf_payload = data_remaining[:max_Frame - 1]
-                cf_message = [0x20 | seq_number] + cf_payload
+            for cf_message in frames[1:]:
                 self.WriteMessages(self.TxId, cf_message)
-                data_remaining = data_remaining[max_Frame - 1:]
-                seq_number = (seq_number + 1) % 16  # Sequence number wraps around
 
                 # Wait for separation time (STmin)
                 wait_ms(st_min)
@@ -292,8 +321,8 @@ class UDSInterface():
         dataRemaining = 0
         responseCmdWait = 0
         FrameConsumed = True
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
             if isWorkingInThread:
                 msg = self.q.peek()
                 FrameConsumed = True
@@ -319,6 +348,8 @@ class UDSInterface():
                         responseCmdWait = 1
                         if SendMultiFrameReaquest:
                             self.WriteMessages(self.TxId, [0x30, 0x00, 0x00])
+                        # Segmented reception => wait N_Cr for each consecutive frame
+                        deadline = max(deadline, time.time() + self.timing.n_cr)
                     elif (msg['data'][0] & 0xF0 == 0x20) and (response["id"] == msg['id']):
                         if (msg['data'][0] & 0xF == responseCmdWait):
                             if dataRemaining < len(msg['data']):
@@ -330,6 +361,8 @@ class UDSInterface():
                             if dataRemaining == 0 and len(response["data"]) == response["size"]:
                                 frameReceived = True
                                 responseCmdWait = 0
+                            else:
+                                deadline = max(deadline, time.time() + self.timing.n_cr)
                             responseCmdWait += 1
                             responseCmdWait %= 16
                         else:
@@ -352,35 +385,56 @@ class UDSInterface():
                         break
         return response
 
-    def WriteReadRequest(self, message, resp_req=True, timeout=2, debug=True):
-        
+    def WriteReadRequest(self, message, resp_req=True, timeout=None, debug=True, frames=None):
+        """
+        Send a UDS request and wait for its response with the P2/P2* timing model.
+
+        Parameters:
+            message (list): UDS request payload (SID + parameters).
+            resp_req (bool): False to return as soon as the ECU answers (response not decoded).
+            timeout (float): Optional P2 override in seconds, by default the value configured
+                             for the service / routine is used. Each NRC 0x78 restarts the wait with P2*.
+            debug (bool): False to return only the raw response bytes of a positive answer.
+                          True: request and response are returned as HexBytes (raw bytes,
+                          hex strings formatted on access for the reports).
+            frames (list): ISO-TP frames of the message already built with PrepareRequest().
+        """
         return_value = {'request' : [], 'response' : [], 'status' : False}
         msg = {}
+        responded = False
         
         if self.comOk == False:
             print ("No Communication established")
             exit(0)
+
+        p2, p2_star = self.timing.deadlines(message, timeout)
         
         with self.lock:
             try:
-                self.__WriteUDSRequest(message, timeout)
+                self.__WriteUDSRequest(message, self.timing.n_bs, frames)
                 
-                start_time = time.time()
-                while time.time() - start_time < timeout:
+                deadline = time.time() + p2
+                while time.time() < deadline:
 
-                    msg = self.__ReadUDSRequest()
+                    msg = self.__ReadUDSRequest(timeout=max(0.0, deadline - time.time()))
 
                     if (msg['id'] == self.RxId):
 
+                        if (msg['data'][0] == 0x7F) and (msg['data'][1] == message[0]) and (msg['data'][2] == 0x78):
+                            # Response pending => the final response is expected within P2*
+                            deadline = time.time() + p2_star
+                            continue
+
+                        responded = True
+
                         # Response not required
                         if not resp_req:
                             return None
                         
                         if (msg['data'][0] == 0x7F) and (msg['data'][1] == message[0]):
                             error_code = msg['data'][2]
-                            
-                            if error_code != 0x78:
-                                return_value['response'] = (f"Negative response: Error code 0x{error_code:02X}: " + self.__get_uds_nrc_description(error_code))
+                            return_value['response'] = (f"Negative response: Error code 0x{error_code:02X}: " + self.__get_uds_nrc_description(error_code))
+                            break
                             
                         elif verifyFrame(msg['data'], message, min(msg['size'], len(message))):
                             if len(msg['data']) < msg['size']: 
@@ -400,22 +454,39 @@ class UDSInterface():
                         elif (msg['data'][0] == 0x77):
                             return_value['status'] = True
                             break
+
+                        elif (msg['data'][0] in (0x63, 0x75)) and (msg['data'][0] == message[0] + 0x40):
+                            # ReadMemoryByAddress / RequestUpload: the request parameters are not echoed
+                            return_value['status'] = True
+                            break
+
+                        elif (msg['data'][0] == 0x59) and (message[0] == 0x19) and (msg['data'][1] == message[1]):
+                            # ReadDTCInformation: only the sub-function is echoed
+                            return_value['status'] = True
+                            break
                         else:
+                            responded = False
                             print('WriteReadRequest Error : ', [format_hex(item) for item in msg['data']])
 
                 if debug == True:
-                    return_value['request']  = [format_hex(item) for item in message]
-                    return_value['response'] = [format_hex(item) for item in msg['data']]
+                    return_value['request']  = HexBytes(message)
+                    return_value['response'] = HexBytes(msg['data'])
+                elif return_value['status'] == True:
+                    return_value['response'] = msg['data']
                 
-                if time.time() - start_time > timeout:
+                if not responded:
                     return_value['response'] = (f"Time out No Response")
+
+                # Raw response of the last request (diagnostic sequences variables)
+                self.last_response = msg['data'] if responded else None
                 
             except Exception as e:
                 return_value['response'] = e
+                self.last_response = None
         # print(return_value) # For debug
         return return_value
 
-    def RcRequest(self, message, timeout:int=2, debug=True):
+    def RcRequest(self, message, timeout:Optional[float]=None, debug=True):
         # Set the return structure values
         return_value = {'request' : [], 'response' : [], 'status' : False}
         rc_msg = {}
@@ -425,15 +496,20 @@ class UDSInterface():
             print ("No Communication established")
             exit(0)
 
+        # P2 / P2* of the routine (message starts with the PCI byte)
+        p2, p2_star = self.timing.deadlines(message[1:], timeout)
+
         with self.lock:
             try:
-                self.WriteMessages(self.TxId, message)
+                self.WriteMessages(self.TxId, list(message))
 
-                start_time = time.time()
-                while time.time() - start_time < timeout:
+                timed_out = True
+                deadline = time.time() + p2
+                while time.time() < deadline:
                     rc_msg = self.ReadMessages()
 
                     if (rc_msg is not None):
+                        timed_out = False
                         if((rc_msg['id']      == self.RxId)  and\
                            (rc_msg['data'][1] == 0x71)       and\
                            (rc_msg['data'][3] == message[3]) and\
@@ -470,7 +546,9 @@ class UDSInterface():
                                 (rc_msg['data'][1] == 0x7F) and\
                                 (rc_msg['data'][2] == 0x31)):
                             if (rc_msg['data'][3] == 0x78):
-                                # Pending still in progress
+                                # Pending still in progress => final response expected within P2*
+                                timed_out = True
+                                deadline = time.time() + p2_star
                                 continue
                             else:
                                 # return 'NOK', rc_msg['data'], ('ResultRc Error : ' + self.__get_uds_nrc_description(rc_msg['data'][3]))
@@ -486,25 +564,30 @@ class UDSInterface():
                 #     return_value['response'] = rc_msg['data']
 
                 if debug == True:
-                    return_value['request']  = [format_hex(item) for item in message]
-                    return_value['response'] = [format_hex(item) for item in rc_msg['data']]
+                    return_value['request']  = HexBytes(message)
+                    return_value['response'] = HexBytes(rc_msg['data'])
+
+                # Raw response of the last request without the PCI byte (diagnostic sequences variables)
+                self.last_response = None if timed_out else rc_msg['data'][1:1 + rc_msg['data'][0]]
 
-                if time.time() - start_time > timeout:
+                if timed_out:
                     raise TimeoutError(f"Time out No Response")
 
             except Exception as e:
                 return_value['response'] = e
                 return_value['status'] = False
+                self.last_response = None
         
         # print(return_value) # For debug
         return return_value
 
-    def ReadDID(self, DID, decode=None):
+    def ReadDID(self, DID, decode=None, message=None):
         """
         Read data from a specified DID using UDS ReadDataByIdentifier (0x22) with multi-frame support.
 
         Parameters:
             DID (str): The 2-byte Data Identifier (e.g., "F190").
+            message (bytes): Optional request already encoded (encode_read_did), sent as it is.
 
         Returns:
             list: List of bytes if the read was successful.
@@ -514,14 +597,8 @@ class UDSInterface():
             print ("No Communication established")
             exit(0)
         try:
-            if len(DID) != 4 or not all(c in "0123456789ABCDEFabcdef" for c in DID):
-                raise ValueError(f"Invalid DID: {DID}. It must be a 4-character hex string.")
-
-            iDid = int(DID,16)
-            iDidHigh = (iDid & 0xFF00) >> 8
-            iDidLow = iDid & 0xFF
-
-            message = [0x22, iDidHigh, iDidLow]
+            if message is None:
+                message = encode_read_did(DID)
 
             data = self.WriteReadRequest(message)
 
@@ -536,13 +613,14 @@ class UDSInterface():
         except Exception as e:
             return [f"Read {DID}", e]
 
-    def WriteDID(self, DID, data):
+    def WriteDID(self, DID, data, message=None):
         """
         Writes data to a specified DID using UDS WriteDataByIdentifier (0x2E) with multi-frame support.
 
         Parameters:
             DID (str): The 2-byte Data Identifier (e.g., "3481").
             data (list): A list of bytes to write to the DID.
+            message (bytes): Optional request already encoded (encode_write_did), sent as it is.
 
         Returns:
             bool: True if the write was successful, False otherwise.
@@ -551,19 +629,11 @@ class UDSInterface():
             print ("No Communication established")
             exit(0)
         try:
-            if len(DID) != 4 or not all(c in "0123456789ABCDEFabcdef" for c in DID):
-                raise ValueError(f"Invalid DID: {DID}. It must be a 4-character hex string.")
-
-            if len(data) == 0 or len(data) > 4095:
-                raise ValueError(f"Invalid data length: {len(data)}. Must be between 1 and 4095 bytes.")
-
-            # Convert DID to bytes
-            iDid = int(DID, 16)
-            did_high = (iDid & 0xFF00) >> 8
-            did_low = iDid & 0x00FF
+            if message is None:
+                if len(data) == 0 or len(data) > 4095:
+                    raise ValueError(f"Invalid data length: {len(data)}. Must be between 1 and 4095 bytes.")
 
-            # Construct the first message payload
-            message = [0x2E, did_high, did_low] + data
+                message = encode_write_did(DID, data)
 
             data = self.WriteReadRequest(message)
             # print(data) # For debug
@@ -594,13 +664,15 @@ class UDSInterface():
         except Exception as e:
             return [f'NOK', '', e]
 
-    def StartRC(self, DID, data=None, timeout=2):
+    def StartRC(self, DID, data=None, timeout=None, message=None):
         """
         Start routine controle using UDS (0x31).
 
         Parameters:
             DID (str): The 2-byte Data Identifier (e.g., "3481").
             data (list): A list of bytes as argument for the routine control.
+            timeout (float): Optional P2 override in seconds (default from the timing model).
+            message (bytes): Optional frame already encoded (encode_routine_control), sent as it is.
 
         Returns:
             bool: True if the write was successful, False otherwise.
@@ -609,30 +681,16 @@ class UDSInterface():
             print ("No Communication established")
             exit(0)
         try:
-            if len(DID) != 4 or not all(c in "0123456789ABCDEFabcdef" for c in DID):
-                raise ValueError(f"Invalid DID: {DID}. It must be a 4-character hex string.")
-
-            # Convert DID to bytes
-            iDid = int(DID, 16)
-            did_high = (iDid & 0xFF00) >> 8
-            did_low = iDid & 0x00FF
+            if message is None:
+                if data is not None and len(data) > 4095:
+                    raise ValueError(f"Invalid data length: {len(data)}. Must be between 1 and 4095 bytes.")
 
-            # Message payload
-            startRcMsgPL  = [0x31, 0x01, did_high, did_low]
+                message = encode_routine_control(RC_START, DID, data)
 
-            # Construct the message payload
-            if(data is None or len(data) == 0):
-                message = [len(startRcMsgPL)] + startRcMsgPL
-            else:
-                if len(data) == 0 or len(data) > 4095:
-                    raise ValueError(f"Invalid data length: {len(data)}. Must be between 1 and 4095 bytes.")
-                else:
-                    message = [len(startRcMsgPL + data)] + startRcMsgPL + data
-            
             resp = self.RcRequest(message, timeout)
             # print(resp)
             if resp['status'] == True:
-                if(resp['response'][0] == '0x04'):
+                if(resp['response'].raw[0] == 0x04):
                     return [f'OK', '', 'Remark : No output byte']
                 else:
                     return [f'OK', '', 'Output data : ' + str(resp['response'][5:])]
@@ -642,12 +700,13 @@ class UDSInterface():
         except Exception as e:
             return [f'NOK', '', e]
 
-    def StopRC(self, DID):
+    def StopRC(self, DID, message=None):
         """
         Stop routine controle using UDS (0x31).
 
         Parameters:
             DID (str): The 2-byte Data Identifier (e.g., "3481").
+            message (bytes): Optional frame already encoded (encode_routine_control), sent as it is.
 
         Returns:
             bool: True if the write was successful, False otherwise.
@@ -656,19 +715,8 @@ class UDSInterface():
             print ("No Communication established")
             exit(0)
         try:
-            if len(DID) != 4 or not all(c in "0123456789ABCDEFabcdef" for c in DID):
-                raise ValueError(f"Invalid DID: {DID}. It must be a 4-character hex string.")
-
-            # Convert DID to bytes
-            iDid = int(DID, 16)
-            did_high = (iDid & 0xFF00) >> 8
-            did_low = iDid & 0x00FF
-
-            # Message payload
-            stopRcMsgPL   = [0x31, 0x02, did_high, did_low]
-
-            # Construct the message payload
-            message = [len(stopRcMsgPL)] + stopRcMsgPL
+            if message is None:
+                message = encode_routine_control(RC_STOP, DID)
 
             resp = self.RcRequest(message)
             
@@ -680,12 +728,13 @@ class UDSInterface():
         except Exception as e:
             return [f'NOK', '', e]
 
-    def ResultRC(self, DID):
+    def ResultRC(self, DID, message=None):
         """
         Result routine controle using UDS (0x31).
 
         Parameters:
             DID (str): The 2-byte Data Identifier (e.g., "3481").
+            message (bytes): Optional frame already encoded (encode_routine_control), sent as it is.
 
         Returns:
             bool: True if the write was successful, False otherwise.
@@ -694,45 +743,35 @@ class UDSInterface():
             print ("No Communication established")
             exit(0)
         try:
-            if len(DID) != 4 or not all(c in "0123456789ABCDEFabcdef" for c in DID):
-                raise ValueError(f"Invalid DID: {DID}. It must be a 4-character hex string.")
-
-            # Convert DID to bytes
-            iDid = int(DID, 16)
-            did_high = (iDid & 0xFF00) >> 8
-            did_low = iDid & 0x00FF
-
-            # Message payload
-            resultRcMsgPL = [0x31, 0x03, did_high, did_low]
-
-            # Construct the message payload
-            message = [len(resultRcMsgPL)] + resultRcMsgPL
+            if message is None:
+                message = encode_routine_control(RC_RESULT, DID)
 
             resp = self.RcRequest(message)
             # print(resp) # For debug
 
             if resp['status'] == True:
-                if(resp['response'][0] == 4):
+                if(resp['response'].raw[0] == 4):
                     return [f'OK', '', 'Remark : No output byte']
                 else:
-                    return [str(self.__get_uds_rc_status_desc(resp['response'][5])), '', '']
+                    return [str(self.__get_uds_rc_status_desc(resp['response'].raw[5])), '', '']
             else:
                 return [f'NOK', '', 'ResultRc Error : ' + str(self.__get_uds_rc_status_desc(resp['response'][3])) + ' => ' + str(resp['response'])]
         
         except Exception as e:
             return [f'NOK', '', e]
 
-    def ClearDTC(self, data):
+    def ClearDTC(self, data, message=None):
 
         if self.comOk == False:
             print ("No Communication established")
             exit(0)
         try:
-            if len(data) == 0 or len(data) > 3:
-                raise ValueError(f"Invalid data length: {len(data)}. Must be between 1 and 3 bytes.")
+            if message is None:
+                if len(data) == 0 or len(data) > 3:
+                    raise ValueError(f"Invalid data length: {len(data)}. Must be between 1 and 3 bytes.")
 
-            # Construct the first message payload
-            message = [0x14] + data
+                # Construct the first message payload
+                message = [0x14] + data
 
             data = self.WriteReadRequest(message)
 
@@ -744,7 +783,69 @@ class UDSInterface():
         except Exception as e:
             return [f"ClearDTC Exception : ", False, e]
 
-    def SecurityAccess(self, level: int, key: Optional[bytes] = None, timeout_sa:int = 2) -> bool:
+    def ReadDTCs(self, mask: int = 0xFF) -> DtcList:
+        """
+        Read the DTCs matching a status mask (ReadDTCInformation 0x19 0x02).
+
+        Returns:
+            DtcList: DTC numbers (array) and status bytes of the DTCs.
+
+        Raises:
+            RuntimeError: If the ECU rejects the request.
+        """
+        resp = self.WriteReadRequest(encode_read_dtc_information(RDTCI_DTC_BY_STATUS_MASK, mask=mask))
+        if resp['status'] != True or len(resp['response']) < 3:
+            raise RuntimeError(f"ReadDTCInformation 0x02 failed: {resp['response']}")
+        return DtcList.from_response(resp['response'].raw)
+
+    def ReadDTCSnapshot(self, dtc: int, record: int = 0xFF, sizes: Optional[dict] = None) -> List[dict]:
+        """
+        Read the snapshot records of a DTC (0x19 0x04), record 0xFF = all the records.
+
+        Parameters:
+            sizes (dict): Optional {DID: size} to split the snapshot DIDs (see DynamicDID.load_did_sizes()).
+        """
+        resp = self.WriteReadRequest(encode_read_dtc_information(RDTCI_SNAPSHOT_BY_DTC, dtc=dtc, record=record))
+        if resp['status'] != True or len(resp['response']) < 6:
+            raise RuntimeError(f"ReadDTCInformation 0x04 0x{dtc:06X} failed: {resp['response']}")
+        return decode_snapshot_records(resp['response'].raw[6:], sizes)
+
+    def ReadDTCExtendedData(self, dtc: int, record: int = 0xFF, sizes: Optional[dict] = None) -> dict:
+        """
+        Read the extended data records of a DTC (0x19 0x06), record 0xFF = all the records.
+
+        Parameters:
+            sizes (dict): Optional {record number: size} to split several records.
+        """
+        resp = self.WriteReadRequest(encode_read_dtc_information(RDTCI_EXTENDED_DATA_BY_DTC, dtc=dtc, record=record))
+        if resp['status'] != True or len(resp['response']) < 6:
+            raise RuntimeError(f"ReadDTCInformation 0x06 0x{dtc:06X} failed: {resp['response']}")
+        return decode_extended_data_records(resp['response'].raw[6:], sizes)
+
+    def ReadDTCReport(self, mask: int = 0xFF, dem: Optional[dict] = None, snapshot: bool = False,
+                      extended_data: bool = False, did_sizes: Optional[dict] = None,
+                      record_sizes: Optional[dict] = None) -> List[dict]:
+        """
+        Read the DTCs of the ECU in one call: DTC list (0x19 0x02) decoded and mapped to the Dem
+        configuration (see DTC.load_dem_config()), with the snapshot (0x04) and extended data (0x06)
+        records of each DTC if requested.
+
+        Returns:
+            list: One dict per DTC (DTC, Code, Status, Status bits, Name, Events, [Snapshot], [Extended data]).
+        """
+        dtcs = self.ReadDTCs(mask)
+        records = dtcs.records(dem)
+        for code, record in zip(dtcs.codes, records):
+            try:
+                if snapshot:
+                    record['Snapshot'] = self.ReadDTCSnapshot(code, sizes=did_sizes)
+                if extended_data:
+                    record['Extended data'] = self.ReadDTCExtendedData(code, sizes=record_sizes)
+            except RuntimeError as e:
+                record['Error'] = str(e)
+        return records
+
+    def SecurityAccess(self, level: int, key: Optional[bytes] = None, timeout_sa:Optional[float] = None) -> bool:
         """Perform security access (request seed or send key)"""
         # try:
         # Request seed (odd level)
@@ -776,38 +877,70 @@ class UDSInterface():
         #     logger.error(f"Security access failed: {str(e)}")
         #     return False
 
-    def SecurityAccess_negociation(self, level_seed: int, level_key: int, timeout_ms=5000, sa_debug=False) -> bool:
-        """Perform security access (request seed or send key)"""
-        # try:
-        sc_result = {'request' : [], 'response' : [],'status' : False}
-        wait_time:int = 0
-
-        while (sc_result['status'] == False) and (wait_time < timeout_ms):
-            # Request security access
-            sc_result = self.SecurityAccess(level_seed)
-            wait_time += 300
-            wait_ms(300)
-        
-        if (sa_debug == True):
-            if(wait_time >= timeout_ms): print(f"SecurityAccess level {level_seed} => Failed => Response : {sc_result['response']}")
-        else:
-            if(wait_time >= timeout_ms): raise TimeoutError(f"SecurityAccess level {level_seed} => Failed => Response : {sc_result['response']}")
+    def SecurityAccess_negociation(self, level_seed: int, level_key: int, timeout_ms=5000, sa_debug=False,
+                                   key_algorithm: Optional[str] = None) -> bool:
+        """
+        Unlock the ECU: request the seed, compute the key and send it.
 
-        # Here you would typically compute the key from the seed
+        Parameters:
+            key_algorithm (str): Key algorithm (see SeedKey.load_key_algorithm), 'debug_key' by default.
+            sa_debug (bool): Print the failures instead of raising an exception.
 
-        # Force the debug key
-        if(sa_debug == True):
-            # Manually provide a 32-bit (4-byte) key
-            key = bytes([0xFF, 0xFF, 0xFF, 0xFF])  # Replace with real OEM-calculated key
+        The seed request is retried with backoff until timeout_ms. NRC 0x37 (required time delay
+        not expired) waits once for the security delay timer (UdsTiming SecurityDelay) instead.
+        """
+        # try:
+        engine = get_key_engine(key_algorithm or 'debug_key')
 
-        sc_result = self.SecurityAccess(level_key, key, timeout_sa=timeout_ms)
+        # Request security access
+        deadline = time.time() + timeout_ms / 1000
+        retry_delay = 0.05
+        delay_waited = False
+        while True:
+            sc_result = self.SecurityAccess(level_seed)
+            if sc_result['status'] == True:
+                break
+
+            if response_nrc(sc_result['response']) == 0x37 and not delay_waited:
+                # The ECU refuses the seed until its delay timer expires
+                logger.info(f"SecurityAccess level {level_seed} => Required time delay not expired => Wait {self.timing.security_delay}s")
+                delay_waited = True
+                wait_ms(self.timing.security_delay * 1000)
+                deadline = max(deadline, time.time() + self.timing.p2)
+                continue
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                if (sa_debug == True):
+                    print(f"SecurityAccess level {level_seed} => Failed => Response : {sc_result['response']}")
+                    return False
+                raise TimeoutError(f"SecurityAccess level {level_seed} => Failed => Response : {sc_result['response']}")
+            wait_ms(min(retry_delay, remaining) * 1000)
+            retry_delay = min(retry_delay * 2, 0.5)
+
+        seed = bytes(sc_result['response'][2:])
+
+        # Zero seed => security access already granted
+        if seed and not any(seed):
+            logger.info(f"SecurityAccess level {level_seed} => Already unlocked")
+            return True
+
+        key = engine.compute(seed, level_seed)
+
+        sc_result = self.SecurityAccess(level_key, key, timeout_sa=timeout_ms / 1000)
         
         if(sc_result['status'] != True):
+            if response_nrc(sc_result['response']) == 0x35:
+                # Invalid key => do not reuse the cached key of this seed
+                engine.invalidate(seed, level_seed)
             if (sa_debug == True):
                 print(f"SecurityAccess level {level_key} => Failed => Response : {sc_result['response']}")
+                return False
             else:
                 raise RuntimeError(f"SecurityAccess level {level_key} => Failed => Response : {sc_result['response']}")
 
+        return True
+
         # except Exception as e:
         #     logger.error(f"Security access failed: {str(e)}")
         #     pass
@@ -864,7 +997,7 @@ class UDSInterface():
         
         except Exception as e:
             logger.error(f"RequestDownload error: {str(e)}")
-            exit()
+            raise ValueError(f"RequestDownload : Address or size does not fit the format ({e})") from e
 
         payload = list(bytes([0x34, data_format, addr_len_format])) + list(addr_bytes) + list(size_bytes)
         # For debug
@@ -888,51 +1021,30 @@ class UDSInterface():
     
     def TransferData(self, block_number: int, data: bytes, address: int, dataSize=False) -> bool:
         # """Transfer data block"""
-        try:
-            if address > 0:
+        return self.TransferDataPayload(block_number, transfer_data_payload(block_number, data, address, dataSize))
 
-                message = [0x36, block_number] + int_to_byteList(address, 3)
-
-                if dataSize == True:
-                    payload = bytearray(message) + bytearray([len(data)]) + bytearray(data)
-                else:
-                    payload = bytearray(message) + bytearray(data)
+    def TransferDataPayload(self, block_number: int, payload: bytes, frames=None) -> bool:
+        """
+        Send a TransferData (0x36) request already built with transfer_data_payload().
+        The ISO-TP frames can also be prepared in advance with PrepareRequest().
 
-                # print("payload = ", payload.hex())
-                # print("payload len = ",len(payload))
-                
-                # Calculate Payload + Data Block CRC
-                payload_crc = crc16_x25(payload) # Calculate CRC for block data
-                payload_crc = ((payload_crc & 0xFF) << 8) | ((payload_crc >> 8) & 0xFF)
-                payload_crc = int_to_byteList(payload_crc, 2)
-                # print('block crc =', payload_crc)
-
-                # Add CRC to the payload
-                final_payload = payload + bytearray(payload_crc)
-            else:
-                payload = [0x36, block_number]
-                final_payload = bytearray(payload) + bytearray(data)
+        Raises:
+            RuntimeError: If the ECU rejects the block or does not answer.
+        """
+        # print(payload.hex()) # For debug
 
-            # print(final_payload.hex()) # For debug
-            
-            resp = self.WriteReadRequest(list(final_payload), resp_req=False)
-            # print(resp) # For debug
+        # The raw response is checked for the block sequence counter of each block
+        resp = self.WriteReadRequest(payload, debug=False, frames=frames)
+        # print(resp) # For debug
 
-            if resp is not None:
-                if resp['status'] == True:
-                    if len(resp['response']) >= 2 and \
-                        int(resp['response'][0], 16) == 0x76 and \
-                        int(resp['response'][1], 16) == block_number:
-                        return resp['status']
+        if resp['status'] == True:
+            if len(resp['response']) >= 2 and \
+                resp['response'][0] == 0x76 and \
+                resp['response'][1] == block_number:
+                return resp['status']
 
-                logger.error(f"TransferData failed response: {resp['response']}")
-                exit()
-            
-            return resp
-            
-        except Exception as e:
-            logger.error(f"TransferData error: {str(e)} {resp['response']}")
-            exit()
+        logger.error(f"TransferData failed response: {resp['response']}")
+        raise RuntimeError(f"TransferData block {block_number} failed: {resp['response']}")
     
     def RequestTransferExit(self) -> bool:
         """Request transfer exit (finish download)"""
@@ -948,6 +1060,179 @@ class UDSInterface():
             logger.error(f"Request transfer exit failed: {str(e)} {resp['response']}")
             return False
 
+    def RequestUpload(self, data_format: int = 0x00, addr_len_format: int = 0x44, memory_addr: int = 0x00,
+                      memory_size: int = 0x00, segment_name: str = None, ALFID_reversed: bool = False) -> int:
+        """
+        Sends a RequestUpload (SID 0x35).
+
+        Parameters:
+            data_format (int): Data format identifier (0x00 = no compression / encryption).
+            addr_len_format (int): ALFID byte, upper nibble = address length, lower nibble = size length.
+            ALFID_reversed (bool): Swap the nibbles of the ALFID byte sent (same as RequestDownload()).
+
+        Returns:
+            int: maxNumberOfBlockLength of the TransferData responses (SID + block counter + data),
+                 0 if the upload is refused.
+        """
+        payload = encode_memory_request(SID_REQUEST_UPLOAD, memory_addr, memory_size, addr_len_format, data_format, ALFID_reversed)
+
+        segment_info = f" for segment '{segment_name}'" if segment_name else ""
+        logger.info(f"RequestUpload{segment_info}: Addr=0x{memory_addr:X}, Size=0x{memory_size:X}")
+
+        resp = self.WriteReadRequest(payload)
+        if resp['status'] != True or len(resp['response']) < 3:
+            logger.error(f"RequestUpload failed: {resp['response']}")
+            return 0
+
+        raw = resp['response'].raw
+        length_size = raw[1] >> 4
+        return int.from_bytes(raw[2:2 + length_size], 'big')
+
+    def UploadBlocks(self, memory_addr: int, memory_size: int, data_format: int = 0x00,
+                     addr_len_format: int = 0x44, segment_name: str = None,
+                     ALFID_reversed: bool = False) -> Iterator[Tuple[int, memoryview]]:
+        """
+        Read a memory region with RequestUpload (0x35), TransferData (0x36) and RequestTransferExit (0x37).
+
+        The blocks are streamed: each TransferData response is yielded as a view of the received
+        bytes, without intermediate copy or list. RequestTransferExit is sent when the generator
+        ends or is closed.
+
+        Yields:
+            (offset, data) of each block, offset from memory_addr.
+
+        Raises:
+            RuntimeError: If the upload is refused or a block is not received.
+        """
+        max_block_length = self.RequestUpload(data_format, addr_len_format, memory_addr, memory_size, segment_name, ALFID_reversed)
+        if max_block_length <= 2:
+            raise RuntimeError(f"RequestUpload 0x{memory_addr:X} refused")
+
+        request = bytearray([0x36, 0x01])
+        offset = 0
+        try:
+            while offset < memory_size:
+                resp = self.WriteReadRequest(request)
+                raw = resp['response'].raw if isinstance(resp['response'], HexBytes) else None
+
+                if resp['status'] != True or raw is None or len(raw) <= 2 or raw[0] != 0x76 or raw[1] != request[1]:
+                    raise RuntimeError(f"TransferData upload block {request[1]} failed: {resp['response']}")
+
+                data = raw[2:2 + memory_size - offset]
+                yield offset, data
+                offset += len(data)
+
+                # Check block number overflow
+                request[1] = request[1] + 1 if request[1] < 0xFF else 0
+        finally:
+            self.RequestTransferExit()
+
+    def Upload(self, memory_addr: int, memory_size: int, output_file: Optional[str] = None,
+               data_format: int = 0x00, addr_len_format: int = 0x44):
+        """
+        Upload a memory region (see UploadBlocks()) into a preallocated buffer or an mmap'd file.
+
+        Returns:
+            bytearray: Data read if output_file is None, else the output file path.
+        """
+        file = None
+        if output_file is None:
+            buffer = bytearray(memory_size)
+        else:
+            file = open(output_file, 'w+b')
+            file.truncate(memory_size)
+            buffer = mmap.mmap(file.fileno(), memory_size)
+
+        try:
+            for offset, data in self.UploadBlocks(memory_addr, memory_size, data_format, addr_len_format):
+                buffer[offset:offset + len(data)] = data
+            if file is not None:
+                buffer.flush()
+        finally:
+            if file is not None:
+                buffer.close()
+                file.close()
+
+        return buffer if output_file is None else output_file
+
+    def ReadMemory(self, address: int, size: int, output_file: Optional[str] = None,
+                   addr_len_format: int = 0x44, max_chunk: int = 4094, progress_callback=None):
+        """
+        Read a memory region with ReadMemoryByAddress (0x23).
+
+        The region is read with the largest chunk the ECU accepts: the chunk size starts at max_chunk
+        and is reduced when the ECU answers NRC 0x13 or 0x14 (length error). NRC 0x31 is retried once
+        with the last chunk size read, then the address is out of range. The data is written in a preallocated buffer or directly in an mmap'd output file.
+        The request lock is released between two chunks: other requests, or other EcuSessions of a
+        UDSSessionManager, can run during a long dump.
+
+        Parameters:
+            output_file (str): File created with the dump, None to return the data.
+            addr_len_format (int): ALFID byte, upper nibble = address length, lower nibble = size length.
+            max_chunk (int): Largest chunk requested (4094 = largest ISO-TP response).
+            progress_callback: Optional callback(done, total) called after each chunk.
+
+        Returns:
+            bytearray: Data read if output_file is None, else the output file path.
+
+        Raises:
+            RuntimeError: If a chunk can not be read, even with the smallest size, or is out of range.
+        """
+        if self.comOk == False:
+            print ("No Communication established")
+            exit(0)
+        if size <= 0:
+            raise ValueError(f"ReadMemory : Invalid size {size}")
+
+        chunk = max_chunk
+        read_chunk = 0   # Last chunk size read
+        file = None
+        if output_file is None:
+            buffer = bytearray(size)
+        else:
+            file = open(output_file, 'w+b')
+            file.truncate(size)
+            buffer = mmap.mmap(file.fileno(), size)
+
+        try:
+            offset = 0
+            while offset < size:
+                length = min(chunk, size - offset)
+                resp = self.WriteReadRequest(encode_memory_request(SID_READ_MEMORY_BY_ADDRESS, address + offset, length, addr_len_format))
+
+                if resp['status'] == True and len(resp['response']) == length + 1:
+                    buffer[offset:offset + length] = resp['response'].raw[1:]
+                    offset += length
+                    read_chunk = length
+                    if progress_callback is not None:
+                        progress_callback(offset, size)
+                    continue
+
+                # Chunk length refused => retry with a smaller power of 2
+                nrc = response_nrc(resp['response'])
+                if nrc in (0x13, 0x14) and length > 1:
+                    chunk = length // 2 if (length & (length - 1)) == 0 else 1 << (length.bit_length() - 1)
+                    logger.info(f"ReadMemory : chunk of {length} bytes refused => {chunk} bytes")
+                    continue
+
+                # Request out of range => retry once with the last chunk size read
+                if nrc == 0x31 and 0 < read_chunk < length:
+                    chunk = read_chunk
+                    logger.info(f"ReadMemory : chunk of {length} bytes out of range => {chunk} bytes")
+                    continue
+
+                raise RuntimeError(f"ReadMemoryByAddress 0x{address + offset:X} ({length} bytes) failed: {resp['response']}")
+
+            if file is not None:
+                buffer.flush()
+        finally:
+            if file is not None:
+                buffer.close()
+                file.close()
+
+        logger.info(f"ReadMemory : 0x{address:X} {size} bytes read (chunk {chunk} bytes)")
+        return buffer if output_file is None else output_file
+
     def StartSession(self, number):
         status = 'NOK'
         error = ''
@@ -961,6 +1246,10 @@ class UDSInterface():
         resp = self.WriteReadRequest(data)
 
         if (resp['status'] == True):
+            # Apply the P2/P2* server timings returned by the ECU
+            if self.timing.read_from_session and isinstance(resp['response'], HexBytes):
+                self.timing.update_from_session_response(resp['response'].raw)
+
             if(number == 1):
                 print (f"Default session activated...")
             elif(number == 2):
@@ -975,6 +1264,60 @@ class UDSInterface():
             error = str(resp['response'])
         return status, error
 
+    def WaitReady(self, timeout: Optional[float] = None, initial_delay: Optional[float] = None, probe=None,
+                  wait_reset: bool = True) -> bool:
+        """
+        Wait until the ECU answers again after a reset instead of a fixed sleep.
+
+        The ECU is polled with a cheap request (TesterPresent 0x3E 0x00 by default). With wait_reset
+        the ECU must first stop answering: an answer of the application which is not reset yet is
+        not taken for the readiness. The ECU is then polled with an exponential backoff, the wait
+        ends as soon as a positive response is received.
+
+        Parameters:
+            timeout (float): Maximum wait in seconds (default UdsTiming ReadyTimeout).
+            initial_delay (float): Wait once the ECU stopped answering, before the readiness polls (default UdsTiming ResetDelay).
+            probe (list): Request used to poll the ECU.
+            wait_reset (bool): Wait first until the ECU stops answering (reset in progress).
+        """
+        timeout = self.timing.ready_timeout if timeout is None else timeout
+        initial_delay = self.timing.reset_delay if initial_delay is None else initial_delay
+        probe = probe or [UDSService.TESTER_PRESENT, 0x00]
+        send_probe = lambda: self.WriteReadRequest(probe, timeout=self.timing.p2, debug=False)
+
+        start = time.time()
+        if wait_reset:
+            # Probes sent back to back: the ECU is down when a probe is not answered
+            down, _ = poll_until(lambda: (send_probe(), self.last_response)[1], lambda response: response is None,
+                                 timeout=timeout, initial_delay=0.005, max_delay=0.02)
+            if not down:
+                logger.warning(f"ECU reset not observed after {timeout}s => the ECU kept answering")
+                return False
+        remaining = timeout - (time.time() - start)
+        time.sleep(max(0.0, min(initial_delay, remaining)))
+
+        ready, resp = poll_until(send_probe, lambda resp: resp['status'] == True,
+                                 timeout=max(0.0, timeout - (time.time() - start)), initial_delay=0.02, max_delay=0.5)
+
+        if ready:
+            logger.info(f"ECU ready after {time.time() - start:.2f}s")
+        else:
+            logger.warning(f"ECU not ready after {timeout}s => {resp['response']}")
+        return ready
+
+    def WaitRoutineResult(self, DID, timeout: float = 60.0, expected: str = 'ROUTINE_FINISHED_OK'):
+        """
+        Poll the routine results (0x31 0x03) until the routine is finished, with an exponential backoff.
+
+        Returns:
+            list: Last ResultRC() result [status, response, error].
+        """
+        finished, result = poll_until(lambda: self.ResultRC(DID), lambda result: result[0] == expected,
+                                      timeout=timeout, initial_delay=0.02, max_delay=0.3)
+        if not finished:
+            logger.warning(f"Routine {DID} not finished after {timeout}s => {result}")
+        return result
+
     def StartReset(self, rstReq):
         status = 'NOK'
         error = ''
@@ -995,11 +1338,11 @@ class UDSInterface():
 
         return status, error
 
-    def Pcan_ReadDID(self, did, size):
-        retVal = self.ReadDID(did)
+    def Pcan_ReadDID(self, did, size, message=None):
+        retVal = self.ReadDID(did, message=message)
 
-        if is_hex(retVal[0]) == True:
-            data = ";".join(format_hex(int(x, 16)) for x in retVal or [])
+        if isinstance(retVal, HexBytes):
+            data = ";".join(retVal)
 
             if((size is not None) and (size != '')):
                 if is_int(size):
@@ -1077,6 +1420,21 @@ class UDSInterface():
         # Return a tuple (status, error)
         return status, Error
 
+    def Pcan_ReadDTCs(self, dataraw=None):
+        # Status mask (default 0xFF => all the DTCs)
+        mask = str_to_hexList(dataraw, ';') if dataraw not in (None, '') else []
+        try:
+            dtcs = self.ReadDTCs(mask[0] if mask else 0xFF)
+            status = "OK"
+            data = ";".join(f"{record['Code']}:{record['Status']}" for record in dtcs.records())
+            Error = f"{len(dtcs)} DTC"
+        except Exception as e:
+            status = "NOK"
+            data = ""
+            Error = str(e)
+        # Return a tuple (status, data, error)
+        return status, data, Error
+
     def getFrameFromId(self, canId, timeout=2):
         """
         Retrieve CAN message from CAN ID
@@ -1113,6 +1471,8 @@ class UDSInterface():
         return returnValue
 
     def startCanStoringTrace(self, df=None, decodeFrame=True):
+        import pandas as pd
+
         if not isinstance(df, pd.DataFrame):
             print("The object is NOT a pandas DataFrame.")
             return
@@ -1295,3 +1655,45 @@ class TesterPresentThread(ControllableThread):
 
     def on_stop(self):
         print("[TesterPresent] Stopped")
+
+
+class TesterPresentKeepAlive(ControllableThread):
+    """
+    Lightweight TesterPresent: 0x3E 0x80 (suppress positive response) sent as a raw frame.
+
+    The frame is only sent when nothing has been written on the bus during the interval, on the
+    functional ID if functional_id is set, on the physical ID otherwise. The request lock is never
+    used: the frame has no response to read (suppressPosRsp), so it is also sent while a request
+    waits for its response (e.g. long P2* wait), only the transmit lock is taken so it never
+    falls inside a segmented transfer (between flow control and consecutive frames).
+    No need to pause it around the other services (e.g. security access).
+    """
+    FRAME = [0x02, int(UDSService.TESTER_PRESENT), 0x80]
+
+    def __init__(self, uds_client, interval=2.0, functional_id: Optional[int] = None):
+        super().__init__(name="TesterPresentKeepAlive", interval=min(interval, 0.1))
+        self.Uds = uds_client
+        self.keep_alive_interval = interval
+        self.functional_id = functional_id
+
+    def on_tick(self):
+        if time.time() - self.Uds.last_activity < self.keep_alive_interval:
+            return
+        try:
+            # Not sent in the middle of a segmented request (between flow control and consecutive frames)
+            if not self.Uds.tx_lock.acquire(blocking=False):
+                return
+            try:
+                self.Uds.WriteMessages(self.Uds.TxId if self.functional_id is None else self.functional_id,
+                                       list(self.FRAME))
+            finally:
+                self.Uds.tx_lock.release()
+            logger.debug("TesterPresent (0x3E 0x80) sent")
+        except Exception as e:
+            logger.warning(f"TesterPresent failed: {e}")
+
+    def on_start(self):
+        print("[TesterPresent] Started")
+
+    def on_stop(self):
+        print("[TesterPresent] Stopped")
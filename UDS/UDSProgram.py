@@ -2,12 +2,13 @@ import time
 import logging
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
 from UDS.BinaryParser import *
-from UDS.UDSInterface import TesterPresentThread, UDSInterface
+from UDS.UDSInterface import TesterPresentKeepAlive, UDSInterface
 from UDS.Utils import *
-import intelhex
+from UDS.FlashJournal import FlashJournal
 
 import binascii
 
@@ -62,10 +63,259 @@ class UDSPdxProgConfig:
     max_retries: int = 3
     block_size: int = DataBlockSize.BLOCK_2048.value - 3 # Subtract : Max-1, service ID, block number bytes
     security_level: int = 1                              # Default security level
-    key_algorithm: str = 'xor_ff'                        # Simple XOR algorithm for example
+    key_algorithm: str = 'debug_key'                     # Registered name, 'module:function' or seed/key library (see SeedKey)
+    resume_at_offset: bool = False                       # Bootloader accepts a RequestDownload at the offset of an interrupted segment
+    delta_flash: bool = False                            # Skip the data blocks already on the ECU (fingerprint DIDs)
+    readback_verify: bool = False                        # Read back each segment (RequestUpload) and compare the block CRCs
+    progress_journal: bool = False                       # Keep a progress journal to resume an interrupted programming
+    journal_save_every: int = 64                         # Acknowledged blocks between two writes of the journal
+
+@dataclass
+class PdxSegment:
+    """Segment of a PDX binary loaded in memory"""
+    id: str
+    start_address: int
+    size: int
+    data_format: int
+    compressed: bool
+    data: Union[bytes, memoryview]                       # Zero-copy view of the mapped PDX binary (valid until PdxImage.close())
+    blocks: List[Tuple[int, bytes, int]] = field(default_factory=list)  # (block number, payload, data size)
+
+@dataclass
+class PdxImage:
+    """PDX file loaded in memory, shared read-only by the programming jobs"""
+    pdx_file: str
+    bin_file: str
+    info: dict
+    tob: str
+    pob: str
+    block_size: int = 0                                  # Block size of the prepared payloads
+    segments: List[PdxSegment] = field(default_factory=list)
+    parser: Optional[BinaryParser] = field(default=None, repr=False)  # Mapped binary of the segment views
+    temp_folder: Optional[str] = None                    # PDX temporary folder removed by close()
+
+    def close(self) -> None:
+        """Release the segment views, unmap the binary and remove the PDX temporary folder"""
+        for seg in self.segments:
+            if isinstance(seg.data, memoryview):
+                seg.data.release()
+        if self.parser is not None:
+            self.parser.close()
+            self.parser = None
+        if self.temp_folder is not None and os.path.exists(self.temp_folder):
+            shutil.rmtree(self.temp_folder)
+        self.temp_folder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def size(self) -> int:
+        return sum(seg.size for seg in self.segments)
+
+    @property
+    def sw_reference(self) -> str:
+        return self.info['DATA_BLOCKS'][0]['SW_REFERENCE'].replace('REF.', "") # ASCII => PBMS_XXXX
+
+    def fingerprint_record(self) -> List[int]:
+        """Target fingerprint (F01B) : TOB + POB + ODX-F checksum"""
+        # Remove all non-hex characters except letters/numbers
+        checksum_hex_str = ''.join(re.findall(r'[A-Fa-f0-9]+', self.info['CHECKSUMS'][-1]['CHECKSUM-RESULT']))
+        return str_to_hexList(self.tob) + str_to_hexList(self.pob) + str_to_hexList(checksum_hex_str)
+
+    def traceability_record(self) -> List[int]:
+        """Traceability information (F01C) : TOB + POB + length + software reference"""
+        extra_data = self.sw_reference
+        return (str_to_hexList(self.tob) + str_to_hexList(self.pob) +
+                [len(extra_data)//2] + str_to_hexList(extra_data + '30303030'))
+
+    def cs_version_record(self) -> List[int]:
+        """CS_Version (F03B) : TOB + POB + 0000"""
+        return str_to_hexList(self.tob) + str_to_hexList(self.pob) + str_to_hexList('0000')
+
+    def is_on_ecu(self, fingerprints: Dict[str, bytes]) -> bool:
+        """
+        Check if the ECU already carries this data block: the F01B fingerprint (ODX-F checksum),
+        the F03B CS_Version and the F01C traceability record (written at the end of a successful
+        programming) read from the ECU must contain the records of the image.
+        """
+        records = {'F01B': self.fingerprint_record(), 'F03B': self.cs_version_record(), 'F01C': self.traceability_record()}
+        for DID, record in records.items():
+            value = fingerprints.get(DID)
+            if not value or bytes(record) not in value:
+                return False
+        return True
+
+@dataclass
+class UlpImage:
+    """ULP file converted to Intel HEX and loaded in memory"""
+    ulp_file: str
+    firmware_data: Dict[int, bytes]
+    blocks: List[Tuple[int, bytes, int]] = field(default_factory=list)  # (block number, payload, data size)
+
+    @property
+    def size(self) -> int:
+        return sum(len(data) for address, data in self.firmware_data.items() if address > 0)
+
+def prepare_transfer_blocks(address: int, data: bytes, block_size: int, block_number: int = 1,
+                            directFlow: bool = False) -> Iterable[Tuple[int, bytes, int]]:
+    """
+    Build the TransferData payloads of a data buffer.
+
+    Yields:
+        (block number, payload, data size) for each block, block numbers wrap from 0xFF to 0.
+    """
+    view = memoryview(data)
+    for idx in range(0, len(view), block_size):
+        block = view[idx:idx + block_size]
+
+        # Check directflow => No address + No Ckecksum
+        if directFlow == True:
+            payload = transfer_data_payload(block_number, block, 0)
+        else:
+            payload = transfer_data_payload(block_number, block, address, True)
+            # Update address offset
+            address = address + block_size
+
+        yield block_number, payload, len(block)
+
+        # Check block number overflow
+        block_number = block_number + 1 if block_number < 0xFF else 0
+
+def load_pdx_images(files_list: List[str], block_size: int = UDSPdxProgConfig.block_size,
+                    prepare_blocks: bool = True, clean: bool = True) -> List[PdxImage]:
+    """
+    Extract the PDX files and map their binaries once: the segment data are zero-copy views
+    of the mapped files, kept open until PdxImage.close() (call it once the programming is done).
+
+    Parameters:
+        files_list: PDX files to program (in programming order).
+        block_size: TransferData block size used to prepare the payloads.
+        prepare_blocks: Build the TransferData payloads of each segment (shared by all the jobs).
+        clean: Remove the PDX temporary folders when the images are closed.
+    """
+    images = []
+
+    for file in files_list:
+        pdxfBinFile, odxfDataFile, pdxDict = extractPdxFileInfo(file)
+        if not pdxDict:
+            raise UDSProgrammingError(f"PDX data extraction failed => {file}")
+
+        image = PdxImage(pdx_file=file,
+                         bin_file=pdxfBinFile,
+                         info=pdxDict,
+                         tob=pdxDict['DATA_BLOCKS'][0]['TOB'],
+                         pob=pdxDict['DATA_BLOCKS'][0]['POB'],
+                         block_size=block_size if prepare_blocks else 0)
+
+        if clean:
+            image.temp_folder = os.path.dirname(pdxfBinFile)
+        images.append(image)
+
+        data_offset = 0
+        image.parser = BinaryParser(pdxfBinFile, '<')
+        try:
+            image.parser.open()
+            # The segments are views of the mapped binary (no copy of the file)
+            buffer = image.parser.view()
+            for seg in pdxDict['SEGMENTS']:
+                compressed = seg['ENCRYPT-COMPRESS-METHOD'] != '00'
+                # Get segment size
+                size = seg['COMPRESSED-SIZE'] if compressed else seg['UNCOMPRESSED-SIZE']
+                if data_offset + size > len(buffer):
+                    raise UDSProgrammingError(f"Segment {seg['ID']} beyond the end of {os.path.basename(pdxfBinFile)}")
+
+                segment = PdxSegment(id=seg['ID'],
+                                     start_address=int(seg['SOURCE-START-ADDRESS'], 16),
+                                     size=size,
+                                     data_format=int(seg['ENCRYPT-COMPRESS-METHOD'], 16),
+                                     compressed=compressed,
+                                     data=buffer[data_offset:data_offset + size])
+                if prepare_blocks:
+                    segment.blocks = list(prepare_transfer_blocks(segment.start_address, segment.data, block_size, 1, True))
+                image.segments.append(segment)
+
+                # Update data offset value
+                data_offset = data_offset + size
+        except Exception:
+            for loaded in images:
+                loaded.close()
+            raise
+
+    return images
+
+def load_ulp_images(files_list: List[str], block_size: int = 243, prepare_blocks: bool = True) -> List[UlpImage]:
+    """Convert the ULP files (Motorola S-record) to Intel HEX and load them in memory once"""
+    images = []
+    current_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    for file in files_list:
+        hex_file = remove_extension(file) + '.hex'
+
+        run_srec_cat(
+            srec_cat_path = current_path + "\\Tools\\srecord-1.65.0-win64\\bin\\srec_cat.exe",
+            input_files = [(file, "Motorola")],
+            output_file = hex_file,
+            output_format = "Intel"
+        )
+
+        # Load HEX file data
+        image = UlpImage(ulp_file=file, firmware_data=load_hex_file(hex_file))
+
+        if not image.firmware_data:
+            raise UDSProgrammingError("No data found in HEX file")
+
+        if prepare_blocks:
+            # Block numbers continue from one segment to the next one
+            block_number = 1
+            for address, data in image.firmware_data.items():
+                if address > 0:
+                    for block in prepare_transfer_blocks(address, data, block_size, block_number):
+                        image.blocks.append(block)
+                        block_number = block[0] + 1 if block[0] < 0xFF else 0
+
+        images.append(image)
+
+    return images
+
+def load_hex_file(file_path: str, offset: int = 0) -> Dict[int, bytes]:
+    """
+    Load an Intel HEX file and return a dictionary of {adjusted_address: data_chunk},
+    applying an optional address offset.
+
+    :param file_path: Path to the Intel HEX file
+    :param offset: Address offset to apply to each segment
+    :return: Dict mapping adjusted start addresses to byte chunks
+    """
+    import intelhex
+
+    data = {}
+    ih = intelhex.IntelHex(file_path)
+
+    # Display all the Hex segments
+    segments = ih.segments()
+    print("All segments:", [(hex(start), hex(end)) for start, end in segments])
+
+    for start, end in ih.segments():
+        segment_data = ih.tobinarray(start=start, end=end - 1)
+        adjusted_start = start + offset
+        data[adjusted_start] = bytes(segment_data)
+        if(offset > 0):
+            print(f"[HEX] Segment 0x{start:08X}–0x{end - 1:08X} ➜ Adjusted 0x{adjusted_start:08X}, Size: {len(segment_data)}")
+
+    return data
 
 class ECUProgrammer:
-    def __init__(self, UdsClient: UDSInterface, progConfig: UDSPdxProgConfig):
+    def __init__(self, UdsClient: UDSInterface, progConfig: UDSPdxProgConfig,
+                 progress_callback: Optional[Callable[[str, int, int], None]] = None):
+        """
+        :param UdsClient: UDSInterface (or EcuSession) of the ECU to program
+        :param progConfig: Programming configuration
+        :param progress_callback: Optional callback(step, done bytes, total bytes) called after each block
+        """
         self.Uds = UdsClient
         self.programming_session_timeout: float = progConfig.programming_session_timeout
         self.security_access_timeout: float = progConfig.security_access_timeout
@@ -74,149 +324,256 @@ class ECUProgrammer:
         self.block_size: int = progConfig.block_size
         self.security_level: int = progConfig.security_level
         self.key_algorithm: str = progConfig.key_algorithm
+        self.resume_at_offset: bool = progConfig.resume_at_offset
+        self.delta_flash: bool = progConfig.delta_flash
+        self.readback_verify: bool = progConfig.readback_verify
+        self.progress_journal: bool = progConfig.progress_journal
+        self.journal_save_every: int = progConfig.journal_save_every
         self.block_number: int = 1
         self.data_format: int = 0
         self.start_address: str = ''
         self.segment_size: int = 0
         self.data_offset: int = 0
-
+        self.progress_callback = progress_callback
+        self.step: str = ''
 
     def load_hex_file(self, file_path: str, offset: int = 0) -> Dict[int, bytes]:
-        """
-        Load an Intel HEX file and return a dictionary of {adjusted_address: data_chunk},
-        applying an optional address offset.
+        """Load an Intel HEX file (see load_hex_file())"""
+        return load_hex_file(file_path, offset)
 
-        :param file_path: Path to the Intel HEX file
-        :param offset: Address offset to apply to each segment
-        :return: Dict mapping adjusted start addresses to byte chunks
-        """
-        data = {}
-        ih = intelhex.IntelHex(file_path)
+    def _report_progress(self, done: int, total: int) -> None:
+        if self.progress_callback is not None:
+            self.progress_callback(self.step, done, total)
 
-        # Display all the Hex segments
-        segments = ih.segments()
-        print("All segments:", [(hex(start), hex(end)) for start, end in segments])
-
-        for start, end in ih.segments():
-            segment_data = ih.tobinarray(start=start, end=end - 1)
-            adjusted_start = start + offset
-            data[adjusted_start] = bytes(segment_data)
-            if(offset > 0):
-                print(f"[HEX] Segment 0x{start:08X}–0x{end - 1:08X} ➜ Adjusted 0x{adjusted_start:08X}, Size: {len(segment_data)}")
-
-        return data
-    
     def program_data(self, address: int, data: bytes, directFlow: bool = False) -> None:
         """Program data to ECU memory"""
-        try:
-            # print(self.block_size, hex(self.block_size))
-            for idx in range(0, len(data), self.block_size):
-                block = data[idx:idx + self.block_size]
+        blocks = prepare_transfer_blocks(address, data, self.block_size, self.block_number, directFlow)
+        self.program_blocks(blocks, len(data), address)
+
+    def _read_ahead(self, blocks: Iterator[Tuple[int, bytes, int]]):
+        """Get the next block and build its ISO-TP frames (runs on the read-ahead worker)"""
+        block = next(blocks, None)
+        if block is None:
+            return None
+        return block, self.Uds.PrepareRequest(block[1])
+
+    def program_blocks(self, blocks: Iterable[Tuple[int, bytes, int]], total: int, address: int = 0,
+                       on_block: Optional[Callable[[int, int], None]] = None) -> None:
+        """
+        Send TransferData payloads (see prepare_transfer_blocks()).
 
-                # Check directflow => No address + No Ckecksum
-                if directFlow == True:
-                    self.Uds.TransferData(self.block_number, block, 0)
-                else:
-                    self.Uds.TransferData(self.block_number, block, address, True)
-                    # Update address offset
-                    address = address + self.block_size
+        The transfer is pipelined: the next block (payload, CRC and ISO-TP frames) is
+        prepared on a worker thread while the current block is on the bus.
 
-                # Check block number overflow
-                if self.block_number < 0xFF:
-                    self.block_number += 1
-                else:
-                    self.block_number = 0
-                
-                logger.info(f"Block : {hex(self.block_number)} => Progress: {min(idx + self.block_size, len(data))}/{len(data)} bytes")
+        :param blocks: (block number, payload, data size) of each block
+        :param total: Total number of data bytes (progress)
+        :param address: Start address (log)
+        :param on_block: Optional callback(block number, data size) called for each acknowledged block
+        """
+        done = 0
+        blocks = iter(blocks)
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="TransferReadAhead") as worker:
+                next_block = worker.submit(self._read_ahead, blocks)
+                while True:
+                    item = next_block.result()
+                    if item is None:
+                        break
+                    next_block = worker.submit(self._read_ahead, blocks)
+
+                    (block_number, payload, size), frames = item
+                    self.Uds.TransferDataPayload(block_number, payload, frames)
+                    done += size
+                    if on_block is not None:
+                        on_block(block_number, size)
+
+                    # Check block number overflow
+                    self.block_number = block_number + 1 if block_number < 0xFF else 0
+                    
+                    logger.info(f"Block : {hex(self.block_number)} => Progress: {done}/{total} bytes")
+                    self._report_progress(done, total)
             
-            logger.info(f"Successfully programmed {len(data)} bytes at 0x{address:08X}")
+            logger.info(f"Successfully programmed {done} bytes at 0x{address:08X}")
             
         except Exception as e:
             logger.error(f"Programming failed: {str(e)}")
-            raise
+            raise DataTransferError(str(e)) from e
+
+    def read_did_bytes(self, DID: str) -> Optional[bytes]:
+        """Read a DID and return its raw value (None if the read failed)"""
+        resp = self.Uds.ReadDID(DID)
+        try:
+            return bytes(resp)
+        except (TypeError, ValueError):
+            logger.warning(f"Read {DID} => Failed => response {resp}")
+            return None
+
+    def read_ecu_fingerprints(self) -> Dict[str, bytes]:
+        """Read the fingerprint (F01B), traceability (F01C) and CS_Version (F03B) DIDs of the ECU"""
+        return {DID: self.read_did_bytes(DID) for DID in ('F01B', 'F01C', 'F03B')}
+
+    def select_changed_images(self, images: List[PdxImage]) -> List[PdxImage]:
+        """Delta flashing: return the images whose data block is not already on the ECU"""
+        fingerprints = self.read_ecu_fingerprints()
+        for DID, value in fingerprints.items():
+            logger.info(f"ECU {DID} : {value.hex() if value else None}")
+        changed = []
+        for image in images:
+            if image.is_on_ecu(fingerprints):
+                logger.info(f"{image.sw_reference} => Already on the ECU (fingerprint match) => Skipped")
+            else:
+                changed.append(image)
+        logger.info(f"Delta flashing => {len(changed)}/{len(images)} data blocks to program")
+        return changed
+
+    def program_pdx_segment(self, image: PdxImage, seg: PdxSegment, offset: int = 0,
+                            journal: Optional[FlashJournal] = None) -> None:
+        """
+        Download one PDX segment (RequestDownload, TransferData blocks, TransferExit).
+
+        :param offset: Acknowledged data bytes of an interrupted segment (resume at offset)
+        :param journal: Optional progress journal updated for each acknowledged block
+        """
+        self.block_number = 1
+        self.step = seg.id
+        self.data_format = seg.data_format
+        self.segment_size = seg.size
+        self.start_address = seg.start_address
+        
+        print("Segment information :")
+        print(f" => Segment ID : {seg.id}")
+        print(f" => Segment Compressed : {seg.compressed}")
+        print(f" => Segment start address : 0x{seg.start_address:08X}")
+        print(f" => Segment size : {self.segment_size}")
+        if offset > 0:
+            print(f" => Resume at offset : {offset}")
+
+        # Convert int to bytes (using only required number of bytes) then each byte to 2-digit hex string
+        startAddr_hexList = int_to_byteList(self.start_address, 4)
+
+        # Calculate minimum number of bytes needed
+        sizeAddr_nbytes = max(1, (self.segment_size.bit_length() + 7) // 8)
+
+        # Convert int to bytes (using only required number of bytes) then each byte to 2-digit hex string
+        sizeAddr_hexList = int_to_byteList(self.segment_size, sizeAddr_nbytes)
+
+        addr_length_fmt = (len(startAddr_hexList) << 4) | len(sizeAddr_hexList)
+
+        reqDL = self.Uds.RequestDownload(self.data_format,
+                                         addr_len_format=addr_length_fmt,
+                                         memory_addr=self.start_address + offset,
+                                         memory_size=self.segment_size - offset,
+                                         segment_name=seg.id,
+                                         ALFID_reversed=True)
+
+        if reqDL != True:
+            raise UDSProgrammingError("RequestDownload => failed")
+
+        on_block = None
+        if journal is not None:
+            on_block = lambda block_number, size: journal.block_done(block_number, seg.data, size)
+
+        logger.info(f"Programming segment at 0x{self.start_address + offset:08X} ({len(seg.data) - offset} bytes)")
+        if offset == 0 and seg.blocks and image.block_size == self.block_size:
+            # Blocks prepared once when the image was loaded
+            blocks = seg.blocks
+        else:
+            blocks = prepare_transfer_blocks(self.start_address + offset, memoryview(seg.data)[offset:],
+                                             self.block_size, self.block_number, True)
+        self.program_blocks(blocks, len(seg.data) - offset, self.start_address + offset, on_block)
+
+        print(f"\nTransfert Exit => {seg.id}\n")
+        self.Uds.RequestTransferExit()
+
+    def verify_pdx_segment(self, seg: PdxSegment) -> bool:
+        """
+        Read back a segment from the ECU (RequestUpload + TransferData) and compare it block by block
+        with the source image using CRC-16/X-25. The blocks are checked while they are received.
+
+        Compressed or encrypted segments can not be compared with the ECU memory and are not verified.
+        """
+        if seg.data_format != 0:
+            logger.warning(f"Segment {seg.id} => data format 0x{seg.data_format:02X} => read back not verified")
+            return True
+
+        sizeAddr_nbytes = max(1, (seg.size.bit_length() + 7) // 8)
+        addr_length_fmt = (4 << 4) | sizeAddr_nbytes
+        source = memoryview(seg.data)
+
+        self.step = f"Verify {seg.id}"
+        blocks = self.Uds.UploadBlocks(seg.start_address, seg.size, 0x00, addr_length_fmt, seg.id, ALFID_reversed=True)
+        try:
+            for offset, data in blocks:
+                if crc16_x25(data) != crc16_x25(source[offset:offset + len(data)]):
+                    logger.error(f"Segment {seg.id} => read back mismatch at 0x{seg.start_address + offset:08X}")
+                    return False
+                self._report_progress(offset + len(data), seg.size)
+        finally:
+            blocks.close()
+
+        logger.info(f"Segment {seg.id} => read back verified ({seg.size} bytes)")
+        return True
 
     def program_ulp_files(self, files_list: List[str]) -> None:
-        """Program Intel HEX file to ECU"""
+        """Program ULP files (Motorola S-record) to ECU"""
+        self.program_ulp_images(load_ulp_images(files_list))
+
+    def program_ulp_images(self, images: List[UlpImage]) -> None:
+        """Program ULP images already loaded in memory (see load_ulp_images())"""
         
         # try:
-        output_file = ""
-        current_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        hex_file = ''
         self.block_size = 243
 
-        for idx, file in enumerate(files_list):
-
-            hex_file = remove_extension(file) + '.hex'
-
-            run_srec_cat(
-                srec_cat_path = current_path + "\\Tools\\srecord-1.65.0-win64\\bin\\srec_cat.exe",
-                input_files = [(file, "Motorola")],
-                output_file = hex_file,
-                output_format = "Intel"
-            )
+        for image in images:
+            file = image.ulp_file
+            firmware_data = image.firmware_data
 
             logger.info(f"Starting programming process for {os.path.basename(file)}")
 
-            # Load HEX file data
-            firmware_data = self.load_hex_file(hex_file)
-            
-            if not firmware_data:
-                raise UDSProgrammingError("No data found in HEX file")
-
             # Enter programming session
             # self.change_session(0x02)
             self.Uds.StartSession(0x02)
 
-            # Start TesterPresent background thread
-            tp = TesterPresentThread(self.Uds, interval=0.5)
+            # Start TesterPresent keep-alive (sent only when the bus is idle)
+            tp = TesterPresentKeepAlive(self.Uds, interval=2.0, functional_id=self.Uds.FunctionalId)
             tp.start()
             
             self.Uds.ReadDID('F080')
             self.Uds.ReadDID('F0FE')
-            
-            tp.pause()
 
-            self.Uds.SecurityAccess_negociation(1, 2 , sa_debug=True) 
+            self.Uds.SecurityAccess_negociation(1, 2 , sa_debug=True, key_algorithm=self.key_algorithm) 
 
             print('')
             self.Uds.StartRC('FF00', [0x82, 0xf0, 0x5a])
             
-            rc_ok = False
-            while (rc_ok == False):
-                # Request security access
-                status, resp, error = self.Uds.ResultRC('FF00')
-
-                if(status == 'ROUTINE_FINISHED_OK'):
-                    rc_ok = True
-                else:
-                    wait_ms(300)
+            status, resp, error = self.Uds.WaitRoutineResult('FF00')
+            if(status != 'ROUTINE_FINISHED_OK'): raise UDSProgrammingError(f"ResultRC('FF00') => Failed => {status} {error}")
             
-            reqDL = False
+            self.step = os.path.basename(file)
             self.block_number = 1
             # Program each segment
-            for address, data in firmware_data.items():
-                if reqDL == False:
-                    reqDL = self.Uds.RequestDownload(data_format=0x82,
-                                                    addr_len_format=0x11,
-                                                    memory_addr=0x00,
-                                                    memory_size=0x00)
-                if reqDL == True:
-                    if address > 0:
-                        data_bytes = bytes(data)
-                        logger.info(f"Programming segment at 0x{address:08X} ({len(data_bytes)} bytes)")
-                        self.program_data(address, data_bytes)
+            reqDL = self.Uds.RequestDownload(data_format=0x82,
+                                            addr_len_format=0x11,
+                                            memory_addr=0x00,
+                                            memory_size=0x00)
+            if reqDL == True:
+                if image.blocks:
+                    # Blocks prepared once when the image was loaded
+                    logger.info(f"Programming {len(image.blocks)} blocks ({image.size} bytes)")
+                    self.program_blocks(image.blocks, image.size)
+                else:
+                    for address, data in firmware_data.items():
+                        if address > 0:
+                            data_bytes = bytes(data)
+                            logger.info(f"Programming segment at 0x{address:08X} ({len(data_bytes)} bytes)")
+                            self.program_data(address, data_bytes)
             
             self.Uds.RequestTransferExit()
 
             self.Uds.StartRC('FF04')
             
-            rc_ok = False
-            while (rc_ok == False):          
-                status, resp, error = self.Uds.ResultRC('FF04')
-                if(status == 'ROUTINE_FINISHED_OK'):
-                    rc_ok = True
-                else:
-                    wait_ms(300)
+            status, resp, error = self.Uds.WaitRoutineResult('FF04')
+            if(status != 'ROUTINE_FINISHED_OK'): raise UDSProgrammingError(f"ResultRC('FF04') => Failed => {status} {error}")
 
             reqDL = self.Uds.RequestDownload(data_format=0x83,
                                             addr_len_format=0x11,
@@ -228,29 +585,57 @@ class ECUProgrammer:
                 if respData['status'] == False: raise UDSProgrammingError("No data found in HEX file")
 
             wait_ms(50)
+
+            tp.stop()
             
             self.Uds.StartSession(1)
             
             logger.info(f"{os.path.basename(file)} => Programmed successfully")
 
-            wait_ms(7000)
+            # Wait for the ECU restart on the new software
+            if not self.Uds.WaitReady():
+                raise TimeoutError(f"{os.path.basename(file)} => ECU not ready after programming")
             
         # except Exception as e:
         #     logger.error(f"Programming failed: {str(e)}")
         #     raise
 
-    def program_pdx_files(self, files_list: List[str]) -> None:
-        """Program PDX files to ECU"""
+    def program_pdx_files(self, files_list: List[str], resume: bool = False, journal_file: Optional[str] = None) -> None:
+        """
+        Program PDX files to ECU
+
+        :param resume: Resume an interrupted programming sequence from the progress journal
+        :param journal_file: Progress journal (default: <first PDX file>.journal.json). The journal is
+                             kept if progress_journal is set, resume is True or journal_file is given
+        """
+        images = load_pdx_images(files_list, self.block_size)
+        try:
+            journal = None
+            if self.progress_journal or resume or journal_file is not None:
+                journal = FlashJournal.load(journal_file or remove_extension(files_list[0]) + '.journal.json', images,
+                                            self.journal_save_every)
+            self.program_pdx_images(images, journal, resume)
+        finally:
+            for image in images:
+                image.close()
+
+    def program_pdx_images(self, images: List[PdxImage], journal: Optional[FlashJournal] = None,
+                           resume: bool = False) -> None:
+        """
+        Program PDX images already loaded in memory (see load_pdx_images())
+
+        :param journal: Optional progress journal, removed when the programming completes
+        :param resume: Resume from the journal: the programming session is re-entered, the images and
+                       segments already downloaded are skipped and the interrupted segment is resumed
+                       at its last acknowledged block (resume_at_offset) or restarted
+        """
 
         # try:
 
-        DataBlockInfo = defaultdict(list)
-        pdx_bin_files = []
+        if not images:
+            raise UDSProgrammingError("No PDX file to program")
 
-        for idx, file in enumerate(files_list):
-            pdxfBinFile, odxfDataFile, pdxDict = extractPdxFileInfo(file)
-            pdx_bin_files.append(pdxfBinFile)
-            DataBlockInfo[idx] = pdxDict
+        pdxDict = images[-1].info
 
         # General info
         print("\nPDX General information :\n")
@@ -263,8 +648,9 @@ class ECUProgrammer:
 
         print("")
 
-        for key, blockDict in DataBlockInfo.items():
-            # print("PDX File :", os.path.basename(file)) #TODO Fix PDX name
+        for image in images:
+            blockDict = image.info
+            print("PDX File :", os.path.basename(image.pdx_file))
             for idx in range (0, len(blockDict['DATA_BLOCKS'])):
                 # print(blockDict['DATA_BLOCKS'][idx])
                 print(f"Type and position : {swTypeDesc(blockDict['DATA_BLOCKS'][idx]['SW_REFERENCE'])} #{idx + 1}")
@@ -288,192 +674,176 @@ class ECUProgrammer:
             print("")
 
         # Check the PDX files and programmation method
-        if len(pdx_bin_files) > 1:
+        if len(images) > 1:
             print(f"Multi PDX binaries detected :")
             logger.info(f"Starting programming process of the following PDX binary files :")
-            for file in pdx_bin_files:
-                print(f' - {os.path.basename(file)}')
+            for image in images:
+                print(f' - {os.path.basename(image.bin_file)}')
         else:
-            logger.info(f"Starting programming process of {os.path.basename(pdx_bin_files[0])}")
-            print(f"PDX binary detected => {os.path.basename(pdx_bin_files[0])}.")
+            logger.info(f"Starting programming process of {os.path.basename(images[0].bin_file)}")
+            print(f"PDX binary detected => {os.path.basename(images[0].bin_file)}.")
+
+        resuming = resume and journal is not None and not journal.is_empty
+        if resuming:
+            logger.info(f"Resume programming sequence => {journal.summary()}")
 
-        # Start Programming sequence
+        # Start TesterPresent keep-alive (sent only when the bus is idle)
+        tp = TesterPresentKeepAlive(self.Uds, interval=2.0, functional_id=self.Uds.FunctionalId)
+
+        # Start Programming sequence (also when resuming: the ECU is reset in the bootloader again)
         self.Uds.ReadDID('F02B')
 
         # Enter extented session
         self.Uds.StartSession(0x03)
 
-        # Start TesterPresent background thread
-        tp = TesterPresentThread(self.Uds, interval=0.5)
         tp.start()
 
         self.Uds.ReadDID('F01A')
 
-        self.Uds.StartReset(0x2)
-        
-        wait_ms(7000)
+        if self.delta_flash and not resuming:
+            images = self.select_changed_images(images)
+            if not images:
+                tp.stop()
+                logger.info("ECU software already up to date => Nothing to program")
+                if journal is not None:
+                    journal.clear()
+                return
 
-        # Enter programming session
-        self.Uds.StartSession(0x02)
+        reset_status, _ = self.Uds.StartReset(0x2)
 
-        self.Uds.SecurityAccess_negociation(1, 2 , sa_debug=True)
+        # Wait for the ECU restart in the bootloader (reset refused: ECU already in the bootloader)
+        if not self.Uds.WaitReady(wait_reset=(reset_status == 'OK')):
+            raise TimeoutError("ECU not ready after reset")
 
-        tp.pause()
+        # Enter programming session
+        self.Uds.StartSession(0x02)
 
-        pdxInfo = {}
-        dataBlock_TOB = {}
-        dataBlock_POB = {}
+        self.Uds.SecurityAccess_negociation(1, 2 , sa_debug=True, key_algorithm=self.key_algorithm)
 
-        for idx, file in enumerate(pdx_bin_files):
+        # Target fingerprints are already written when resuming
+        for image in (images if not resuming else []):
 
-            pdxInfo = DataBlockInfo[idx]
+            pdxInfo = image.info
             # print(pdxInfo)
             print('')
             # Write target fingerprint X -------------------------------------------------
             logger.info(f"Software reference : {pdxInfo['DATA_BLOCKS'][0]['SW_REFERENCE']}")
             logger.info(f" => Write target fingerprint")
 
-            cks_count = len(pdxInfo['CHECKSUMS'])
-            # print("Number of CHECKSUM IDs:", cks_count)
-
-            # Remove all non-hex characters except letters/numbers
-            checksum_hex_str = ''.join(re.findall(r'[A-Fa-f0-9]+', pdxInfo['CHECKSUMS'][cks_count-1]['CHECKSUM-RESULT']))
-
-            # Get TOB \ POB data
-            dataBlock_TOB[idx] = pdxInfo['DATA_BLOCKS'][0]['TOB']
-            dataBlock_POB[idx] = pdxInfo['DATA_BLOCKS'][0]['POB']
-            # print(dataBlock_TOB[idx], dataBlock_POB[idx])
-
-            retData = self.Uds.WriteDID('F01B',
-                                        str_to_hexList(dataBlock_TOB[idx]) +
-                                        str_to_hexList(dataBlock_POB[idx]) +
-                                        str_to_hexList(checksum_hex_str))
+            retData = self.Uds.WriteDID('F01B', image.fingerprint_record())
             if(retData[1] != True): raise UDSProgrammingError(f"Write F01B => Failed => response {retData[2]}")
             # ---------------------------------------------------------------------------
-            logger.info(f" => Number of segments : {len(pdxInfo['SEGMENTS'])}")
+            logger.info(f" => Number of segments : {len(image.segments)}")
 
             # Write target signature X ---------------------------------------------
             logger.info(f" => Write target signature")
-            retData = self.Uds.WriteDID('F03C', str_to_hexList(dataBlock_TOB[idx]) + str_to_hexList(dataBlock_POB[idx]) + str_to_hexList('00'))
+            retData = self.Uds.WriteDID('F03C', str_to_hexList(image.tob) + str_to_hexList(image.pob) + str_to_hexList('00'))
             # print(retData)
             
             # Write target CS_Version X --------------------------------------------
             logger.info(f" => Write target CS_Version")
-            retData = self.Uds.WriteDID('F03B', str_to_hexList(dataBlock_TOB[idx]) + str_to_hexList(dataBlock_POB[idx]) + str_to_hexList('0000'))
+            retData = self.Uds.WriteDID('F03B', image.cs_version_record())
             # print(retData)
 
         retData = []
-        seg_data = {}
-        isCompressed = False
 
-        for idx, file in enumerate(pdx_bin_files):
-            print("\nCurrent PDX file =", os.path.basename(pdx_bin_files[idx]),'\n')
-            self.data_offset = 0
-
-            pdxInfo = DataBlockInfo[idx]
+        for image in images:
+            image_name = os.path.basename(image.pdx_file)
+            print("\nCurrent PDX file =", os.path.basename(image.bin_file),'\n')
+
+            if resuming and image_name in journal.completed_images:
+                logger.info(f"{image_name} => Already downloaded (journal)")
+                continue
+
+            # Segment of this image interrupted (partly written) and offset where it can be resumed
+            interrupted = journal.current if resuming and journal.current is not None and \
+                          journal.current.segment_id.startswith(f"{image_name}/") else None
+            resume_offset = 0
+            if interrupted is not None and self.resume_at_offset:
+                for seg in image.segments:
+                    if f"{image_name}/{seg.id}" == interrupted.segment_id:
+                        resume_offset = journal.resume_offset(interrupted.segment_id, seg.data)
+
+            # Keep the segments of the journal only if the logical block is not erased again:
+            # a partly written segment which can not be resumed at its offset needs a new erase
+            keep_segments = resuming and image_name in journal.erased_images and \
+                            (resume_offset > 0 if interrupted is not None else
+                             any(f"{image_name}/{seg.id}" in journal.completed_segments for seg in image.segments))
 
             # ----------------------------------------------------------------------------
-            retData = self.Uds.StartRC('0702', str_to_hexList(dataBlock_TOB[idx]) + str_to_hexList(dataBlock_POB[idx]), timeout=20)
-            if(retData[0] != 'OK'): raise UDSProgrammingError(f"StartRC('0708') => Failed => response {retData[2]}")
-            # print(retVal)
-
-            for seg in pdxInfo['SEGMENTS']:
-                self.block_number = 1
-                # print(seg) # For Debug
-
-                if(seg['ENCRYPT-COMPRESS-METHOD'] != '00'):
-                    self.data_format = int(seg['ENCRYPT-COMPRESS-METHOD'], 16)
-                    isCompressed = True
-
-                with BinaryParser(file, '<') as parser:
-                    # Get segment size
-                    if(isCompressed == True):
-                        self.segment_size = seg['COMPRESSED-SIZE']
-                        seg_data[seg['ID']] = parser._read_data(self.data_offset, seg['COMPRESSED-SIZE'])
-                    else:
-                        self.segment_size = seg['UNCOMPRESSED-SIZE']
-                        seg_data[seg['ID']] = parser._read_data(self.data_offset, seg['UNCOMPRESSED-SIZE'])
+            if not keep_segments:
+                retData = self.Uds.StartRC('0702', str_to_hexList(image.tob) + str_to_hexList(image.pob))
+                if(retData[0] != 'OK'): raise UDSProgrammingError(f"StartRC('0702') => Failed => response {retData[2]}")
+                # print(retVal)
+                if journal is not None:
+                    journal.image_erased(image_name)
+
+            for seg in image.segments:
+                segment_key = f"{image_name}/{seg.id}"
+                offset = 0
+
+                if keep_segments:
+                    if segment_key in journal.completed_segments:
+                        logger.info(f"{segment_key} => Already downloaded (journal)")
+                        continue
+                    if interrupted is not None and segment_key == interrupted.segment_id:
+                        offset = resume_offset
+
+                if journal is not None and offset == 0:
+                    journal.segment_started(segment_key)
+
+                try:
+                    self.program_pdx_segment(image, seg, offset, journal)
+                except BaseException:
+                    if journal is not None:
+                        journal.flush()    # Blocks acknowledged since the last write of the journal
+                    raise
+
+                if self.readback_verify and not self.verify_pdx_segment(seg):
+                    raise UDSProgrammingError(f"Segment {seg.id} => read back verification failed")
+
+                if journal is not None:
+                    journal.segment_done(segment_key)
                 
-                print("Segment information :")
-                print(f" => Segment ID : {seg['ID']}")
-                print(f" => Segment Compressed : {isCompressed}")
-                print(f" => Segment start address : 0x{seg['SOURCE-START-ADDRESS']}")
-                print(f" => Segment size : {self.segment_size}")
-
-                # Read segment start address
-                self.start_address = int(seg['SOURCE-START-ADDRESS'], 16)
-                # Convert int to bytes (using only required number of bytes) then each byte to 2-digit hex string
-                startAddr_hexList = int_to_byteList(self.start_address, 4)
-
-                # Calculate minimum number of bytes needed
-                sizeAddr_nbytes = max(1, (self.segment_size.bit_length() + 7) // 8)
-
-                # Convert int to bytes (using only required number of bytes) then each byte to 2-digit hex string
-                sizeAddr_hexList = int_to_byteList(self.segment_size, sizeAddr_nbytes)
-
-                # For debug
-                # print("startAddr_hexList =", startAddr_hexList)
-                # print("sizeAddr_hexList  =", sizeAddr_hexList)
-
-                addr_length_fmt = (len(startAddr_hexList) << 4) | len(sizeAddr_hexList)
-
-                reqDL = self.Uds.RequestDownload(self.data_format,
-                                                 addr_len_format=addr_length_fmt,
-                                                 memory_addr=self.start_address,
-                                                 memory_size=self.segment_size,
-                                                 segment_name=seg['ID'],
-                                                 ALFID_reversed=True)
-
-                if reqDL == True:
-                    logger.info(f"Programming segment at 0x{self.start_address:08X} ({len(seg_data[seg['ID']])} bytes)")
-                    self.program_data(self.start_address, seg_data[seg['ID']], True)
-
-                    print(f"\nTransfert Exit => {seg['ID']}\n")
-                    self.Uds.RequestTransferExit()
-
-                    # Update data offset value
-                    self.data_offset = self.data_offset + self.segment_size
-                else:
-                    raise UDSProgrammingError("RequestDownload => failed")
-                
-            retData = self.Uds.StartRC('0708', str_to_hexList(dataBlock_TOB[idx]) +
-                                                str_to_hexList(dataBlock_POB[idx]) , timeout=25)
+            retData = self.Uds.StartRC('0708', str_to_hexList(image.tob) +
+                                                str_to_hexList(image.pob))
             if(retData[0] != 'OK'): raise UDSProgrammingError(f"StartRC('0708') => Failed => response {retData[2]}")
             # ----------------------------------------------------------------------------
 
-        if not seg_data:
+            if journal is not None:
+                journal.image_done(image_name)
+
+        if not any(image.segments for image in images):
             raise UDSProgrammingError("No data found in HEX binary file")
         
-        retData = self.Uds.StartRC('0703', str_to_hexList('0000'), timeout=25)
+        retData = self.Uds.StartRC('0703', str_to_hexList('0000'))
         if(retData[0] != 'OK'): raise UDSProgrammingError(f"StartRC('0703') => Failed => response {retData[2]}")
 
-        retData = self.Uds.StartRC('0705', str_to_hexList('0000'), timeout=25)
+        retData = self.Uds.StartRC('0705', str_to_hexList('0000'))
         if(retData[0] != 'OK'): raise UDSProgrammingError(f"StartRC('0705') => Failed => response {retData[2]}")
 
-        retData = self.Uds.StartRC('0709', str_to_hexList('0000'), timeout=25)
+        retData = self.Uds.StartRC('0709', str_to_hexList('0000'))
         if(retData[0] != 'OK'): raise UDSProgrammingError(f"StartRC('0709') => Failed => response {retData[2]}")
     
-        for idx, file in enumerate(pdx_bin_files):
-
-            pdxInfo = DataBlockInfo[idx]
+        for image in images:
 
-            extra_data = pdxInfo['DATA_BLOCKS'][0]['SW_REFERENCE'].replace('REF.', "") # ASCII => PBMS_XXXX
+            extra_data = image.sw_reference
 
             # Check integrity code in the executing flash memory X -----------------------
             print('')
             logger.info(f"Software reference : {extra_data}")
             logger.info(f" => Check integrity code in the executing flash memory")
 
-            retData = self.Uds.StartRC('0704', str_to_hexList(dataBlock_TOB[idx]) +
-                                                str_to_hexList(dataBlock_POB[idx]) , timeout=25)
+            retData = self.Uds.StartRC('0704', str_to_hexList(image.tob) +
+                                                str_to_hexList(image.pob))
             if(retData[0] != 'OK'): logger.error(f"ECU programming failed: StartRC('0704') => Failed => response {retData[2]}")
 
-            retData = self.Uds.StartRC('0706', str_to_hexList(dataBlock_TOB[idx]) +
-                                                str_to_hexList(dataBlock_POB[idx]) , timeout=25)
+            retData = self.Uds.StartRC('0706', str_to_hexList(image.tob) +
+                                                str_to_hexList(image.pob))
             if(retData[0] != 'OK'): raise UDSProgrammingError(f"StartRC('0706') => Failed => response {retData[2]}")
 
-            retData = self.Uds.StartRC('070A', str_to_hexList(dataBlock_TOB[idx]) +
-                                                str_to_hexList(dataBlock_POB[idx]) , timeout=25)
+            retData = self.Uds.StartRC('070A', str_to_hexList(image.tob) +
+                                                str_to_hexList(image.pob))
             if(retData[0] != 'OK'): raise UDSProgrammingError(f"StartRC('070A') => Failed => response {retData[2]}")
             # ----------------------------------------------------------------------------
 
@@ -482,23 +852,20 @@ class ECUProgrammer:
 
             # print("PDX SW_REFERENCE =", extra_data, '\n') # For debug
         
-            retData = self.Uds.WriteDID('F01C',
-                                        str_to_hexList(dataBlock_TOB[idx]) +
-                                        str_to_hexList(dataBlock_POB[idx]) +
-                                        [len(extra_data)//2] +
-                                        str_to_hexList(extra_data + '30303030'))
+            retData = self.Uds.WriteDID('F01C', image.traceability_record())
 
             if(retData[1] != True): raise UDSProgrammingError(f"WriteDID('F01C') => Failed => response {retData[2]}")
             # ----------------------------------------------------------------------------
 
-            # Clean the PDX program temporary folders
-            if os.path.exists(os.path.dirname(file)):
-                shutil.rmtree(os.path.dirname(file))
-
         wait_ms(50)
+
+        tp.stop()
         
         retData = self.Uds.StartReset(0x1)
         # print(retData)
+
+        if journal is not None:
+            journal.clear()
         
         print('')
         logger.info("Programming completed successfully")
@@ -0,0 +1,240 @@
+import copy
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from .UDSConfig import UDSConfig
+from .UDSInterface import ControllableThread, UDSInterface
+from .Utils import PeekableQueue
+
+logger = logging.getLogger(__name__)
+
+
+class EcuSession(UDSInterface):
+    """
+    UDSInterface bound to one ECU (TxId/RxId pair) of a CAN channel owned by a UDSSessionManager.
+
+    All the UDS services of UDSInterface are available. Frames are received from the
+    demultiplexer of the manager instead of the CAN wrapper, so sessions of different
+    ECUs can run requests in parallel (one request at a time per ECU).
+    """
+
+    def __init__(self, manager: "UDSSessionManager", TxID: int, RxID: int, name: Optional[str] = None):
+        # The CAN channel is owned by the manager => UDSInterface.__init__ is not called
+        self.comOk = manager.Uds.comOk
+        self.TxId = TxID
+        self.RxId = RxID
+        self.IsFiltered = True
+        self.PcanLib = manager.Uds.PcanLib
+        self.IsCanFD = manager.Uds.IsCanFD
+        self.q = PeekableQueue()
+        self.m_DLLFound = True
+        self.lock = threading.Lock()
+        self.tx_lock = threading.RLock()
+        self.m_objWrapper = None
+        self.timing = copy.deepcopy(manager.Uds.timing)
+        self.FunctionalId = getattr(manager.Uds, 'FunctionalId', None)
+        self.config = getattr(manager.Uds, 'config', None)
+        self.PeriodicRxId = getattr(manager.Uds, 'PeriodicRxId', None)
+        self.last_activity = 0.0
+        self.last_response = None
+
+        self.name = name or f"ECU_{TxID:X}"
+        # Profile of the config (EcuList entry) only if the ECU is listed there
+        self.profile = self.name if self.config is not None and any(ecu.name == self.name for ecu in self.config.ecus) else None
+        self.manager = manager
+        self.rx_queue = queue.Queue()
+        self.rx_wait = manager.rx_wait
+
+    def ReadMessages(self):
+        """Return the next frame received from the ECU (None if nothing received)"""
+        try:
+            return self.rx_queue.get(timeout=self.rx_wait)
+        except queue.Empty:
+            return None
+
+    def WriteMessages(self, id, data):
+        """Write a frame on the shared CAN channel"""
+        with self.tx_lock:
+            self.last_activity = time.time()
+            return self.manager.write(id, data)
+
+    def __repr__(self):
+        return f"EcuSession({self.name}, Tx=0x{self.TxId:X}, Rx=0x{self.RxId:X})"
+
+
+class FrameDispatcherThread(ControllableThread):
+    """Read the shared CAN channel and route the frames to the ECU sessions by CAN ID"""
+
+    def __init__(self, manager: "UDSSessionManager", interval: float = 0.001):
+        super().__init__(name="FrameDispatcherThread", interval=interval)
+        self.manager = manager
+
+    def on_tick(self):
+        # Drain all the frames available before sleeping
+        while True:
+            msg = self.manager.Uds.ReadMessages()
+            if msg is None:
+                return
+            if len(msg['data']) > 0:
+                self.manager.dispatch(msg)
+
+
+class UDSSessionManager:
+    """
+    Drive several ECUs on a single CAN channel.
+
+    The manager owns the CAN channel of a UDSInterface: one dispatcher thread reads every
+    frame and routes it by CAN ID to the ECU sessions (per-ECU ISO-TP endpoints), frames of
+    other IDs can be handled with listeners. Requests to different ECUs run in parallel.
+
+    Note: while the manager runs, use an EcuSession for the ECU of the base UDSInterface
+    instead of the base UDSInterface itself.
+
+    Example:
+        with UDSSessionManager(Uds) as manager:
+            manager.add_session(0x18DADBF1, 0x18DAF1DB, "Master")
+            manager.add_session(0x18DADCF1, 0x18DAF1DC, "Slave1")
+            results = manager.run_parallel(lambda ecu: ecu.ReadDID('F190'))
+    """
+
+    def __init__(self, UdsClient: UDSInterface, rx_wait: float = 0.002):
+        self.Uds = UdsClient
+        self.comOk = UdsClient.comOk
+        self.rx_wait = rx_wait
+        self.sessions: Dict[int, EcuSession] = {}
+        self.listeners: Dict[int, Callable[[dict], None]] = {}
+        self._tx_lock = threading.Lock()
+        self._dispatcher: Optional[FrameDispatcherThread] = None
+
+    @classmethod
+    def from_config(cls, UdsClient: UDSInterface, FileConfig=None) -> "UDSSessionManager":
+        """
+        Create the manager and the sessions listed in the optional 'EcuList' config section:
+
+        EcuList:
+          - {name: Master, TxId: 0x18DADBF1, RxId: 0x18DAF1DB}
+          - {name: Slave1, TxId: 0x18DADCF1, RxId: 0x18DAF1DC}
+
+        FileConfig is a config file or a UDSConfig (None: config of UdsClient).
+        """
+        manager = cls(UdsClient)
+        if FileConfig is None:
+            FileConfig = getattr(UdsClient, 'config', None)
+        if FileConfig is not None:
+            for ecu in UDSConfig.load(FileConfig).ecus:
+                manager.add_session(ecu.TxId, ecu.RxId, ecu.name)
+        return manager
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def add_session(self, TxID: int, RxID: int, name: Optional[str] = None) -> EcuSession:
+        """Create the session of an ECU and open the CAN filter to its IDs"""
+        if RxID in self.sessions:
+            raise ValueError(f"A session already uses the RxId 0x{RxID:X}")
+        session = EcuSession(self, TxID, RxID, name)
+        self.sessions[RxID] = session
+        self._update_filter()
+        return session
+
+    def add_listener(self, can_id: int, callback: Callable[[dict], None]) -> None:
+        """Call callback(msg) for each frame received with this CAN ID (e.g. periodic data)"""
+        self.listeners[can_id] = callback
+        self._update_filter()
+
+    def remove_listener(self, can_id: int) -> None:
+        if self.listeners.pop(can_id, None) is not None:
+            self._update_filter()
+
+    def get_session(self, name: str) -> Optional[EcuSession]:
+        for session in self.sessions.values():
+            if session.name == name:
+                return session
+        return None
+
+    def _update_filter(self):
+        """
+        Open the receive filter of the channel to all the ECU and listener IDs.
+
+        The PCANBasic / CanApi4 filters are an ID range: the range from the lowest to the highest
+        ID is received, the frames of the other IDs of the range are dropped by dispatch().
+        """
+        if not self.Uds.IsFiltered:
+            return
+        ids = [self.Uds.TxId, self.Uds.RxId] + list(self.listeners.keys())
+        for session in self.sessions.values():
+            ids.extend([session.TxId, session.RxId])
+        self.Uds.m_objWrapper.set_filter(min(ids), max(ids))
+
+    def start(self):
+        """Start the frame dispatcher"""
+        if self._dispatcher is None:
+            self._dispatcher = FrameDispatcherThread(self)
+            self._dispatcher.start()
+
+    def stop(self):
+        """Stop the frame dispatcher"""
+        if self._dispatcher is not None:
+            self._dispatcher.stop()
+            self._dispatcher.join(timeout=1)
+            self._dispatcher = None
+
+    def write(self, can_id: int, data) -> bool:
+        """Write a frame on the channel (frames of parallel requests are serialized)"""
+        with self._tx_lock:
+            return self.Uds.WriteMessages(can_id, data)
+
+    def dispatch(self, msg: dict) -> None:
+        """Route a received frame to the session or listener of its CAN ID"""
+        session = self.sessions.get(msg['id'])
+        if session is not None:
+            session.rx_queue.put(msg)
+            return
+
+        listener = self.listeners.get(msg['id'])
+        if listener is not None:
+            try:
+                listener(msg)
+            except Exception as e:
+                logger.warning(f"Listener 0x{msg['id']:X} failed: {e}")
+
+    def run_parallel(self, func: Callable[[EcuSession], object],
+                     sessions: Optional[List[EcuSession]] = None,
+                     max_workers: Optional[int] = None) -> Dict[str, object]:
+        """
+        Run func(session) for each ECU session in parallel.
+
+        Returns:
+            dict: {session name: result}, an exception raised for one ECU is returned as its result.
+        """
+        sessions = sessions if sessions is not None else list(self.sessions.values())
+        if not sessions:
+            return {}
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers or len(sessions)) as executor:
+            futures = {executor.submit(func, session): session for session in sessions}
+            for future, session in futures.items():
+                try:
+                    results[session.name] = future.result()
+                except Exception as e:
+                    logger.error(f"{session.name} failed: {e}")
+                    results[session.name] = e
+        return results
+
+
+# Example Usage
+if __name__ == "__main__":
+    from .Utils import loadConfigFilePath
+
+    FileConfig = loadConfigFilePath()
+    with UDSSessionManager.from_config(UDSInterface(FileConfig=FileConfig), FileConfig) as manager:
+        manager.run_parallel(lambda ecu: ecu.StartSession(3))
+        print(manager.run_parallel(lambda ecu: ecu.ReadDID('F190')))
@@ -0,0 +1,135 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from .Utils import get_nested_yaml_option
+
+
+@dataclass
+class UDSTimingParams:
+    """P2 / P2* pair (seconds) applied to one request (None in a service / routine entry: default value)"""
+    p2: Optional[float]
+    p2_star: Optional[float]
+
+
+@dataclass
+class UDSTiming:
+    """
+    ISO 14229-2 application timing model.
+
+    P2      : time to wait for the first response of a request.
+    P2*     : time to wait for the final response after each NRC 0x78 (response pending).
+    N_Bs/Cr : ISO 15765-2 flow control / consecutive frame timeouts during segmented transfers.
+
+    Values are expressed in seconds. The defaults can be overridden per service (SID) or
+    per routine (RID) from the config file (section UdsTiming).
+    """
+    p2: float = 0.150                 # P2 client = P2 server (50ms) + bus/driver latency margin
+    p2_star: float = 5.0              # P2* client = P2* server (5000ms) default
+    n_bs: float = 1.0                 # Wait for flow control
+    n_cr: float = 1.0                 # Wait for next consecutive frame
+    margin: float = 0.100             # Client margin added to the server timings read from the ECU
+    read_from_session: bool = False   # Update P2/P2* from the 0x50 session response
+    reset_delay: float = 0.0          # Wait once the ECU stopped answering after a reset, before polling its readiness
+    ready_timeout: float = 10.0       # Maximum wait for the ECU readiness (reset, session change)
+    security_delay: float = 10.0      # SecurityAccess delay timer of the ECU (NRC 0x37)
+    services: Dict[int, UDSTimingParams] = field(default_factory=dict)
+    routines: Dict[int, UDSTimingParams] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, FileConfig: Optional[str] = None) -> "UDSTiming":
+        """
+        Build the timing model from the optional 'UdsTiming' config section:
+
+        UdsTiming:
+          P2: 0.150
+          P2Star: 5.0
+          ReadFromSession: True
+          ResetDelay: 0.0
+          ReadyTimeout: 10
+          SecurityDelay: 10
+          Services:
+            0x31: {P2: 0.5}
+          Routines:
+            0x0702: {P2Star: 25}
+        """
+        if FileConfig is None:
+            return cls()
+        return cls.from_dict(get_nested_yaml_option(FileConfig, ['UdsTiming'], default=None))
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]) -> "UDSTiming":
+        """Build the timing model from the content of the 'UdsTiming' section (None: default values)"""
+        timing = cls()
+        if not isinstance(config, dict):
+            return timing
+
+        timing.p2 = float(config.get('P2', timing.p2))
+        timing.p2_star = float(config.get('P2Star', timing.p2_star))
+        timing.n_bs = float(config.get('N_Bs', timing.n_bs))
+        timing.n_cr = float(config.get('N_Cr', timing.n_cr))
+        timing.margin = float(config.get('Margin', timing.margin))
+        timing.read_from_session = bool(config.get('ReadFromSession', timing.read_from_session))
+        timing.reset_delay = float(config.get('ResetDelay', timing.reset_delay))
+        timing.ready_timeout = float(config.get('ReadyTimeout', timing.ready_timeout))
+        timing.security_delay = float(config.get('SecurityDelay', timing.security_delay))
+
+        for sid, params in (config.get('Services') or {}).items():
+            timing.services[_to_int(sid)] = timing._params_from_dict(params)
+        for rid, params in (config.get('Routines') or {}).items():
+            timing.routines[_to_int(rid)] = timing._params_from_dict(params)
+
+        return timing
+
+    def _params_from_dict(self, params) -> UDSTimingParams:
+        """Values of a service / routine entry, the values not given follow the defaults (e.g. read from the ECU)"""
+        params = params or {}
+        return UDSTimingParams(p2=float(params['P2']) if 'P2' in params else None,
+                               p2_star=float(params['P2Star']) if 'P2Star' in params else None)
+
+    def get(self, message) -> UDSTimingParams:
+        """
+        Return the P2/P2* pair to use for the given UDS request payload (without PCI byte).
+        Routine control requests are looked up by RID first, then by SID.
+        """
+        entries = []
+        if len(message) >= 4 and message[0] == 0x31:
+            entries.append(self.routines.get((message[2] << 8) | message[3]))
+        if len(message) >= 1:
+            entries.append(self.services.get(message[0]))
+
+        p2, p2_star = None, None
+        for params in entries:
+            if params is not None:
+                p2 = params.p2 if p2 is None else p2
+                p2_star = params.p2_star if p2_star is None else p2_star
+
+        return UDSTimingParams(self.p2 if p2 is None else p2,
+                               self.p2_star if p2_star is None else p2_star)
+
+    def update_from_session_response(self, data) -> bool:
+        """
+        Update the default P2/P2* with the session parameter record of a 0x50 response:
+        [0x50, session, P2_hi, P2_lo, P2*_hi, P2*_lo] (P2 in 1ms, P2* in 10ms resolution).
+        The ECU values are server timings, the client margin is added on top of them.
+        """
+        if len(data) < 6 or data[0] != 0x50:
+            return False
+
+        p2_server = ((data[2] << 8) | data[3]) / 1000.0
+        p2_star_server = ((data[4] << 8) | data[5]) * 10 / 1000.0
+
+        self.p2 = p2_server + self.margin
+        self.p2_star = p2_star_server + self.margin
+        return True
+
+    def deadlines(self, message, timeout: Optional[float] = None) -> Tuple[float, float]:
+        """Return (P2, P2*) windows, an explicit timeout replaces P2 and is the minimum P2*"""
+        if timeout is not None:
+            return timeout, max(timeout, self.get(message).p2_star)
+        params = self.get(message)
+        return params.p2, params.p2_star
+
+
+def _to_int(value) -> int:
+    if isinstance(value, int):
+        return value
+    return int(str(value), 16)
@@ -6,15 +6,11 @@ from collections.abc import Mapping
 import re
 import threading
 import queue
-import xmltodict
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from openpyxl.formatting.rule import CellIsRule
-import subprocess
 import logging
 from typing import Any, List, Optional, Tuple, Union
 from pathlib import Path
-from Lib.Pdx_Odx import *
+# xmltodict, openpyxl, subprocess and Lib.Pdx_Odx (lxml) are imported by the functions using them:
+# opening a CAN channel does not pay for the Excel / ODX / ARXML dependencies
 
 
 # Configure logging
@@ -109,20 +105,45 @@ def str_to_hexList(strData, symbol=''):
                 print(f"str_to_hexList => Input data error : {strData.strip()}")
     return data
 
+_yaml_cache = {}
+_yaml_lock = threading.Lock()
+
+
+def load_yaml(file_path: Union[str, Path]) -> dict:
+    """
+    Content of a YAML file, parsed once per process: the file is read again only when it is modified.
+    The returned dict is shared by all the callers, do not modify it.
+    """
+    path = os.path.abspath(file_path)
+    mtime = os.stat(path).st_mtime_ns
+    with _yaml_lock:
+        cached = _yaml_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as file:
+        data = yaml.safe_load(file) or {}
+    with _yaml_lock:
+        _yaml_cache[path] = (mtime, data)
+    return data
+
+
 def load_config(obj_dest, globalVal, config_file, Encode=False):
-    """Load configuration from a YAML file."""
+    """
+    Load configuration from a YAML file.
+    Kept for the existing scripts, use UDS.UDSConfig.UDSConfig.load() to get the typed configuration.
+    """
     try:
-        with open(config_file, "r") as file:
-            config = yaml.safe_load(file)
-            data = {}
-            # Flatten the nested structure and set attributes
-            flatten_dict(data, globalVal, config, Encode=Encode)
-
-            for item, value in data.items():
-                if isinstance(obj_dest, Mapping) and obj_dest.get(item, "") is None:
-                    obj_dest[item] = value
-                elif hasattr(obj_dest, item) and getattr(obj_dest, item) is None:
-                    setattr(obj_dest, item, value)
+        config = load_yaml(config_file)
+        data = {}
+        # Flatten the nested structure and set attributes
+        flatten_dict(data, globalVal, config, Encode=Encode)
+
+        for item, value in data.items():
+            if isinstance(obj_dest, Mapping) and obj_dest.get(item, "") is None:
+                obj_dest[item] = value
+            elif hasattr(obj_dest, item) and getattr(obj_dest, item) is None:
+                setattr(obj_dest, item, value)
     except Exception as e:
         print(f"Cannot Access Config file {config_file} Exception: {str(e)}" )
         config = {}
@@ -178,17 +199,19 @@ def get_nested_yaml_option(
         if not os.access(path, os.R_OK):
             raise PermissionError(f"Cannot read file: {path}")
 
-        # Load YAML content
-        with path.open('r', encoding='utf-8') as file:
-            try:
-                loader = yaml.safe_load if safe_mode else yaml.load
-                data = loader(file) or {}
-            except yaml.YAMLError as e:
-                logger.error(f"Error parsing YAML file {path}: {e}")
-                raise
-            except Exception as e:
-                logger.error(f"Unexpected error loading YAML: {e}")
-                raise
+        # Load YAML content (safe mode: parsed once, see load_yaml)
+        try:
+            if safe_mode:
+                data = load_yaml(path)
+            else:
+                with path.open('r', encoding='utf-8') as file:
+                    data = yaml.load(file) or {}
+        except yaml.YAMLError as e:
+            logger.error(f"Error parsing YAML file {path}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error loading YAML: {e}")
+            raise
 
         # Navigate through nested structure
         current_level = data
@@ -271,10 +294,8 @@ def flatten_dict(obj_dest, globalVal, dictionary, Encode=False):
             print(f"Cannot set var Exception: {str(e)}" )
 
 def loadConfigFilePath(localPath=""):
-    with open(os.path.join(localPath, Global_config_file), "r") as file:
-        config = yaml.safe_load(file)
-        path_fileConfig = os.path.join(localPath, config["configFile"])
-        return path_fileConfig
+    config = load_yaml(os.path.join(localPath, Global_config_file))
+    return os.path.join(localPath, config["configFile"])
 
 def verifyFrame(dataReceived, dataSent, size):
     resultStatus = False
@@ -342,6 +363,8 @@ class PeekableQueue(queue.Queue):
             return None  # Return None if the queue is empty
 
 def arxml_to_dict_xmltodict(file_path):
+    import xmltodict
+
     with open(file_path, "r", encoding="utf-8") as file:
         return xmltodict.parse(file.read())
 
@@ -349,6 +372,39 @@ def wait_ms(ms: int):
     """Wait for the given duration in milliseconds without blocking other threads."""
     time.sleep(ms / 1000.0)
 
+def response_nrc(response) -> Optional[int]:
+    """Return the NRC of a negative response returned by WriteReadRequest (HexBytes / hex strings), None otherwise"""
+    raw = getattr(response, 'raw', None)
+    if raw is not None:
+        return raw[2] if len(raw) >= 3 and raw[0] == 0x7F else None
+    try:
+        if len(response) >= 3 and int(response[0], 16) == 0x7F:
+            return int(response[2], 16)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def poll_until(func, done=bool, timeout: float = 5.0, initial_delay: float = 0.01,
+               max_delay: float = 0.5, backoff: float = 2.0):
+    """
+    Call func() until done(result) is True or the timeout (seconds) expires.
+    The delay between two calls starts at initial_delay and grows exponentially up to max_delay.
+
+    Returns:
+        tuple: (True if done, last result of func)
+    """
+    deadline = time.time() + timeout
+    delay = initial_delay
+    while True:
+        result = func()
+        if done(result):
+            return True, result
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False, result
+        time.sleep(min(delay, remaining))
+        delay = min(delay * backoff, max_delay)
+
 # Checksum CRC-16-CCITT (Polynomial 0x1021)
 def crc16_ccitt(data):
     poly = 0x1021 # ✅ Polynomial 0x1021
@@ -363,30 +419,62 @@ def crc16_ccitt(data):
             crc &= 0xFFFF
     return crc
 
-def crc16_x25(data: bytes) -> int:
+def _crc16_x25_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for idx in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0x8408  # Reversed polynomial 0x1021
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+_CRC16_X25_TABLE = _crc16_x25_table()
+
+def crc16_x25(data: bytes, crc: int = 0xFFFF, final: bool = True) -> int:
     """
-    Calculate CRC-16/X-25 (DECT-R) checksum.
+    Calculate CRC-16/X-25 (DECT-R) checksum (table driven).
     
     Parameters:
-        data: Input data as bytes
+        data: Input data as bytes (bytes, bytearray, memoryview or list of ints)
+        crc: Running CRC value to continue a calculation (see final)
+        final: Apply the final XOR, set to False to chain several buffers
         
     Returns:
         16-bit CRC checksum (int)
     """
-    poly = 0x1021  # ✅ Polynomial (0x1021, but we use reversed 0x8408)
-    crc = 0xFFFF   # ✅ Initial value (will be inverted to 0x0000 after first step)
-    
+    table = _CRC16_X25_TABLE
     for byte in data:
-        crc ^= byte
-        for idx in range(8):
-            if crc & 1:
-                crc = (crc >> 1) ^ 0x8408  # Reversed polynomial
-            else:
-                crc >>= 1
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
     
-    crc ^= 0xFFFF  # Final XOR
+    if final:
+        crc ^= 0xFFFF  # Final XOR
     return crc & 0xFFFF  # Ensure 16-bit result
 
+def transfer_data_payload(block_number: int, data, address: int = 0, dataSize: bool = False) -> bytes:
+    """
+    Build a TransferData (0x36) request payload.
+
+    address > 0 : [0x36, block, address (3 bytes), (size), data, CRC-16/X-25 (little endian)]
+    address = 0 : [0x36, block, data] (direct flow without address and checksum)
+    """
+    if address > 0:
+        payload = bytearray([0x36, block_number & 0xFF])
+        payload += bytes(int_to_byteList(address, 3))
+        if dataSize == True:
+            payload.append(len(data))
+        payload += data
+
+        # Calculate Payload + Data Block CRC (sent LSB first)
+        payload_crc = crc16_x25(payload)
+        payload += bytes([payload_crc & 0xFF, (payload_crc >> 8) & 0xFF])
+    else:
+        payload = bytearray([0x36, block_number & 0xFF])
+        payload += data
+    return bytes(payload)
+
 # ----------------------------------------    
 # Excel functions
 # ----------------------------------------
@@ -403,19 +491,30 @@ def adjustWidth(ws):
         adjusted_width = (max_length + 2) if max_length < 100 else 100  # Limit cell size
         ws.column_dimensions[column].width = adjusted_width
 
+# Colors of the Status column
+STATUS_COLORS = {
+    "OK": "00FF00",                   # Green
+    "ROUTINE_STARTED": "00FF00",      # Green
+    "ROUTINE_FINISHED_OK": "00FF00",  # Green
+    "ROUTINE_IN_PROGRESS": "DE7B12",  # Orange
+    "NOK": "FF0000",                  # Red
+}
+
+def statusFormatRules():
+    """Conditional formatting rules (fill color) of the status values"""
+    from openpyxl.styles import PatternFill
+    from openpyxl.formatting.rule import CellIsRule
+
+    fills = {}
+    rules = []
+    for status, color in STATUS_COLORS.items():
+        if color not in fills:
+            fills[color] = PatternFill(start_color=color, end_color=color, fill_type="solid")
+        rules.append(CellIsRule(operator='equal', formula=[f'"{status}"'], fill=fills[color]))
+    return rules
+
 def applyPainterFormat(excel_file, column):
-    # Set the colors for the painter format
-    fill_green  = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")  # Green
-    fill_orange = PatternFill(start_color="DE7B12", end_color="DE7B12", fill_type="solid")  # Orange
-    fill_red    = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")  # Red
-
-    status_colors = {
-        "OK": fill_green,
-        "ROUTINE_STARTED": fill_green,
-        "ROUTINE_FINISHED_OK": fill_green,
-        "ROUTINE_IN_PROGRESS": fill_orange,
-        "NOK": fill_red,
-    }
+    from openpyxl import load_workbook
 
     # Load Excel file with openpyxl to add painter format rules
     wb = load_workbook(excel_file)
@@ -428,12 +527,52 @@ def applyPainterFormat(excel_file, column):
         max_row = sheet.max_row
         cell_range = f"{column}2:{column}{max_row}"
 
-        for status, fill in status_colors.items():
-            sheet.conditional_formatting.add(cell_range, CellIsRule(operator='equal', formula=[f'"{status}"'], fill=fill))
+        for rule in statusFormatRules():
+            sheet.conditional_formatting.add(cell_range, rule)
 
     # Save the Excel file with the rules and format painter
     wb.save(excel_file)
 
+def writeExcelSheets(excel_file, sheets, status_column='Status'):
+    """
+    Write all the sheets of a workbook in one pass, in write-only (streaming) mode.
+    The column widths (as adjustWidth) and the color rules of the status column
+    (as applyPainterFormat) are computed from the rows before they are streamed.
+
+    Parameters:
+        sheets (dict): {sheet name: (columns, rows)}, rows = list of lists of values.
+        status_column (str): Header of the column colored by status (None: no color).
+    """
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+
+    for sheet_name, (columns, rows) in sheets.items():
+        ws = wb.create_sheet(sheet_name)
+
+        # The dimensions must be set before the first row is written
+        widths = [0] * len(columns)
+        for row in [columns] + rows:
+            if len(row) > len(widths):
+                widths.extend([0] * (len(row) - len(widths)))
+            for index, value in enumerate(row):
+                if value is not None and len(str(value)) > widths[index]:
+                    widths[index] = len(str(value))
+        for index, max_length in enumerate(widths):
+            ws.column_dimensions[get_column_letter(index + 1)].width = (max_length + 2) if max_length < 100 else 100  # Limit cell size
+
+        ws.append(list(columns))
+        for row in rows:
+            ws.append(row)
+
+        if status_column in columns and len(rows) > 0:
+            column = get_column_letter(columns.index(status_column) + 1)
+            for rule in statusFormatRules():
+                ws.conditional_formatting.add(f"{column}2:{column}{len(rows) + 1}", rule)
+
+    wb.save(excel_file)
+
 # ----------------------------------------    
 # ULP (Motorola S-record) functions
 # ----------------------------------------
@@ -459,6 +598,8 @@ def run_srec_cat(
     Returns:
         bool: True if successful, False otherwise.
     """
+    import subprocess
+
     if not os.path.isfile(srec_cat_path):
         logging.error(f"srec_cat.exe not found: {srec_cat_path}")
         return False
@@ -583,6 +724,8 @@ def remove_extension(file_path: str) -> str:
     return base
 
 def extractPdxFileInfo(pdx_file):
+    from Lib.Pdx_Odx import Pdx_Odx
+
     odxC = Pdx_Odx()
     pdxDict = {}
     odxfDataFile = ''